@@ -0,0 +1,120 @@
+"""
+학습 step 시간 / 최대 메모리 비교: fp32 vs AMP vs channels_last vs AMP + channels_last.
+
+합성 batch (image_size x image_size 이미지, 이미지당 박스 4개) 로 train_one_epoch 과 같은 step 을 반복합니다.
+모드마다 별도 프로세스에서 실행해 peak 메모리(CUDA: max_memory_allocated, CPU: 최대 RSS)가 섞이지 않게 합니다.
+CPU 에서는 AMP 가 bfloat16 autocast 로 동작합니다.
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/bench_amp.py --batch_size 4 --steps 20
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+MODES = {
+    "fp32": {"amp": False, "channels_last": False},
+    "amp": {"amp": True, "channels_last": False},
+    "channels_last": {"amp": False, "channels_last": True},
+    "amp+channels_last": {"amp": True, "channels_last": True},
+}
+
+
+def synthetic_batch(batch_size, image_size, num_classes, device, generator):
+    import torch
+    images, targets = [], []
+    for _ in range(batch_size):
+        images.append(torch.rand(3, image_size, image_size, generator=generator).to(device))
+        xy = torch.rand(4, 2, generator=generator) * (image_size * 0.7)
+        wh = torch.rand(4, 2, generator=generator) * (image_size * 0.2) + 16
+        boxes = torch.cat([xy, xy + wh], dim=1).to(device)
+        labels = torch.randint(1, num_classes, (4,), generator=generator).to(device)
+        targets.append({"boxes": boxes, "labels": labels})
+    return images, targets
+
+
+def run_mode(args, mode):
+    import torch
+    from torchvision.models.detection import fasterrcnn_resnet50_fpn
+    from engine.trainer import get_autocast, make_grad_scaler, apply_channels_last
+
+    cfg = MODES[mode]
+    device = torch.device(args.device)
+    # 시간/메모리 측정만 하므로 사전학습 backbone 가중치는 받지 않음
+    model = fasterrcnn_resnet50_fpn(num_classes=args.num_classes, weights_backbone=None).to(device)
+    if cfg["channels_last"]:
+        apply_channels_last(model)
+    model.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=2e-4)
+    scaler = make_grad_scaler(device, cfg["amp"])
+
+    generator = torch.Generator().manual_seed(0)
+    images, targets = synthetic_batch(args.batch_size, args.image_size, args.num_classes, device, generator)
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats()
+
+    times = []
+    for step in range(args.warmup + args.steps):
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+
+        with get_autocast(device, cfg["amp"]):
+            loss_dict = model(images, targets)
+            losses = sum(loss for loss in loss_dict.values())
+        optimizer.zero_grad()
+        scaler.scale(losses).backward()
+        scaler.step(optimizer)
+        scaler.update()
+
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        if step >= args.warmup:
+            times.append(time.perf_counter() - start)
+
+    if device.type == "cuda":
+        peak_mb = torch.cuda.max_memory_allocated() / 2 ** 20
+    else:
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB 단위
+    times.sort()
+    return {"mode": mode, "step_ms": 1000 * sum(times) / len(times), "p50_ms": 1000 * times[len(times) // 2],
+            "peak_mb": peak_mb}
+
+
+def main(args):
+    print(f"device={args.device}, batch_size={args.batch_size}, image_size={args.image_size}, steps={args.steps}")
+    print(f"{'mode':>18} {'step(ms)':>9} {'p50(ms)':>9} {'peak(MB)':>9}")
+    for mode in args.modes:
+        cmd = [sys.executable, __file__, "--_child", mode] + sys.argv[1:]
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['mode']:>18} {r['step_ms']:>9.1f} {r['p50_ms']:>9.1f} {r['peak_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", type=str, default=None, help="기본값: cuda 가능하면 cuda")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--image_size", type=int, default=640)
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--_child", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.device is None:
+        import torch
+        args.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    if args._child:
+        print(json.dumps(run_mode(args, args._child)))
+    else:
+        main(args)
@@ -0,0 +1,85 @@
+"""
+FasterRCNNDataset 어노테이션 조회 마이크로 벤치마크.
+
+기존 방식(매 샘플마다 df 전체 boolean scan + iterrows)과
+사전 구축한 인덱스(offset slice)의 샘플당 지연 시간을 train_df.csv 1x / 10x / 100x 규모로 비교합니다.
+이미지 디코딩은 제외하고 어노테이션 조회 비용만 측정합니다.
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/bench_dataset_index.py --scales 1 10 100
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from dataset.faster_rcnn_dataset import build_annotation_index
+
+
+def scale_df(df, scale):
+    # image_name 에 복제 번호를 붙여 서로 다른 이미지로 취급되도록 확장
+    parts = []
+    for i in range(scale):
+        part = df.copy()
+        part["image_name"] = part["image_name"] + f"#{i}"
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def legacy_lookup(df, image_name):
+    rows = df[df["image_name"] == image_name]
+    bboxes, labels = [], []
+    for _, row in rows.iterrows():
+        x, y, w, h = row["x"], row["y"], row["w"], row["h"]
+        bboxes.append([x, y, x + w, y + h])
+        labels.append(int(row["label"]))
+    return bboxes, labels
+
+
+def bench(fn, indices):
+    start = time.perf_counter()
+    for idx in indices:
+        fn(idx)
+    return (time.perf_counter() - start) / len(indices) * 1e6  # us / item
+
+
+def main(args):
+    df = pd.read_csv(os.path.join(BASE_DIR, args.csv))
+    df = df.rename(columns=lambda c: c.strip())
+    rng = np.random.default_rng(0)
+
+    print(f"{'scale':>6} {'rows':>9} {'images':>8} {'build(ms)':>10} {'legacy(us)':>11} {'index(us)':>10} {'speedup':>8}")
+    for scale in args.scales:
+        big = scale_df(df, scale)
+
+        start = time.perf_counter()
+        image_names, boxes, labels, offsets = build_annotation_index(big)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        indices = rng.integers(0, len(image_names), size=args.samples)
+
+        def index_lookup(idx):
+            s, e = offsets[idx], offsets[idx + 1]
+            return boxes[s:e], labels[s:e]
+
+        legacy_us = bench(lambda idx: legacy_lookup(big, image_names[idx]), indices[:args.legacy_samples])
+        index_us = bench(index_lookup, indices)
+
+        print(f"{scale:>6} {len(big):>9} {len(image_names):>8} {build_ms:>10.1f} "
+              f"{legacy_us:>11.1f} {index_us:>10.2f} {legacy_us / index_us:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", type=str, default="data/train_df.csv")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--samples", type=int, default=20000, help="인덱스 방식 측정 샘플 수")
+    parser.add_argument("--legacy_samples", type=int, default=200, help="기존 방식 측정 샘플 수 (느림)")
+    args = parser.parse_args()
+
+    main(args)
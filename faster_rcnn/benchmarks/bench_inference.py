@@ -0,0 +1,92 @@
+"""
+CPU 추론 지연 시간 / 처리량 비교: eager vs TorchScript vs ONNX Runtime.
+
+InferenceEngine 으로 같은 합성 이미지(image_size x image_size, val transform 과 같은 크기)를 batch 단위로 반복 추론합니다.
+--checkpoint 가 없으면 무작위 초기화 모델을 임시 체크포인트로 저장해 사용합니다 (속도 측정용).
+export 결과(.pt / .onnx)가 --export_dir 에 없으면 먼저 export 합니다.
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/bench_inference.py --checkpoint checkpoints_3/epoch_50.pth --batch_sizes 1 4 --iters 10
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import torch
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from engine.inference import InferenceEngine, BACKENDS, build_model, load_model, export_torchscript, export_onnx
+
+
+def prepare_models(args, work_dir):
+    checkpoint = args.checkpoint
+    if checkpoint is None:
+        torch.manual_seed(0)
+        model = build_model(args.num_classes)
+        checkpoint = os.path.join(work_dir, "random_init.pth")
+        torch.save({"epoch": 0, "model_state_dict": model.state_dict()}, checkpoint)
+
+    export_dir = args.export_dir or work_dir
+    stem = os.path.splitext(os.path.basename(checkpoint))[0]
+    paths = {"eager": checkpoint,
+             "torchscript": os.path.join(export_dir, f"{stem}.pt"),
+             "onnx": os.path.join(export_dir, f"{stem}.onnx")}
+    model = None
+    for backend in ("torchscript", "onnx"):
+        if backend in args.backends and not os.path.exists(paths[backend]):
+            model = model or load_model(checkpoint, args.num_classes, torch.device("cpu"), channels_last=False)
+            if backend == "torchscript":
+                export_torchscript(model, paths[backend])
+            else:
+                export_onnx(model, paths[backend], args.image_size)
+    return paths
+
+
+def bench(engine, batch_size, image_size, iters, warmup):
+    generator = torch.Generator().manual_seed(0)
+    images = [torch.rand(3, image_size, image_size, generator=generator) for _ in range(batch_size)]
+    for _ in range(warmup):
+        engine(images)
+    times = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        engine(images)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return {
+        "p50_ms": 1000 * times[len(times) // 2],
+        "p90_ms": 1000 * times[min(len(times) - 1, int(len(times) * 0.9))],
+        "per_image_ms": 1000 * sum(times) / len(times) / batch_size,
+        "images_per_s": batch_size * len(times) / sum(times),
+    }
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = prepare_models(args, work_dir)
+        print(f"threads: {args.threads or torch.get_num_threads()}, image {args.image_size}x{args.image_size}")
+        print(f"{'backend':12s} {'batch':>5s} {'p50 ms':>9s} {'p90 ms':>9s} {'ms/img':>8s} {'img/s':>7s}")
+        for backend in args.backends:
+            engine = InferenceEngine(paths[backend], backend=backend, device="cpu",
+                                     num_classes=args.num_classes, num_threads=args.threads)
+            for batch_size in args.batch_sizes:
+                r = bench(engine, batch_size, args.image_size, args.iters, args.warmup)
+                print(f"{backend:12s} {batch_size:5d} {r['p50_ms']:9.1f} {r['p90_ms']:9.1f} "
+                      f"{r['per_image_ms']:8.1f} {r['images_per_s']:7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, default=None, help="없으면 무작위 초기화 모델")
+    parser.add_argument("--export_dir", type=str, default=None, help="export.py 결과 폴더 (없으면 임시 폴더에 export)")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--image_size", type=int, default=640)
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--iters", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    main(parser.parse_args())
@@ -0,0 +1,67 @@
+"""
+DataLoader 단독 처리량 측정 (모델 없이 디코딩 + 증강만).
+
+ftrcnn_config.yaml 의 데이터/로더 설정으로 train loader 를 만들고 worker 수별 images/sec 를 출력합니다.
+host 별 loader.num_workers 를 정할 때 사용하세요.
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/bench_loader.py --workers 0 2 4 8 --batches 50
+"""
+import os
+import sys
+import time
+import argparse
+import yaml
+from torch.utils.data import DataLoader
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from ftrcnn_train import build_datasets
+from dataset import loader_kwargs
+
+
+def measure(dataset, batch_size, loader_cfg, num_batches):
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=True, **loader_kwargs(loader_cfg))
+
+    start = time.perf_counter()
+    it = iter(loader)
+    next(it)  # worker 기동 + 첫 batch 는 따로 측정
+    first_batch = time.perf_counter() - start
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        try:
+            batch_images, _ = next(it)
+        except StopIteration:
+            break
+        images += len(batch_images)
+    elapsed = time.perf_counter() - start
+    del it
+    return first_batch, images / elapsed if elapsed > 0 else 0.0
+
+
+def main(args):
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+    train_dataset, _ = build_datasets(config)
+    batch_size = args.batch_size or config["training"]["batch_size"]
+
+    print(f"dataset: {len(train_dataset)} images, batch_size={batch_size}, cpu_count={os.cpu_count()}")
+    print(f"{'workers':>8} {'first batch(s)':>15} {'images/sec':>11}")
+    for num_workers in args.workers:
+        loader_cfg = dict(config.get("loader", {}), num_workers=num_workers)
+        first_batch, rate = measure(train_dataset, batch_size, loader_cfg, args.batches)
+        print(f"{num_workers:>8} {first_batch:>15.2f} {rate:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default="ftrcnn_config.yaml")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4, 8])
+    parser.add_argument("--batches", type=int, default=50, help="worker 수마다 측정할 batch 수")
+    parser.add_argument("--batch_size", type=int, default=None, help="기본값: training.batch_size")
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,116 @@
+"""
+shard 포맷 vs 개별 파일 읽기 처리량 벤치마크 (files/sec).
+
+개별 파일: 이미지마다 open/read + 어노테이션 open/read
+shard   : mmap 한 shard 를 record 순서대로 순차 읽기
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/bench_shards.py --image_dir ../data/ORIGINAL/images --ann_dir ../data/ORIGINAL/annotations
+    python benchmarks/bench_shards.py --synthetic 2000            # 임시 폴더에 합성 데이터 생성 후 측정
+    python benchmarks/bench_shards.py --synthetic 2000 --decode   # PNG 디코딩까지 포함
+
+page cache 영향을 보려면 각 측정 전에 캐시를 비우거나(root 권한 필요) 네트워크 파일시스템에서 실행하세요.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from dataset.shards import ShardReader, pack_directory
+
+
+def make_synthetic(root, count, size=256):
+    image_dir, ann_dir = root / "images", root / "annotations"
+    image_dir.mkdir(parents=True)
+    ann_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        img = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+        cv2.imwrite(str(image_dir / f"img_{i:06d}.png"), img)
+        with open(ann_dir / f"img_{i:06d}.json", "w") as f:
+            json.dump({"images": [{"file_name": f"img_{i:06d}.png", "width": size, "height": size}],
+                       "annotations": [{"bbox": [10, 10, 50, 50], "category_id": 1}]}, f)
+    return image_dir, ann_dir
+
+
+def read_loose(image_dir, ann_dir, ann_ext, decode):
+    n = 0
+    for img_file in sorted(os.listdir(image_dir)):
+        with open(image_dir / img_file, "rb") as f:
+            data = f.read()
+        ann_path = ann_dir / (os.path.splitext(img_file)[0] + ann_ext)
+        if ann_path.exists():
+            with open(ann_path, "rb") as f:
+                f.read()
+        if decode:
+            cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        n += 1
+    return n
+
+
+def read_shards(shard_dir, decode):
+    n = 0
+    for record in ShardReader(shard_dir):
+        bytes(record.ann_bytes)
+        if decode:
+            record.decode_image()
+        else:
+            bytes(record.image_bytes)
+        n += 1
+    return n
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    n = fn(*args)
+    return n, time.perf_counter() - start
+
+
+def main(args):
+    tmp = tempfile.TemporaryDirectory()
+    root = Path(tmp.name)
+
+    if args.synthetic:
+        image_dir, ann_dir = make_synthetic(root / "loose", args.synthetic)
+    else:
+        image_dir, ann_dir = Path(args.image_dir), Path(args.ann_dir)
+    shard_dir = Path(args.shard_dir) if args.shard_dir else root / "shards"
+
+    if not (shard_dir / "index.json").exists():
+        _, pack_sec = timed(pack_directory, image_dir, shard_dir, ann_dir, args.ann_ext)
+        print(f"shard 생성: {pack_sec:.2f}s → {shard_dir}")
+
+    for name, fn, fn_args in [("loose", read_loose, (image_dir, ann_dir, args.ann_ext, args.decode)),
+                              ("shard", read_shards, (shard_dir, args.decode))]:
+        rates = []
+        for _ in range(args.repeat):
+            n, sec = timed(fn, *fn_args)
+            rates.append(n / sec)
+        print(f"{name:>6}: {n} files, best {max(rates):10.1f} files/s, median {np.median(rates):10.1f} files/s")
+
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_dir", type=str, default=None)
+    parser.add_argument("--ann_dir", type=str, default=None)
+    parser.add_argument("--ann_ext", type=str, default=".json")
+    parser.add_argument("--shard_dir", type=str, default=None, help="이미 만든 shard 폴더 (없으면 임시 폴더에 생성)")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 이미지 수 (0 이면 --image_dir 사용)")
+    parser.add_argument("--decode", action="store_true", help="PNG 디코딩까지 포함해 측정")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not args.synthetic and not args.image_dir:
+        parser.error("--image_dir 또는 --synthetic 중 하나가 필요합니다.")
+    main(args)
@@ -0,0 +1,169 @@
+"""
+engine/box_matching.py (ErrorAnalyzer) 검증 + 시간 비교.
+
+- method="score": 이미지마다 Python 루프로 구현한 score 순 greedy 1:1 매칭과 결과(예측별 매칭 GT)가 같은지
+- method="optimal": 작은 이미지에서 모든 할당을 완전 탐색한 결과와 (같은 클래스 쌍 수, IoU 합) 이 같은지
+- 기존 compare_wrong_predictions.py 방식 (compute_iou 이중 루프, 첫 GT 매칭) 과 시간 비교
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/check_box_matching.py --images 2000 --seeds 0 1 2
+"""
+import os
+import sys
+import time
+import argparse
+import itertools
+import numpy as np
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from engine.box_matching import ErrorAnalyzer
+from engine.coco_map import box_iou
+
+
+def make_sample(rng, num_images, num_classes, image_size=640, max_gt=6):
+    preds, targets = [], []
+    for _ in range(num_images):
+        n_gt = rng.integers(0, max_gt + 1)
+        wh = rng.uniform(30, 160, size=(n_gt, 2))
+        xy = rng.uniform(0, image_size - 160, size=(n_gt, 2))
+        gt_boxes = np.concatenate([xy, xy + wh], axis=1)
+        gt_labels = rng.integers(0, num_classes, size=n_gt)
+
+        # GT 주변 예측 (위치 오차 + 클래스 혼동 + 중복) 과 무작위 FP
+        jitter = rng.normal(0, 0.12, size=(n_gt, 4)) * np.repeat(wh, 2, axis=1)
+        keep = rng.random(n_gt) < 0.85
+        boxes = [(gt_boxes + jitter)[keep], (gt_boxes - jitter * 0.7)[rng.random(n_gt) < 0.2]]
+        labels = [np.where(rng.random(n_gt) < 0.15, rng.integers(0, num_classes, size=n_gt), gt_labels)[keep]]
+        labels.append(rng.integers(0, num_classes, size=len(boxes[1])))
+        n_fp = rng.integers(0, 3)
+        fp_xy = rng.uniform(0, image_size - 100, size=(n_fp, 2))
+        boxes.append(np.concatenate([fp_xy, fp_xy + rng.uniform(10, 100, size=(n_fp, 2))], axis=1))
+        labels.append(rng.integers(0, num_classes, size=n_fp))
+        boxes = np.concatenate(boxes)
+        boxes[:, 2:] = np.maximum(boxes[:, 2:], boxes[:, :2] + 1)
+        preds.append({"boxes": boxes, "scores": rng.random(len(boxes)), "labels": np.concatenate(labels)})
+        targets.append({"boxes": gt_boxes, "labels": gt_labels})
+    return preds, targets
+
+
+def reference_score_matching(preds, targets, threshold):
+    # 이미지마다 score 순으로 아직 안 쓴 GT 중 IoU 최대 (동률이면 뒤 GT, pycocotools 와 같음)
+    matches = []
+    gt_offset = 0
+    for pred, target in zip(preds, targets):
+        order = np.argsort(-pred["scores"], kind="stable")
+        used = set()
+        for d in order:
+            best, best_iou = -1, -1.0
+            for g in range(len(target["labels"])):
+                if g in used:
+                    continue
+                iou = box_iou(pred["boxes"][d:d + 1], target["boxes"][g:g + 1])[0, 0]
+                if iou >= best_iou:
+                    best, best_iou = g, iou
+            if best >= 0 and best_iou >= threshold:
+                used.add(best)
+                matches.append(gt_offset + best)
+            else:
+                matches.append(-1)
+        gt_offset += len(target["labels"])
+    return np.array(matches, dtype=np.int64)
+
+
+def brute_force_best(iou, same_class, threshold):
+    # 가능한 모든 1:1 할당 중 (같은 클래스 쌍 수, IoU 합) 최대
+    n_det, n_gt = iou.shape
+    best = (0, 0.0)
+    for k in range(1, min(n_det, n_gt) + 1):
+        for dets in itertools.combinations(range(n_det), k):
+            for gts in itertools.permutations(range(n_gt), k):
+                pairs = [(d, g) for d, g in zip(dets, gts) if iou[d, g] >= threshold]
+                score = (sum(same_class[d, g] for d, g in pairs), round(sum(iou[d, g] for d, g in pairs), 9))
+                best = max(best, score)
+    return best
+
+
+def old_loop(preds, targets):
+    # 기존 compare_wrong_predictions.py: 예측마다 첫 번째 IoU ≥ 0.5 GT (1:1 아님)
+    def compute_iou(box1, box2):
+        x1, y1 = max(box1[0], box2[0]), max(box1[1], box2[1])
+        x2, y2 = min(box1[2], box2[2]), min(box1[3], box2[3])
+        inter = max(0, x2 - x1) * max(0, y2 - y1)
+        union = (box1[2] - box1[0]) * (box1[3] - box1[1]) + (box2[2] - box2[0]) * (box2[3] - box2[1]) - inter
+        return inter / union if union != 0 else 0
+
+    class_error = bbox_error = 0
+    for pred, target in zip(preds, targets):
+        used_gt = set()
+        for pb, pc in zip(pred["boxes"], pred["labels"]):
+            matched = False
+            for i, (gb, gc) in enumerate(zip(target["boxes"], target["labels"])):
+                if compute_iou(pb, gb) >= 0.5:
+                    class_error += int(pc) != int(gc)
+                    used_gt.add(i)
+                    matched = True
+                    break
+            bbox_error += not matched
+        bbox_error += len(target["boxes"]) - len(used_gt)
+    return class_error, bbox_error
+
+
+def main(args):
+    thresholds = (0.5, 0.75, 0.9)
+    for seed in args.seeds:
+        rng = np.random.default_rng(seed)
+        preds, targets = make_sample(rng, args.images, args.classes)
+
+        analyzer = ErrorAnalyzer(iou_thresholds=thresholds, method="score", num_classes=args.classes)
+        analyzer.update(preds, targets)
+        start = time.perf_counter()
+        results = analyzer.compute()
+        vectorized_time = time.perf_counter() - start
+        det_match = analyzer.match()[0]
+
+        for t, threshold in enumerate(thresholds):
+            reference = reference_score_matching(preds, targets, threshold)
+            assert np.array_equal(det_match[t], reference), f"score 매칭 불일치 (seed={seed}, iou={threshold})"
+
+        start = time.perf_counter()
+        old_class_error, old_bbox_error = old_loop(preds, targets)
+        loop_time = time.perf_counter() - start
+
+        # optimal: 작은 이미지만 완전 탐색과 비교
+        small_preds, small_targets = make_sample(rng, 150, 3, max_gt=3)
+        optimal = ErrorAnalyzer(iou_thresholds=(0.3, 0.5), method="optimal")
+        optimal.update(small_preds, small_targets)
+        match, det_labels, gt_labels, det_image, _ = optimal.match()
+        det_offset = gt_offset = 0
+        for pred, target in zip(small_preds, small_targets):
+            order = np.argsort(-pred["scores"], kind="stable")
+            boxes, labels = pred["boxes"][order], pred["labels"][order]
+            iou = box_iou(boxes, target["boxes"])
+            same_class = labels[:, None] == target["labels"][None, :]
+            for t, threshold in enumerate(optimal.iou_thresholds.tolist()):
+                local = match[t, det_offset:det_offset + len(labels)]
+                pairs = [(d, g - gt_offset) for d, g in enumerate(local.tolist()) if g >= 0]
+                ours = (sum(same_class[d, g] for d, g in pairs), round(sum(iou[d, g] for d, g in pairs), 9))
+                if len(labels) <= 6:
+                    assert ours == brute_force_best(iou, same_class, threshold), f"optimal 매칭 불일치 (seed={seed})"
+            det_offset += len(labels)
+            gt_offset += len(target["labels"])
+
+        r50 = {k: int(results[k][0]) for k in ("class_error", "false_positive", "missed")}
+        print(f"seed {seed}: 이미지 {args.images}장, 예측 {results['num_predictions']}개 / GT {results['num_targets']}개 — OK")
+        print(f"  IoU 0.5 / 0.75 / 0.9 class_error {results['class_error'].tolist()}, "
+              f"false_positive {results['false_positive'].tolist()}, missed {results['missed'].tolist()}")
+        print(f"  기존 이중 루프 (IoU 0.5 한 개, 1:1 아님): class_error {old_class_error}, bbox_error {old_bbox_error} "
+              f"/ 1:1 매칭: class_error {r50['class_error']}, bbox_error {r50['false_positive'] + r50['missed']}")
+        print(f"  시간: 이중 루프 {loop_time * 1000:.1f} ms (임계값 1개) vs ErrorAnalyzer {vectorized_time * 1000:.1f} ms "
+              f"(임계값 {len(thresholds)}개)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    main(parser.parse_args())
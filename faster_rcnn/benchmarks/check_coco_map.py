@@ -0,0 +1,101 @@
+"""
+engine/coco_map.py (COCOMeanAP) 와 torchmetrics MeanAveragePrecision(class_metrics=True) 비교.
+
+무작위로 만든 GT/예측(클래스 혼동, 위치 오차, 크기별 박스, 빈 이미지, 중복 박스 포함)에 대해
+모든 결과 key 가 허용 오차 안에서 같은지 확인하고 compute 시간을 함께 출력합니다.
+
+실행 (faster_rcnn/ 에서):
+    python benchmarks/check_coco_map.py --images 200 --seeds 0 1 2
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import torch
+from torchmetrics.detection.mean_ap import MeanAveragePrecision
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from engine.coco_map import COCOMeanAP
+
+
+def make_sample(rng, num_images, num_classes, image_size=640):
+    preds, targets = [], []
+    for _ in range(num_images):
+        n_gt = rng.integers(0, 6)
+        wh = rng.choice([16, 48, 160], size=(n_gt, 1)) * rng.uniform(0.6, 1.6, size=(n_gt, 2))
+        xy = rng.uniform(0, image_size - wh.max(initial=0), size=(n_gt, 2))
+        gt_boxes = np.concatenate([xy, xy + wh], axis=1)
+        gt_labels = rng.integers(1, num_classes, size=n_gt)
+
+        # GT 주변 예측 (위치 오차 + 일부 클래스 혼동 + 중복) 과 무작위 FP
+        jitter = rng.normal(0, 0.08, size=(n_gt, 4)) * np.repeat(wh, 2, axis=1)
+        det_boxes = [gt_boxes + jitter, gt_boxes + jitter[::-1] * 0.5]
+        det_labels = [np.where(rng.random(n_gt) < 0.15, rng.integers(1, num_classes, size=n_gt), gt_labels)] * 2
+        n_fp = rng.integers(0, 4)
+        fp_xy = rng.uniform(0, image_size - 100, size=(n_fp, 2))
+        det_boxes.append(np.concatenate([fp_xy, fp_xy + rng.uniform(10, 100, size=(n_fp, 2))], axis=1))
+        det_labels.append(rng.integers(1, num_classes, size=n_fp))
+        boxes = np.concatenate(det_boxes).astype(np.float32)
+        boxes[:, 2:] = np.maximum(boxes[:, 2:], boxes[:, :2] + 1)
+        labels = np.concatenate(det_labels)
+        scores = rng.random(len(labels)).astype(np.float32)
+        if rng.random() < 0.05:
+            scores[:] = 0.5  # 동점 score
+
+        preds.append({"boxes": torch.from_numpy(boxes), "scores": torch.from_numpy(scores),
+                      "labels": torch.from_numpy(labels).long()})
+        targets.append({"boxes": torch.from_numpy(gt_boxes.astype(np.float32)),
+                        "labels": torch.from_numpy(gt_labels).long()})
+    return preds, targets
+
+
+def compare(reference, ours, atol):
+    worst = 0.0
+    for key, ref_value in reference.items():
+        ref_value = np.atleast_1d(ref_value.cpu().numpy()).astype(np.float64)
+        our_value = np.atleast_1d(np.asarray(ours[key])).astype(np.float64)
+        if ref_value.shape != our_value.shape:
+            raise AssertionError(f"{key}: shape {ref_value.shape} != {our_value.shape}")
+        diff = float(np.abs(ref_value - our_value).max(initial=0))
+        worst = max(worst, diff)
+        if diff > atol:
+            raise AssertionError(f"{key}: 최대 오차 {diff:.2e} > {atol:.0e}\n  ref  {ref_value}\n  ours {our_value}")
+    return worst
+
+
+def main(args):
+    for seed in args.seeds:
+        rng = np.random.default_rng(seed)
+        preds, targets = make_sample(rng, args.images, args.num_classes)
+
+        metric = MeanAveragePrecision(class_metrics=True)
+        metric.update(preds, targets)
+        t0 = time.perf_counter()
+        reference = metric.compute()
+        t_ref = time.perf_counter() - t0
+
+        # torchmetrics 는 임계값을 float32 linspace 로 만들어 pycocotools 에 넘기므로 같은 값을 사용
+        # (recall 이 0.35 처럼 경계값에 정확히 걸리는 경우 float64 linspace 와 보간 결과가 달라짐)
+        evaluator = COCOMeanAP(iou_thresholds=metric.iou_thresholds, rec_thresholds=metric.rec_thresholds)
+        evaluator.update(preds, targets)
+        t0 = time.perf_counter()
+        ours = evaluator.compute()
+        t_ours = time.perf_counter() - t0
+
+        worst = compare(reference, ours, args.atol)
+        print(f"seed {seed}: {args.images} images, {len(ours['classes'])} classes | "
+              f"map {ours['map']:.4f} map_50 {ours['map_50']:.4f} | max diff {worst:.1e} | "
+              f"torchmetrics {t_ref:.2f}s vs COCOMeanAP {t_ours:.2f}s ({t_ref / max(t_ours, 1e-9):.1f}x)")
+    print("OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--atol", type=float, default=1e-5)
+    main(parser.parse_args())
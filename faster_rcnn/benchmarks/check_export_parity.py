@@ -0,0 +1,103 @@
+"""
+export 된 모델(TorchScript / ONNX)과 eager 체크포인트의 val set 결과 비교.
+
+1) 같은 val_loader 로 backend 마다 run_evaluation → mAP 차이
+2) 이미지별 detection 비교: score >= --min_score 인 eager detection 중 같은 라벨, IoU >= --iou,
+   |score 차| <= --score_tol 인 backend detection 이 있는 비율 (일치율)
+   (저신뢰 detection 은 NMS 경계에서 backend 간 순서가 쉽게 바뀌므로 제외)
+mAP 차이가 --map_tol 을 넘거나 일치율이 --min_agreement 보다 낮으면 종료 코드 1.
+
+실행 (faster_rcnn/ 에서):
+    python export.py --checkpoint checkpoints_3/epoch_50.pth --out_dir exported
+    python benchmarks/check_export_parity.py --checkpoint checkpoints_3/epoch_50.pth --export_dir exported
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Subset
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))  # faster_rcnn/
+sys.path.append(BASE_DIR)
+
+from engine.inference import InferenceEngine
+from engine.evaluator import run_evaluation
+from engine.coco_map import box_iou
+from dataset import FasterRCNNDataset, get_val_transform, collate_fn
+
+
+def collect(engine, loader):
+    outputs = []
+    for images, _ in loader:
+        outputs.extend({k: v.cpu().numpy() for k, v in o.items()} for o in engine(images))
+    return outputs
+
+
+def agreement(reference, candidate, iou_thr, score_tol, min_score):
+    matched = total = 0
+    for ref, cand in zip(reference, candidate):
+        keep = ref["scores"] >= min_score
+        ref = {k: v[keep] for k, v in ref.items()}
+        total += len(ref["boxes"])
+        if not len(ref["boxes"]) or not len(cand["boxes"]):
+            continue
+        ious = box_iou(ref["boxes"], cand["boxes"])
+        ok = (ious >= iou_thr) \
+            & (ref["labels"][:, None] == cand["labels"][None, :]) \
+            & (np.abs(ref["scores"][:, None] - cand["scores"][None, :]) <= score_tol)
+        matched += int(ok.any(axis=1).sum())
+    return (matched / total if total else 1.0), total
+
+
+def main(args):
+    val_df = pd.read_csv(args.val_csv)
+    dataset = FasterRCNNDataset(val_df, image_dir=args.image_dir, transforms=get_val_transform(args.image_size))
+    if args.limit:
+        dataset = Subset(dataset, range(min(args.limit, len(dataset))))
+    loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=False, collate_fn=collate_fn)
+
+    stem = os.path.splitext(os.path.basename(args.checkpoint))[0]
+    paths = {"eager": args.checkpoint,
+             "torchscript": os.path.join(args.export_dir, f"{stem}.pt"),
+             "onnx": os.path.join(args.export_dir, f"{stem}.onnx")}
+    device = torch.device("cpu")
+
+    engines = {b: InferenceEngine(p, backend=b, device=device, num_classes=args.num_classes)
+               for b, p in paths.items() if b == "eager" or os.path.exists(p)}
+    results = {b: run_evaluation(e, loader, device) for b, e in engines.items()}
+    reference_outputs = collect(engines["eager"], loader)
+
+    failed = False
+    print(f"\n{len(dataset)} val images")
+    for backend in engines:
+        if backend == "eager":
+            continue
+        map_delta = results[backend]["val/map"] - results["eager"]["val/map"]
+        map50_delta = results[backend]["val/map_50"] - results["eager"]["val/map_50"]
+        agree, compared = agreement(reference_outputs, collect(engines[backend], loader),
+                                    args.iou, args.score_tol, args.min_score)
+        ok = abs(map_delta) <= args.map_tol and agree >= args.min_agreement
+        failed |= not ok
+        print(f"[{backend}] mAP delta {map_delta:+.5f}, mAP50 delta {map50_delta:+.5f}, "
+              f"detection 일치율 {agree:.4f} ({compared}개) → {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument("--export_dir", type=str, default="exported")
+    parser.add_argument("--val_csv", type=str, default="data/val_df.csv")
+    parser.add_argument("--image_dir", type=str, default="val_images")
+    parser.add_argument("--image_size", type=int, default=640)
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 N 장만 비교")
+    parser.add_argument("--map_tol", type=float, default=1e-3)
+    parser.add_argument("--min_score", type=float, default=0.3)
+    parser.add_argument("--iou", type=float, default=0.99)
+    parser.add_argument("--score_tol", type=float, default=1e-3)
+    parser.add_argument("--min_agreement", type=float, default=0.99)
+    main(parser.parse_args())
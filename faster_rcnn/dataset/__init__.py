@@ -1,2 +1,4 @@
-from .faster_rcnn_dataset import FasterRCNNDataset, collate_fn
-from .transforms import get_train_transform, get_val_transform
+from .faster_rcnn_dataset import FasterRCNNDataset, collate_fn, worker_init_fn, loader_kwargs
+from .transforms import get_train_transform, get_val_transform, get_collage_transform
+from .image_cache import DecodedImageCache
+from .collage import CropBank, OnlineCollageDataset
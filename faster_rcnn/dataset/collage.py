@@ -0,0 +1,166 @@
+"""
+crop 콜라주 합성: 클래스 가중치 샘플링 + occupancy grid 배치, 학습 중 바로 합성하는 데이터셋.
+
+- plan_collages (engine/collage_planner.py): crop 목록으로 콜라주 배치 계획을 만든다 (이미지 I/O 없음).
+  yolov11/scripts/generate_collages.py (디스크에 저장) 와 OnlineCollageDataset (학습 중 합성) 이 같이 사용
+- CropBank: crop_balancer.py 와 같은 부족분 규칙으로 고른 crop 을 메모리에 보관 (원본 이미지는 장당 한 번만 디코딩)
+- OnlineCollageDataset: CropBank 로 콜라주를 합성해 FasterRCNNDataset 과 같은 형식으로 반환
+"""
+import os
+import random
+from itertools import groupby
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset, get_worker_info
+
+from engine.collage_planner import plan_collages, CANVAS_SIZE
+from .faster_rcnn_dataset import FasterRCNNDataset
+
+
+def balance_indices(labels, target_count, max_iter=50):
+    """crop_balancer.py 와 같은 규칙: 어노테이션 수가 target_count 미만인 클래스만 부족분만큼 어노테이션을 배정.
+
+    클래스 안에서는 어노테이션 순서대로 돌아가며 (최대 max_iter 바퀴) 같은 어노테이션이 여러 번 나올 수 있다.
+    반환: 어노테이션 행 번호 배열
+    """
+    labels = np.asarray(labels)
+    rows = []
+    for label in np.unique(labels):
+        class_rows = np.flatnonzero(labels == label)
+        n_take = max(0, min(target_count - len(class_rows), len(class_rows) * max_iter))
+        rows.append(class_rows[np.arange(n_take) % len(class_rows)])
+    return np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+
+
+class CropBank:
+    """콜라주 합성용 crop 을 메모리에 보관.
+
+    crops: HWC uint8 RGB 배열 (어노테이션당 1개), entries: plan_collages 에 넘길 (label, name, label, w, h, crop 번호) 목록.
+    부족분을 채우려고 같은 crop 이 entries 에 여러 번 들어갈 수 있다 (배열은 공유).
+    """
+
+    def __init__(self, crops, entries):
+        if not entries:
+            raise ValueError("crop bank 가 비어 있습니다 (target_count 미만인 클래스 없음 또는 유효한 bbox 없음)")
+        self.crops = crops
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def from_annotations(cls, image_ids, boxes, labels, read_image, target_count=None, max_iter=50):
+        """image_ids[N] (어노테이션별 이미지 번호), boxes[N, 4] (x1, y1, x2, y2), labels[N]
+        read_image(image_id) → HWC uint8 RGB. target_count 가 None 이면 모든 어노테이션을 한 번씩 사용."""
+        image_ids, boxes, labels = np.asarray(image_ids), np.asarray(boxes), np.asarray(labels)
+        rows = np.arange(len(labels)) if target_count is None else balance_indices(labels, target_count, max_iter)
+
+        # 원본 이미지는 장당 한 번만 디코딩
+        crop_of_row = {}
+        crops = []
+        for image_id, group in groupby(sorted(set(rows.tolist()), key=lambda r: image_ids[r]), key=lambda r: image_ids[r]):
+            image = read_image(image_id)
+            height, width = image.shape[:2]
+            for row in group:
+                x1, y1, x2, y2 = boxes[row].astype(np.int64).tolist()
+                x1, y1, x2, y2 = max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                crop_of_row[row] = len(crops)
+                crops.append(np.ascontiguousarray(image[y1:y2, x1:x2]))
+
+        entries = []
+        for row in rows.tolist():
+            if row in crop_of_row:
+                crop = crops[crop_of_row[row]]
+                label = int(labels[row])
+                entries.append((label, f"row{row}", label, crop.shape[1], crop.shape[0], crop_of_row[row]))
+        return cls(crops, entries)
+
+    @classmethod
+    def from_dataset(cls, dataset, target_count=None, max_iter=50):
+        """FasterRCNNDataset 의 어노테이션 인덱스로 crop bank 생성 (label 은 dataset 의 label 그대로)."""
+        image_ids = np.repeat(np.arange(len(dataset)), np.diff(dataset.offsets))
+        return cls.from_annotations(image_ids, dataset.boxes, dataset.labels, dataset._read_image,
+                                    target_count=target_count, max_iter=max_iter)
+
+
+class OnlineCollageDataset(Dataset):
+    """CropBank 로 콜라주를 학습 중에 바로 합성하는 데이터셋 (crop / 콜라주 / 증강 결과를 디스크에 쓰지 않음).
+
+    worker 마다 plan_collages 로 crop bank 를 한 바퀴씩 (비복원) 돌며 콜라주를 만들고, 다 쓰면 다시 처음부터.
+    idx 는 사용하지 않으며 길이(length)는 epoch 당 콜라주 수.
+    합성 → image_size 로 축소 → augment (예: get_collage_transform("pascal_voc", "labels")) → transforms 순서.
+    반환 형식은 FasterRCNNDataset 과 같음: (image, {"boxes": [N, 4] (x1, y1, x2, y2), "labels": [N]})
+    """
+
+    def __init__(self, bank, length, transforms=None, augment=None, image_size=640, canvas_size=CANVAS_SIZE, seed=0):
+        self.bank = bank
+        self.length = length
+        self.transforms = transforms
+        self.augment = augment
+        self.image_size = image_size
+        self.canvas_size = canvas_size
+        self.seed = seed
+        self._pid = None
+        self._plan = None
+
+    def __len__(self):
+        return self.length
+
+    def __getstate__(self):
+        # worker 로 넘어갈 때 진행 중인 generator 는 버리고 worker 에서 새로 시작
+        state = self.__dict__.copy()
+        state["_pid"], state["_plan"] = None, None
+        return state
+
+    def _next_placed(self):
+        if self._pid != os.getpid():
+            # worker 안에서는 torch.initial_seed() 가 epoch / worker 마다 달라짐 (DataLoader 가 정함)
+            info = get_worker_info()
+            base = torch.initial_seed() % 2 ** 32 if info is not None else 0
+            seed = int(np.random.SeedSequence([self.seed, base]).generate_state(1)[0])
+            self._rng = random.Random(seed)
+            self._plan = None
+            self._pid = os.getpid()
+
+        for _ in range(2):
+            if self._plan is None:
+                self._plan = plan_collages(self.bank.entries, self._rng, self.canvas_size)
+            try:
+                return next(self._plan)
+            except StopIteration:
+                self._plan = None
+        raise RuntimeError("crop bank 로 콜라주를 만들 수 없습니다 (crop 3개 미만)")
+
+    def sample(self):
+        """콜라주 1장: (HWC uint8 RGB [image_size, image_size], boxes[N, 4] float32 x1y1x2y2, labels[N] int64)"""
+        canvas = np.full((self.canvas_size, self.canvas_size, 3), 255, dtype=np.uint8)
+        boxes, labels = [], []
+        for (label, _, _, w, h, crop_index), x, y in self._next_placed():
+            canvas[y:y + h, x:x + w] = self.bank.crops[crop_index]
+            boxes.append([x, y, x + w, y + h])
+            labels.append(label)
+
+        scale = self.image_size / self.canvas_size
+        image = cv2.resize(canvas, (self.image_size, self.image_size), interpolation=cv2.INTER_AREA) \
+            if scale != 1 else canvas
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) * scale
+        labels = np.asarray(labels, dtype=np.int64)
+
+        if self.augment is not None:
+            try:
+                augmented = self.augment(image=image, bboxes=boxes, labels=labels)
+                image = augmented["image"].astype(np.uint8)
+                boxes = np.asarray(augmented["bboxes"], dtype=np.float32).reshape(-1, 4)
+                labels = np.asarray(augmented["labels"], dtype=np.int64)
+            except ValueError:
+                pass  # 회전으로 bbox 가 범위를 벗어나는 등 증강 실패 시 증강 없이 사용
+        return image, boxes, labels
+
+    def __getitem__(self, idx):
+        image, boxes, labels = self.sample()
+        # transforms 적용 / tensor 변환은 FasterRCNNDataset 과 동일
+        return FasterRCNNDataset._finalize(self, image, boxes, labels)
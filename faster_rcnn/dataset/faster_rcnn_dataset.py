@@ -1,55 +1,162 @@
+import random
+import numpy as np
+import pandas as pd
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, get_worker_info
 from pathlib import Path
 import cv2
 from albumentations.pytorch import ToTensorV2
 
+from .image_cache import DecodedImageCache, letterbox
+from .shards import ShardReader
+
+
+def build_annotation_index(df):
+    """image_name 기준으로 어노테이션을 한 번만 묶어 NumPy 배열로 만든다.
+
+    반환값: (image_names, boxes[N, 4] (x1, y1, x2, y2), labels[N], offsets[M + 1])
+    i번째 이미지의 어노테이션은 boxes[offsets[i]:offsets[i + 1]] 이다.
+    """
+    # train_df.csv 헤더가 "label " 처럼 공백을 포함하는 경우가 있어 컬럼명을 정리
+    df = df.rename(columns=lambda c: c.strip())
+
+    # factorize 는 unique() 와 같은 첫 등장 순서를 유지
+    codes, image_names = pd.factorize(df["image_name"], sort=False)
+    order = np.argsort(codes, kind="stable")
+
+    xywh = df[["x", "y", "w", "h"]].to_numpy(dtype=np.float32)[order]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2]
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:]
+    labels = df["label"].to_numpy(dtype=np.int64)[order]
+
+    counts = np.bincount(codes, minlength=len(image_names))
+    offsets = np.zeros(len(image_names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    return np.asarray(image_names, dtype=object), boxes, labels, offsets
+
 
 class FasterRCNNDataset(Dataset):
-    def __init__(self, df, image_dir, transforms=None):
-        self.df = df
+    """cache_dir 를 주면 letterbox(image_size) 까지 끝난 이미지를 memmap 캐시에서 읽는다.
+    이때 transforms 는 resize=False 로 만든 것(랜덤 증강 + 정규화만)을 넘겨야 한다.
+    shard_dir 를 주면 image_dir 의 개별 파일 대신 shard(dataset/shards.py) 에서 이미지를 읽는다.
+
+    파일이 없는 이미지는 생성 시점에 한 번만 확인해 제외한다 (worker 에서 print/재귀 없음)."""
+
+    def __init__(self, df, image_dir, transforms=None, cache_dir=None, image_size=640, cache_max_bytes=None,
+                 shard_dir=None):
         self.image_dir = Path(image_dir)
-        self.image_names = df["image_name"].unique()
         self.transforms = transforms
+        self.image_size = image_size
+        self.shards = ShardReader(shard_dir) if shard_dir is not None else None
+
+        df = self._drop_missing(df)
+        self.image_names, self.boxes, self.labels, self.offsets = build_annotation_index(df)
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = DecodedImageCache(cache_dir, self.image_dir, self.image_names,
+                                           image_size=image_size, max_bytes=cache_max_bytes,
+                                           source_fingerprint=self.shards.fingerprint() if self.shards else None)
+
+    def _drop_missing(self, df):
+        names = df["image_name"].unique()
+        if self.shards is not None:
+            missing = [name for name in names if name not in self.shards]
+        else:
+            missing = [name for name in names if not (self.image_dir / name).exists()]
+
+        if missing:
+            print(f"[경고] 이미지 파일 없음 {len(missing)}/{len(names)}개 → 데이터셋에서 제외 (예: {missing[0]})")
+            df = df[~df["image_name"].isin(missing)]
+        return df
 
     def __len__(self):
         return len(self.image_names)
 
-    def __getitem__(self, idx):
-        image_name = self.image_names[idx]
-        rows = self.df[self.df["image_name"] == image_name]
-        img_path = self.image_dir / image_name
+    def get_annotations(self, idx):
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return self.boxes[start:end], self.labels[start:end]
 
-        if not img_path.exists():
-            print(f"[경고] 이미지 파일 없음: {img_path}")
-            return self.__getitem__((idx + 1) % len(self))
+    def _read_image(self, idx):
+        # 생성 시 존재 여부는 확인했으므로 여기서 실패하면 손상된 파일 → 조용히 건너뛰지 않고 예외
+        if self.shards is not None:
+            source = f"shard:{self.image_names[idx]}"
+            image = self.shards.get(self.image_names[idx]).decode_image()
+        else:
+            source = self.image_dir / self.image_names[idx]
+            image = cv2.imread(str(source))
 
-        image = cv2.imread(str(img_path))
         if image is None:
-            print(f"[경고] 이미지 로드 실패 (None): {img_path}")
-            return self.__getitem__((idx + 1) % len(self))
+            raise RuntimeError(f"이미지 로드 실패 (None): {source}")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def __getitem__(self, idx):
+        boxes, labels = self.get_annotations(idx)
 
-        bboxes = []
-        labels = []
-        for _, row in rows.iterrows():
-            x, y, w, h = row["x"], row["y"], row["w"], row["h"]
-            bboxes.append([x, y, x + w, y + h])
-            labels.append(int(row["label"]))
+        if self.cache is None:
+            return self._finalize(self._read_image(idx), boxes, labels)
 
+        # 캐시 hit 이면 디코딩/리사이즈 없이 memmap view 를 그대로 사용
+        cached = self.cache.get(idx)
+        if cached is None:
+            image, geometry = letterbox(self._read_image(idx), self.image_size)
+            self.cache.put(idx, image, geometry)
+        else:
+            image, geometry = cached
+
+        scale_x, scale_y, pad_x, pad_y = geometry
+        boxes = boxes * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32) \
+            + np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        return self._finalize(image, boxes, labels)
+
+    def _finalize(self, image, boxes, labels):
         if self.transforms:
-            transformed = self.transforms(image=image, bboxes=bboxes, labels=labels)
+            transformed = self.transforms(image=image, bboxes=boxes, labels=labels)
             image = transformed["image"]
-            bboxes = torch.tensor(transformed["bboxes"], dtype=torch.float32)
-            labels = torch.tensor(transformed["labels"], dtype=torch.int64)
+            bboxes = torch.as_tensor(np.asarray(transformed["bboxes"], dtype=np.float32).reshape(-1, 4))
+            labels = torch.as_tensor(np.asarray(transformed["labels"], dtype=np.int64))
         else:
+            if not image.flags.writeable:
+                image = image.copy()
             image = ToTensorV2()(image=image)["image"]
-            bboxes = torch.tensor(bboxes, dtype=torch.float32)
-            labels = torch.tensor(labels, dtype=torch.int64)
+            bboxes = torch.from_numpy(boxes.copy())
+            labels = torch.from_numpy(labels.copy())
 
         target = {"boxes": bboxes, "labels": labels}
         return image, target
 
 def collate_fn(batch):
     return tuple(zip(*batch))
+
+def worker_init_fn(worker_id):
+    # worker 마다 서로 다른 시드로 random / numpy / albumentations 증강 RNG 를 초기화
+    # (fork 된 worker 들이 같은 RNG 상태를 복사해 동일한 증강을 만드는 문제 방지)
+    seed = torch.initial_seed() % 2 ** 32
+    random.seed(seed)
+    np.random.seed(seed)
+
+    info = get_worker_info()
+    if info is None:
+        return
+    # ConcatDataset (예: 원본 + OnlineCollageDataset) 이면 하위 데이터셋마다 적용
+    for dataset in getattr(info.dataset, "datasets", [info.dataset]):
+        for transforms in (getattr(dataset, "transforms", None), getattr(dataset, "augment", None)):
+            if hasattr(transforms, "set_random_seed"):  # albumentations >= 1.4.x 의 Compose 자체 RNG
+                transforms.set_random_seed(seed)
+
+def loader_kwargs(loader_cfg=None):
+    """ftrcnn_config.yaml 의 loader 섹션 → DataLoader 키워드 인자."""
+    loader_cfg = loader_cfg or {}
+    num_workers = loader_cfg.get("num_workers", 0)
+    kwargs = {
+        "num_workers": num_workers,
+        "pin_memory": loader_cfg.get("pin_memory", True) and torch.cuda.is_available(),
+        "collate_fn": collate_fn,
+    }
+    # persistent_workers / prefetch_factor 는 num_workers > 0 일 때만 허용됨
+    if num_workers > 0:
+        kwargs["worker_init_fn"] = worker_init_fn
+        kwargs["persistent_workers"] = loader_cfg.get("persistent_workers", True)
+        kwargs["prefetch_factor"] = loader_cfg.get("prefetch_factor", 2)
+    return kwargs
@@ -0,0 +1,145 @@
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 캐시 레이아웃/전처리 방식이 바뀌면 올려서 기존 캐시를 무효화
+CACHE_VERSION = 1
+
+
+def letterbox(image, image_size):
+    """LongestMaxSize(image_size) + PadIfNeeded(image_size, image_size, border_mode=0) 와 같은 전처리.
+
+    반환값: (image_size x image_size uint8 이미지, (scale_x, scale_y, pad_x, pad_y))
+    """
+    h, w = image.shape[:2]
+    scale = image_size / max(h, w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_y = (image_size - new_h) // 2
+    pad_x = (image_size - new_w) // 2
+    canvas = np.zeros((image_size, image_size, 3), dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image
+    return canvas, (new_w / w, new_h / h, pad_x, pad_y)
+
+
+def compute_fingerprint(image_dir, image_names, image_size, source_fingerprint=None):
+    # 원본 이미지의 크기/mtime 과 target size 가 하나라도 바뀌면 fingerprint 가 달라짐
+    h = hashlib.sha1()
+    h.update(f"v{CACHE_VERSION}|{image_size}".encode())
+    if source_fingerprint is not None:
+        # shard 처럼 개별 파일이 없는 소스는 소스 전체의 fingerprint + 이미지 순서로 판단
+        h.update(source_fingerprint.encode())
+        h.update("|".join(image_names).encode())
+        return h.hexdigest()
+    for name in image_names:
+        try:
+            st = os.stat(Path(image_dir) / name)
+            h.update(f"|{name}:{st.st_size}:{st.st_mtime_ns}".encode())
+        except FileNotFoundError:
+            h.update(f"|{name}:missing".encode())
+    return h.hexdigest()
+
+
+class DecodedImageCache:
+    """디코딩 + RGB 변환 + letterbox 까지 끝난 uint8 이미지를 memmap 파일에 저장하는 캐시.
+
+    - 첫 epoch 에서 읽은 이미지를 채워 넣고, 이후 epoch 은 memmap view 를 그대로 읽는다.
+    - DataLoader worker 는 각자 파일을 다시 열기 때문에 OS page cache 를 공유한다 (zero-copy).
+    - max_bytes 를 넘는 이미지는 캐시하지 않고 매번 디코딩한다.
+    - 원본 이미지나 image_size 가 바뀌면 fingerprint 불일치로 자동 재생성된다.
+    """
+
+    def __init__(self, cache_dir, image_dir, image_names, image_size=640, max_bytes=None, source_fingerprint=None):
+        self.cache_dir = Path(cache_dir)
+        self.image_size = image_size
+        self.num_images = len(image_names)
+
+        item_bytes = image_size * image_size * 3
+        capacity = self.num_images
+        if max_bytes is not None:
+            capacity = min(capacity, int(max_bytes) // item_bytes)
+        self.capacity = capacity
+
+        fingerprint = compute_fingerprint(image_dir, image_names, image_size, source_fingerprint)
+        meta = self._read_meta()
+        if meta is None or meta.get("fingerprint") != fingerprint or meta.get("capacity") != capacity:
+            if meta is not None:
+                print(f"[캐시] 원본/설정 변경 감지 → 캐시 재생성: {self.cache_dir}")
+            self._create(fingerprint)
+
+        self._pid = None
+        self._images = self._geometry = self._filled = None
+
+    # --- 파일 관리 ---
+    @property
+    def _meta_path(self):
+        return self.cache_dir / "meta.json"
+
+    def _read_meta(self):
+        if not self._meta_path.exists():
+            return None
+        with open(self._meta_path, "r") as f:
+            return json.load(f)
+
+    def _create(self, fingerprint):
+        self.clear()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        shape = (max(self.capacity, 1), self.image_size, self.image_size, 3)
+        np.lib.format.open_memmap(self.cache_dir / "images.npy", mode="w+", dtype=np.uint8, shape=shape).flush()
+        np.lib.format.open_memmap(self.cache_dir / "geometry.npy", mode="w+", dtype=np.float32, shape=(shape[0], 4)).flush()
+        np.lib.format.open_memmap(self.cache_dir / "filled.npy", mode="w+", dtype=np.uint8, shape=(shape[0],)).flush()
+        with open(self._meta_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "capacity": self.capacity,
+                       "image_size": self.image_size, "num_images": self.num_images}, f)
+
+    def clear(self):
+        """캐시 파일을 모두 삭제 (수동 무효화)."""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+        self._images = self._geometry = self._filled = None
+
+    def _open(self):
+        # worker 프로세스마다 memmap 을 새로 연다 (fork 된 핸들을 공유하지 않도록)
+        if self._pid != os.getpid() or self._images is None:
+            self._images = np.load(self.cache_dir / "images.npy", mmap_mode="r+")
+            self._geometry = np.load(self.cache_dir / "geometry.npy", mmap_mode="r+")
+            self._filled = np.load(self.cache_dir / "filled.npy", mmap_mode="r+")
+            self._pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pid"] = None
+        state["_images"] = state["_geometry"] = state["_filled"] = None
+        return state
+
+    # --- 조회/저장 ---
+    def get(self, idx):
+        """캐시 hit 이면 (읽기 전용 이미지 view, geometry), miss 면 None."""
+        if idx >= self.capacity:
+            return None
+        self._open()
+        if not self._filled[idx]:
+            return None
+        image = self._images[idx].view(np.ndarray)
+        image.flags.writeable = False
+        return image, tuple(self._geometry[idx].tolist())
+
+    def put(self, idx, image, geometry):
+        if idx >= self.capacity:
+            return
+        self._open()
+        self._images[idx] = image
+        self._geometry[idx] = geometry
+        # 이미지/geometry 를 먼저 쓰고 마지막에 filled 플래그를 세운다
+        self._filled[idx] = 1
+
+    def __len__(self):
+        self._open()
+        return int(self._filled[:self.capacity].sum())
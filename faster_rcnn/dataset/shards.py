@@ -0,0 +1,260 @@
+"""
+이미지 + 어노테이션 묶음(shard) 포맷.
+
+작은 PNG/JSON/TXT 파일 수천 개 대신 큰 파일 몇 개에 순차적으로 기록합니다.
+shard 하나의 구조:
+
+    [MAGIC 8B][record 0 image][record 0 annotation][record 1 image]...[index JSON][index offset 8B][MAGIC 8B]
+
+- record 는 인코딩된 이미지 바이트(PNG/JPG 원본 그대로)와 어노테이션 바이트(JSON/TXT 원문)
+- 파일 끝의 index JSON 에 key(파일 stem) → offset/length 가 기록됨
+- shard_dir/index.json 에 shard 파일 목록과 파일별 record 수, 원본 폴더의 파일 수/최신 mtime(source)이 기록됨
+  (is_shard_current 로 원본에 파일이 추가/수정/삭제되었는지 확인)
+
+읽기는 mmap 으로 하며 record 를 꺼낼 때 복사 없이 memoryview 를 돌려줍니다.
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MAGIC = b"PILLSHD1"
+FOOTER = struct.Struct("<Q8s")  # index offset, magic
+DEFAULT_SHARD_BYTES = 1 << 30   # 1 GiB
+
+
+class ShardWriter:
+    def __init__(self, out_dir, prefix="shard", max_shard_bytes=DEFAULT_SHARD_BYTES):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+
+        self.shards = []
+        self._file = None
+        self._entries = None
+        self._keys = set()
+        self.source = None  # 원본 폴더 fingerprint (source_fingerprint), 다 쓴 뒤에 설정
+
+    def _open_next(self):
+        self._close_current()
+        name = f"{self.prefix}-{len(self.shards):05d}.bin"
+        self._file = open(self.out_dir / name, "wb")
+        self._file.write(MAGIC)
+        self._entries = []
+        self.shards.append({"file": name, "count": 0})
+
+    def _close_current(self):
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        self._file.write(json.dumps(self._entries, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._file.write(FOOTER.pack(index_offset, MAGIC))
+        self._file.close()
+        self.shards[-1]["count"] = len(self._entries)
+        self.shards[-1]["bytes"] = (self.out_dir / self.shards[-1]["file"]).stat().st_size
+        self._file = None
+
+    def add(self, key, image_bytes, ann_bytes=b"", image_ext=".png", ann_ext=".json"):
+        if key in self._keys:
+            raise ValueError(f"중복 key: {key}")
+        if self._file is None or self._file.tell() + len(image_bytes) + len(ann_bytes) > self.max_shard_bytes:
+            self._open_next()
+
+        img_offset = self._file.tell()
+        self._file.write(image_bytes)
+        ann_offset = self._file.tell()
+        self._file.write(ann_bytes)
+
+        self._entries.append([key, image_ext, img_offset, len(image_bytes), ann_ext, ann_offset, len(ann_bytes)])
+        self._keys.add(key)
+
+    def close(self):
+        self._close_current()
+        index = {"magic": MAGIC.decode(), "shards": self.shards}
+        if self.source is not None:
+            index["source"] = self.source
+        with open(self.out_dir / "index.json", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardRecord:
+    __slots__ = ("key", "image_ext", "ann_ext", "_buf", "_img", "_ann")
+
+    def __init__(self, key, image_ext, ann_ext, buf, img, ann):
+        self.key, self.image_ext, self.ann_ext = key, image_ext, ann_ext
+        self._buf, self._img, self._ann = buf, img, ann
+
+    @property
+    def image_name(self):
+        return self.key + self.image_ext
+
+    @property
+    def has_annotation(self):
+        return self._ann[1] > 0
+
+    @property
+    def image_bytes(self):
+        offset, length = self._img
+        return self._buf[offset:offset + length]
+
+    @property
+    def ann_bytes(self):
+        offset, length = self._ann
+        return self._buf[offset:offset + length]
+
+    def decode_image(self, flags=cv2.IMREAD_COLOR):
+        # cv2.imread 와 동일하게 BGR ndarray 반환 (실패 시 None)
+        return cv2.imdecode(np.frombuffer(self.image_bytes, dtype=np.uint8), flags)
+
+    def ann_text(self):
+        return bytes(self.ann_bytes).decode("utf-8")
+
+    def ann_json(self):
+        return json.loads(self.ann_text())
+
+
+class ShardReader:
+    """shard_dir 안의 shard 를 mmap 으로 열고 key(파일 stem) 또는 순서대로 record 를 읽는다.
+
+    DataLoader worker 로 넘어갈 때는 mmap 을 다시 연다.
+    """
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "index.json", "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self._pid = None
+        self._maps = None
+        self._open()
+
+    def _open(self):
+        if self._pid == os.getpid() and self._maps is not None:
+            return
+        self._maps, self._entries = [], []
+        self._lookup = {}
+        for shard_id, shard in enumerate(self.manifest["shards"]):
+            with open(self.shard_dir / shard["file"], "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            index_offset, magic = FOOTER.unpack_from(buf, len(buf) - FOOTER.size)
+            if magic != MAGIC or buf[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"shard 포맷 오류: {shard['file']}")
+            entries = json.loads(bytes(buf[index_offset:len(buf) - FOOTER.size]).decode("utf-8"))
+            self._maps.append(memoryview(buf))
+            for pos, entry in enumerate(entries):
+                self._lookup[entry[0]] = (shard_id, pos)
+            self._entries.append(entries)
+        self._pid = os.getpid()
+
+    def __getstate__(self):
+        return {"shard_dir": self.shard_dir, "manifest": self.manifest, "_pid": None, "_maps": None}
+
+    def __len__(self):
+        self._open()
+        return len(self._lookup)
+
+    def __contains__(self, key):
+        self._open()
+        return _stem(key) in self._lookup
+
+    def keys(self):
+        self._open()
+        return [entry[0] for entries in self._entries for entry in entries]
+
+    def _record(self, shard_id, pos):
+        key, image_ext, img_off, img_len, ann_ext, ann_off, ann_len = self._entries[shard_id][pos]
+        return ShardRecord(key, image_ext, ann_ext, self._maps[shard_id], (img_off, img_len), (ann_off, ann_len))
+
+    def get(self, key):
+        """key 는 파일 stem 또는 확장자를 포함한 파일명. 없으면 None."""
+        self._open()
+        loc = self._lookup.get(_stem(key))
+        return None if loc is None else self._record(*loc)
+
+    def __iter__(self):
+        # 파일에 기록된 순서대로 순차 읽기
+        self._open()
+        for shard_id, entries in enumerate(self._entries):
+            for pos in range(len(entries)):
+                yield self._record(shard_id, pos)
+
+    def fingerprint(self):
+        # shard 파일 크기/mtime 기반 (DecodedImageCache 무효화용)
+        h = hashlib.sha1()
+        for shard in self.manifest["shards"]:
+            st = os.stat(self.shard_dir / shard["file"])
+            h.update(f"{shard['file']}:{st.st_size}:{st.st_mtime_ns}|".encode())
+        return h.hexdigest()
+
+
+def _stem(name):
+    return os.path.splitext(name)[0] if "." in name else name
+
+
+def source_fingerprint(image_dir, ann_dir=None, ann_ext=".json", image_exts=(".png", ".jpg", ".jpeg")):
+    """원본 폴더의 이미지/어노테이션 파일 수와 가장 최근 mtime. 파일 추가/수정/삭제 시 값이 바뀐다."""
+    files, latest = 0, 0
+    for directory, exts in ((image_dir, tuple(image_exts)), (ann_dir, (ann_ext,))):
+        if directory is None or not Path(directory).exists():
+            continue
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.lower().endswith(exts):
+                    files += 1
+                    latest = max(latest, entry.stat().st_mtime_ns)
+    return {"files": files, "latest_mtime_ns": latest}
+
+
+def is_shard_current(shard_dir, image_dir, ann_dir=None, ann_ext=".json"):
+    """shard 를 원본 개별 파일 대신 써도 되는지.
+
+    원본 폴더가 없으면 shard 가 유일한 사본이므로 True. 원본이 있으면 pack 할 때 기록한 source 와
+    현재 원본 폴더가 같을 때만 True (source 가 없는 예전 shard 는 확인할 수 없으므로 False).
+    """
+    index_path = Path(shard_dir) / "index.json"
+    if not index_path.exists():
+        return False
+    if not Path(image_dir).exists():
+        return True
+    with open(index_path, "r", encoding="utf-8") as f:
+        recorded = json.load(f).get("source")
+    return recorded is not None and recorded == source_fingerprint(image_dir, ann_dir, ann_ext)
+
+
+def pack_directory(image_dir, out_dir, ann_dir=None, ann_ext=".json",
+                   image_exts=(".png", ".jpg", ".jpeg"), max_shard_bytes=DEFAULT_SHARD_BYTES):
+    """image_dir (+ ann_dir 의 같은 stem 어노테이션) 를 shard 로 묶는다. 기록한 record 수를 반환."""
+    image_dir = Path(image_dir)
+    # 읽기 전에 fingerprint → pack 도중 바뀐 파일이 있으면 다음 확인에서 stale 로 잡힘
+    source = source_fingerprint(image_dir, ann_dir, ann_ext, image_exts)
+    image_files = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(image_exts))
+
+    count = 0
+    with ShardWriter(out_dir, max_shard_bytes=max_shard_bytes) as writer:
+        for img_file in image_files:
+            stem, image_ext = os.path.splitext(img_file)
+            with open(image_dir / img_file, "rb") as f:
+                image_bytes = f.read()
+
+            ann_bytes = b""
+            if ann_dir is not None:
+                ann_path = Path(ann_dir) / (stem + ann_ext)
+                if ann_path.exists():
+                    with open(ann_path, "rb") as f:
+                        ann_bytes = f.read()
+
+            writer.add(stem, image_bytes, ann_bytes, image_ext=image_ext, ann_ext=ann_ext)
+            count += 1
+        writer.source = source  # 중간에 실패하면 source 없이 닫혀서 stale 로 취급됨
+    return count
@@ -1,11 +1,16 @@
 import albumentations as A
 from albumentations.pytorch import ToTensorV2
 
-def get_train_transform(image_size=640):
-    return A.Compose([
+def get_resize_transforms(image_size=640):
+    # 결정적인 전처리 구간: DecodedImageCache 를 쓰면 이 구간은 캐시에서 이미 적용된 상태
+    return [
         A.LongestMaxSize(max_size=image_size),
         A.PadIfNeeded(min_height=image_size, min_width=image_size, border_mode=0),
+    ]
 
+def get_train_transform(image_size=640, resize=True):
+    prefix = get_resize_transforms(image_size) if resize else []
+    return A.Compose(prefix + [
         A.OneOf([
             A.RandomRotate90(p=1),
             A.ShiftScaleRotate(
@@ -27,12 +32,30 @@ def get_train_transform(image_size=640):
         ToTensorV2()
     ], bbox_params=A.BboxParams(format='pascal_voc', label_fields=['labels']))
 
-def get_val_transform(image_size=640):
-    return A.Compose([
-        A.LongestMaxSize(max_size=image_size),
-        A.PadIfNeeded(min_height=image_size, min_width=image_size, border_mode=0),
+def get_val_transform(image_size=640, resize=True):
+    prefix = get_resize_transforms(image_size) if resize else []
+    return A.Compose(prefix + [
         A.ToFloat(max_value=255.0),
         A.Normalize(mean=(0.485, 0.456, 0.406),
                     std=(0.229, 0.224, 0.225)),
         ToTensorV2()
     ], bbox_params=A.BboxParams(format='pascal_voc', label_fields=['labels']))
+
+def get_collage_transform(bbox_format='coco', label_field='category_ids'):
+    # 콜라주 색감/블러 증강 (yolov11/scripts/convert_with_aug.py 와 OnlineCollageDataset 공용)
+    return A.Compose([
+        A.HueSaturationValue(hue_shift_limit=25, sat_shift_limit=35, val_shift_limit=25, p=0.5),
+        A.RGBShift(r_shift_limit=25, g_shift_limit=25, b_shift_limit=25, p=0.5),
+        A.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.35, hue=0.15, p=0.5),
+        A.OneOf([
+            A.InvertImg(p=0.15),
+            A.Solarize(p=0.2),
+            A.RandomToneCurve(p=0.25)
+        ], p=0.25),
+        A.Rotate(limit=5, border_mode=0, p=0.7),
+        A.OneOf([
+            A.GaussianBlur(blur_limit=(3, 5)),
+            A.MotionBlur(blur_limit=7),
+            A.Blur(blur_limit=5)
+        ], p=0.4)
+    ], bbox_params=A.BboxParams(format=bbox_format, label_fields=[label_field]))
@@ -0,0 +1,79 @@
+import math
+import torch
+
+from engine.trainer import get_autocast
+
+def scale_hyperparams(learning_rate, weight_decay, effective_batch, base_batch, rule="linear"):
+    """기준 batch(base_batch) 에 맞춰진 lr / weight_decay 를 effective batch 에 맞게 조정.
+
+    - lr: linear → k 배, sqrt → sqrt(k) 배, none → 그대로 (k = effective_batch / base_batch)
+    - weight_decay: epoch 당 감쇠량(lr * wd * step 수)이 유지되도록 k / lr 배율 만큼 조정
+      (step 수는 1/k 로 줄어듦 → linear 규칙에서는 wd 그대로, sqrt 규칙에서는 sqrt(k) 배)
+    """
+    k = effective_batch / base_batch
+    lr_factor = {"linear": k, "sqrt": math.sqrt(k), "none": 1.0}[rule]
+    wd_factor = k / lr_factor if rule != "none" else 1.0
+    return learning_rate * lr_factor, weight_decay * wd_factor
+
+def _synthetic_batch(batch_size, image_size, num_classes, device):
+    images = [torch.rand(3, image_size, image_size, device=device) for _ in range(batch_size)]
+    boxes = torch.tensor([[16.0, 16.0, image_size / 3, image_size / 3]], device=device)
+    targets = [{"boxes": boxes.clone(), "labels": torch.randint(1, num_classes, (1,), device=device)}
+               for _ in range(batch_size)]
+    return images, targets
+
+def _fits(model, batch_size, image_size, num_classes, device, amp, memory_limit):
+    torch.cuda.empty_cache()
+    torch.cuda.reset_peak_memory_stats(device)
+    try:
+        images, targets = _synthetic_batch(batch_size, image_size, num_classes, device)
+        with get_autocast(device, amp):
+            loss_dict = model(images, targets)
+            losses = sum(loss for loss in loss_dict.values())
+        losses.backward()
+        torch.cuda.synchronize(device)
+        peak = torch.cuda.max_memory_allocated(device)
+        return peak <= memory_limit
+    except torch.cuda.OutOfMemoryError:
+        return False
+    finally:
+        model.zero_grad(set_to_none=True)
+        torch.cuda.empty_cache()
+
+def find_max_micro_batch(model, device, image_size=640, num_classes=74, max_batch=16, amp=False, headroom=0.85):
+    """GPU 메모리의 headroom 비율 안에서 forward+backward 가 가능한 최대 micro-batch 를 찾는다.
+
+    2배씩 늘려 실패 지점을 찾은 뒤 이진 탐색. optimizer 상태(Adam moment)는 probe 에 포함되지 않으므로
+    headroom 으로 여유를 둔다. CUDA 가 아니면 None.
+    """
+    if device.type != "cuda":
+        return None
+
+    memory_limit = torch.cuda.get_device_properties(device).total_memory * headroom
+    was_training = model.training
+    model.train()
+
+    good, bad = 0, None
+    batch = 1
+    while batch <= max_batch:
+        if _fits(model, batch, image_size, num_classes, device, amp, memory_limit):
+            good, batch = batch, batch * 2
+        else:
+            bad = batch
+            break
+    if bad is None:
+        bad = max_batch + 1
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        if _fits(model, mid, image_size, num_classes, device, amp, memory_limit):
+            good = mid
+        else:
+            bad = mid
+
+    model.train(was_training)
+    return max(good, 1)
+
+def plan_batches(target_effective_batch, micro_batch):
+    """목표 effective batch 를 micro-batch 로 나눈 accumulation 횟수와 실제 effective batch."""
+    accumulation_steps = max(1, math.ceil(target_effective_batch / micro_batch))
+    return accumulation_steps, micro_batch * accumulation_steps
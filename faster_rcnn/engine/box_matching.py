@@ -0,0 +1,177 @@
+"""
+예측 ↔ GT 1:1 매칭과 오류 분류 (NumPy 벡터화).
+
+클래스와 무관하게 위치(IoU)로 예측과 GT 를 1:1 로 매칭한 뒤
+- 매칭됐는데 클래스가 다르면 class_error (GT 클래스 기준으로 집계)
+- 매칭되지 않은 예측은 false_positive (예측 클래스 기준)
+- 매칭되지 않은 GT 는 missed (GT 클래스 기준)
+여러 IoU 임계값을 한 번에 계산합니다.
+
+매칭 방법
+- "score":   score 내림차순으로 예측마다 아직 매칭 안 된 GT 중 IoU 최대인 것 (COCO 방식).
+             검증셋 전체를 [이미지, 예측, GT] 로 패딩한 IoU 행렬 위에서 예측 순번만큼만 반복 (engine/coco_map.py 와 같은 방식)
+- "optimal": 이미지마다 IoU ≥ 임계값인 쌍 중 (같은 클래스 우선, 그다음 IoU 합) 최대가 되는 할당 (scipy linear_sum_assignment)
+
+입력 형식은 COCOMeanAP 와 같음 (boxes: xyxy 절대 좌표).
+    analyzer = ErrorAnalyzer(iou_thresholds=(0.5, 0.75), method="score")
+    analyzer.update(preds, targets)   # preds: [{"boxes", "scores", "labels"}], targets: [{"boxes", "labels"}]
+    results = analyzer.compute()      # {"class_error": [T], ..., "per_class": {"class_error": [T, C], ...}}
+"""
+import numpy as np
+
+from engine.coco_map import box_iou, _to_numpy, _last_argmax, IMAGE_CHUNK_ELEMENTS
+
+ERROR_KEYS = ("matched", "class_error", "false_positive", "missed")
+
+
+def _offsets(counts):
+    return np.r_[0, np.cumsum(counts)].astype(np.int64)
+
+
+def _elementwise_iou(boxes1, boxes2):
+    """xyxy [N, 4] 와 [N, 4] 의 같은 행끼리 IoU [N]."""
+    lt = np.maximum(boxes1[:, :2], boxes2[:, :2])
+    rb = np.minimum(boxes1[:, 2:], boxes2[:, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[:, 0] * wh[:, 1]
+    union = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1]) \
+        + (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1]) - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def _score_matching(thresholds, det_boxes, det_offsets, gt_boxes, gt_offsets):
+    """score 순 greedy 매칭. det_boxes 는 이미지 안에서 score 내림차순.
+    반환: det_match [T, D] (매칭된 GT 의 전역 index, 없으면 -1)"""
+    num_images = len(det_offsets) - 1
+    det_counts, gt_counts = np.diff(det_offsets), np.diff(gt_offsets)
+    det_match = np.full((len(thresholds), len(det_boxes)), -1, dtype=np.int64)
+    max_d, max_g = int(det_counts.max(initial=0)), int(gt_counts.max(initial=0))
+    if max_d == 0 or max_g == 0:
+        return det_match
+
+    # 같은 이미지의 (예측, GT) 쌍 전체를 한 번에 나열 → IoU 한 번에 계산 (예측 순서 = 이미지 순서)
+    det_image = np.repeat(np.arange(num_images), det_counts)
+    det_pos = np.arange(len(det_boxes)) - det_offsets[det_image]
+    pairs_per_det = gt_counts[det_image]
+    pair_det = np.repeat(np.arange(len(det_boxes)), pairs_per_det)
+    pair_pos = np.arange(len(pair_det)) - np.repeat(_offsets(pairs_per_det)[:-1], pairs_per_det)
+    pair_iou = _elementwise_iou(det_boxes[pair_det], gt_boxes[gt_offsets[det_image[pair_det]] + pair_pos])
+    pair_offsets = _offsets(pairs_per_det)
+
+    chunk = max(1, IMAGE_CHUNK_ELEMENTS // (max_d * max_g * len(thresholds)))
+    for start in range(0, num_images, chunk):
+        stop = min(start + chunk, num_images)
+        d0, d1 = det_offsets[start], det_offsets[stop]
+        p0, p1 = pair_offsets[d0], pair_offsets[d1]
+        n_img = stop - start
+        # [이미지, 예측, GT] 패딩 IoU (없는 자리는 -1 → 어떤 임계값도 통과 못함)
+        iou = np.full((n_img, max_d, max_g), -1.0)
+        pd = pair_det[p0:p1]
+        iou[det_image[pd] - start, det_pos[pd], pair_pos[p0:p1]] = pair_iou[p0:p1]
+
+        taken = np.zeros((len(thresholds), n_img, max_g), dtype=bool)
+        match = np.full((len(thresholds), n_img, max_d), -1, dtype=np.int64)
+        for d in range(max_d):
+            candidate = np.where(taken, -1.0, iou[None, :, d, :])            # [T, I, G]
+            best = _last_argmax(candidate)                                    # [T, I] 동일 IoU 는 뒤쪽 GT (COCO)
+            best_iou = np.take_along_axis(candidate, best[..., None], axis=-1)[..., 0]
+            ok = best_iou >= thresholds[:, None]
+            match[:, :, d] = np.where(ok, best, -1)
+            t_idx, i_idx = np.nonzero(ok)
+            taken[t_idx, i_idx, best[t_idx, i_idx]] = True
+
+        # 패딩 좌표 → 전역 index
+        local = match[:, det_image[d0:d1] - start, det_pos[d0:d1]]              # [T, 예측]
+        det_match[:, d0:d1] = np.where(local >= 0, local + gt_offsets[det_image[d0:d1]], -1)
+    return det_match
+
+
+def _optimal_matching(thresholds, det_boxes, det_labels, det_offsets, gt_boxes, gt_labels, gt_offsets):
+    from scipy.optimize import linear_sum_assignment
+
+    det_match = np.full((len(thresholds), len(det_boxes)), -1, dtype=np.int64)
+    for i in range(len(det_offsets) - 1):
+        d0, d1, g0, g1 = det_offsets[i], det_offsets[i + 1], gt_offsets[i], gt_offsets[i + 1]
+        if d1 == d0 or g1 == g0:
+            continue
+        iou = box_iou(det_boxes[d0:d1], gt_boxes[g0:g1])
+        same_class = det_labels[d0:d1, None] == gt_labels[None, g0:g1]
+        for t, threshold in enumerate(thresholds.tolist()):
+            valid = iou >= threshold
+            if not valid.any():
+                continue
+            # 같은 클래스 쌍이 IoU 차이와 관계없이 우선 (IoU ≤ 1 이므로 +2 면 충분)
+            weight = np.where(valid, iou + 2.0 * same_class, 0.0)
+            rows, cols = linear_sum_assignment(weight, maximize=True)
+            keep = valid[rows, cols]
+            det_match[t, d0 + rows[keep]] = g0 + cols[keep]
+    return det_match
+
+
+class ErrorAnalyzer:
+    def __init__(self, iou_thresholds=(0.5,), method="score", num_classes=None):
+        if method not in ("score", "optimal"):
+            raise ValueError(f"method 는 'score' 또는 'optimal': {method}")
+        self.iou_thresholds = np.asarray(iou_thresholds, dtype=np.float64)
+        self.method = method
+        self.num_classes = num_classes
+        self.reset()
+
+    def reset(self):
+        self._preds = []
+        self._targets = []
+
+    def update(self, preds, targets):
+        if len(preds) != len(targets):
+            raise ValueError(f"preds({len(preds)}) 와 targets({len(targets)}) 의 이미지 수가 다릅니다")
+        for pred in preds:
+            boxes = _to_numpy(pred["boxes"], np.float64).reshape(-1, 4)
+            scores = _to_numpy(pred["scores"], np.float64).reshape(-1)
+            labels = _to_numpy(pred["labels"], np.int64).reshape(-1)
+            order = np.argsort(-scores, kind="stable")  # 이미지 안에서 score 내림차순
+            self._preds.append((boxes[order], scores[order], labels[order]))
+        for target in targets:
+            self._targets.append((_to_numpy(target["boxes"], np.float64).reshape(-1, 4),
+                                  _to_numpy(target["labels"], np.int64).reshape(-1)))
+
+    def match(self):
+        """반환: (det_match [T, D], det_labels [D], gt_labels [G], det_image [D], gt_image [G])
+        det_match 는 이미지 순서대로 이어 붙인 GT 의 전역 index (매칭 없음 -1)."""
+        det_counts = np.array([len(p[2]) for p in self._preds], dtype=np.int64)
+        gt_counts = np.array([len(t[1]) for t in self._targets], dtype=np.int64)
+        det_offsets, gt_offsets = _offsets(det_counts), _offsets(gt_counts)
+        det_boxes = np.concatenate([p[0] for p in self._preds]) if self._preds else np.zeros((0, 4))
+        det_labels = np.concatenate([p[2] for p in self._preds]) if self._preds else np.zeros(0, np.int64)
+        gt_boxes = np.concatenate([t[0] for t in self._targets]) if self._targets else np.zeros((0, 4))
+        gt_labels = np.concatenate([t[1] for t in self._targets]) if self._targets else np.zeros(0, np.int64)
+
+        if self.method == "score":
+            det_match = _score_matching(self.iou_thresholds, det_boxes, det_offsets, gt_boxes, gt_offsets)
+        else:
+            det_match = _optimal_matching(self.iou_thresholds, det_boxes, det_labels, det_offsets,
+                                          gt_boxes, gt_labels, gt_offsets)
+        det_image = np.repeat(np.arange(len(det_counts)), det_counts)
+        gt_image = np.repeat(np.arange(len(gt_counts)), gt_counts)
+        return det_match, det_labels, gt_labels, det_image, gt_image
+
+    def compute(self):
+        det_match, det_labels, gt_labels, _, _ = self.match()
+        num_classes = self.num_classes or int(max(det_labels.max(initial=-1), gt_labels.max(initial=-1)) + 1)
+        num_thrs = len(self.iou_thresholds)
+
+        per_class = {key: np.zeros((num_thrs, num_classes), dtype=np.int64) for key in ERROR_KEYS}
+        for t in range(num_thrs):
+            matched = det_match[t] >= 0
+            gt_of_det = det_match[t][matched]
+            wrong = det_labels[matched] != gt_labels[gt_of_det]
+            gt_hit = np.zeros(len(gt_labels), dtype=bool)
+            gt_hit[gt_of_det] = True
+            per_class["matched"][t] = np.bincount(gt_labels[gt_of_det], minlength=num_classes)[:num_classes]
+            per_class["class_error"][t] = np.bincount(gt_labels[gt_of_det][wrong], minlength=num_classes)[:num_classes]
+            per_class["false_positive"][t] = np.bincount(det_labels[~matched], minlength=num_classes)[:num_classes]
+            per_class["missed"][t] = np.bincount(gt_labels[~gt_hit], minlength=num_classes)[:num_classes]
+
+        results = {key: per_class[key].sum(axis=1) for key in ERROR_KEYS}
+        results.update(iou_thresholds=self.iou_thresholds, num_predictions=len(det_labels),
+                       num_targets=len(gt_labels), per_class=per_class)
+        return results
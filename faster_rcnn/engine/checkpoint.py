@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import glob
+import queue
+import random
+import threading
+import uuid
+import numpy as np
+import torch
+
+MANIFEST_NAME = "checkpoints.json"
+
+def _to_cpu(obj):
+    # state_dict 안의 tensor 를 CPU 복사본으로 (학습이 계속 진행돼도 저장 내용이 바뀌지 않도록)
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+def capture_rng_state():
+    state = {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def restore_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def _atomic_write(path, write_fn):
+    # 같은 폴더의 임시 파일에 쓰고 fsync 후 rename → 중간에 죽어도 이전 파일이 깨지지 않음
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, map_location="cpu"):
+    # RNG 상태(numpy/python 객체)가 포함되어 있으므로 weights_only=False (직접 저장한 파일만 읽음)
+    return torch.load(path, map_location=map_location, weights_only=False)
+
+
+class CheckpointManager:
+    """epoch 체크포인트를 백그라운드 스레드에서 저장하고 top-k + 최신 1개만 남긴다.
+
+    - save(): 호출 스레드에서는 state 를 CPU 로 복사만 하고 torch.save/fsync/정리는 저장 스레드에서
+    - 보관: metric 기준 상위 keep_top_k 개 + 가장 최근 체크포인트, 나머지는 삭제
+    - ckpt_dir/checkpoints.json 에 보관 목록과 최신 파일을 기록 (latest() 로 자동 resume)
+    - 항목마다 run id 를 기록하고 top-k 는 현재 run 의 항목끼리만 비교 (start_new_run() 으로 새 run 시작)
+    - 새 run 은 ckpt_dir/<run_id>/epoch_XX.pth 에 저장 → 이전 run 의 같은 epoch 파일을 덮어쓰지 않음
+      (run id 가 없는 예전 run 은 ckpt_dir/epoch_XX.pth 그대로)
+    """
+
+    def __init__(self, ckpt_dir, keep_top_k=3, metric="val/map", mode="max"):
+        self.ckpt_dir = ckpt_dir
+        self.keep_top_k = keep_top_k
+        self.metric = metric
+        self.mode = mode
+        os.makedirs(ckpt_dir, exist_ok=True)
+
+        self.manifest = self._read_manifest()
+        self.run_id = self.manifest.get("run_id")
+        self._error = None
+        # 대기 중인 저장은 최대 1개 (CPU 스냅샷이 메모리에 쌓이지 않도록)
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def _read_manifest(self):
+        path = os.path.join(self.ckpt_dir, MANIFEST_NAME)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"metric": self.metric, "run_id": None, "latest": None, "checkpoints": []}
+
+    def start_new_run(self):
+        """resume 하지 않고 처음부터 학습할 때 호출. 이전 run 의 체크포인트는 지우지 않고 top-k 비교에서만 뺀다."""
+        self.run_id = uuid.uuid4().hex[:8]
+        self.manifest["latest"] = None
+
+    def _run_dir(self):
+        return os.path.join(self.ckpt_dir, self.run_id) if self.run_id else self.ckpt_dir
+
+    def latest(self):
+        """현재 run 에서 가장 최근에 저장이 끝난 체크포인트 경로 (없으면 None).
+
+        checkpoints.json 이 없거나 latest 파일이 없으면 현재 run 폴더의 epoch_XX.pth 중 가장 큰 epoch 를 사용.
+        """
+        if self.manifest["latest"]:
+            path = os.path.join(self.ckpt_dir, self.manifest["latest"])
+            if os.path.exists(path):
+                return path
+        candidates = []
+        for path in glob.glob(os.path.join(self._run_dir(), "epoch_*.pth")):
+            match = re.fullmatch(r"epoch_(\d+)\.pth", os.path.basename(path))
+            if match:
+                candidates.append((int(match.group(1)), path))
+        return max(candidates)[1] if candidates else None
+
+    def save(self, epoch, state, metric_value=None):
+        self._raise_if_failed()
+        snapshot = _to_cpu(state)
+        snapshot["epoch"] = epoch
+        snapshot["rng_state"] = capture_rng_state()
+        self._queue.put((epoch, snapshot, metric_value))
+
+    def wait(self):
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self):
+        self._queue.join()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("체크포인트 저장 실패") from error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, epoch, snapshot, metric_value):
+        # manifest 의 file 은 ckpt_dir 기준 상대 경로 (새 run 은 <run_id>/epoch_XX.pth)
+        file_name = os.path.relpath(os.path.join(self._run_dir(), f"epoch_{epoch+1:02d}.pth"), self.ckpt_dir)
+        os.makedirs(self._run_dir(), exist_ok=True)
+        _atomic_write(os.path.join(self.ckpt_dir, file_name), lambda f: torch.save(snapshot, f))
+
+        entries = [e for e in self.manifest["checkpoints"] if e["file"] != file_name]
+        entries.append({"file": file_name, "run_id": self.run_id, "epoch": epoch, "metric": metric_value})
+        keep = self._select(entries, file_name)
+        for entry in entries:
+            if entry.get("run_id") == self.run_id and entry["file"] not in keep:
+                path = os.path.join(self.ckpt_dir, entry["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.manifest = {
+            "metric": self.metric,
+            "run_id": self.run_id,
+            "latest": file_name,
+            "checkpoints": [e for e in entries if e.get("run_id") != self.run_id or e["file"] in keep],
+        }
+        manifest_bytes = json.dumps(self.manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        _atomic_write(os.path.join(self.ckpt_dir, MANIFEST_NAME), lambda f: f.write(manifest_bytes))
+        print(f"[Checkpoint] {file_name} 저장 ({self.metric}={metric_value}) → 보관 {sorted(keep)}")
+
+    def _select(self, entries, latest_file):
+        scored = [e for e in entries if e.get("run_id") == self.run_id and e["metric"] is not None]
+        sign = 1 if self.mode == "max" else -1
+        # 같은 값이면 나중 epoch 우선
+        scored.sort(key=lambda e: (sign * e["metric"], e["epoch"]), reverse=True)
+        return {e["file"] for e in scored[:self.keep_top_k]} | {latest_file}
@@ -0,0 +1,341 @@
+"""
+COCO 방식 bbox mAP 계산기 (NumPy 벡터화).
+
+torchmetrics MeanAveragePrecision(class_metrics=True) (pycocotools backend) 와 같은 규칙으로 계산합니다.
+- 이미지/클래스별 score 상위 max_dets[-1] 개만 사용, greedy matching (score 순, IoU 최대 GT, ignore GT 는 후순위)
+- area 범위(all/small/medium/large) 밖의 GT 는 ignore, 매칭되지 않은 범위 밖 detection 도 ignore
+- precision 은 101 점 보간, recall 은 마지막 recall
+pycocotools 처럼 (이미지, 클래스) 쌍마다 Python 루프를 돌지 않고,
+검증셋 전체를 [이미지, detection, GT] 로 패딩한 IoU 행렬 위에서 detection 순번만큼만 반복합니다.
+
+입력은 torch.Tensor 또는 np.ndarray (boxes: xyxy 절대 좌표).
+    evaluator = COCOMeanAP()
+    evaluator.update(preds, targets)   # preds: [{"boxes", "scores", "labels"}], targets: [{"boxes", "labels"}]
+    results = evaluator.compute()      # {"map", "map_50", ..., "map_per_class", "mar_100_per_class", "classes"}
+"""
+import numpy as np
+
+AREA_RANGES = {
+    "all": (0.0, 1e10),
+    "small": (0.0, 32.0 ** 2),
+    "medium": (32.0 ** 2, 96.0 ** 2),
+    "large": (96.0 ** 2, 1e10),
+}
+IMAGE_CHUNK_ELEMENTS = 1 << 24  # 매칭 시 [area, 이미지, IoU 임계값, GT] 배열 원소 수 상한
+
+
+def _to_numpy(value, dtype):
+    if hasattr(value, "detach"):
+        value = value.detach().cpu().numpy()
+    return np.asarray(value, dtype=dtype)
+
+
+def box_iou(boxes1, boxes2):
+    """xyxy [N, 4] x [M, 4] → IoU [N, M] (float64)."""
+    boxes1 = np.asarray(boxes1, dtype=np.float64)
+    boxes2 = np.asarray(boxes2, dtype=np.float64)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    lt = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = area1[:, None] + area2[None, :] - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def _last_argmax(values):
+    # 동일 IoU 는 뒤쪽 GT 가 선택되는 pycocotools 규칙
+    flipped = values[..., ::-1]
+    return values.shape[-1] - 1 - np.argmax(flipped, axis=-1)
+
+
+def _segmented_searchsorted(seg, values, query_seg, query_values):
+    """구간(seg)별로 정렬된 values 에 대한 searchsorted(side="left") 를 한 번에 계산 (전역 index 반환).
+
+    query 를 같은 값의 원소보다 앞에 두고 (seg, value) 로 병합 정렬한 뒤 앞에 놓인 원소 수를 센다.
+    값에 오프셋을 더하는 방식은 부동소수 반올림으로 경계값(예: recall 0.55)이 어긋날 수 있어 쓰지 않는다.
+    """
+    is_value = np.r_[np.ones(len(values), dtype=bool), np.zeros(len(query_values), dtype=bool)]
+    order = np.lexsort((is_value, np.r_[values, query_values], np.r_[seg, query_seg]))
+    before = np.cumsum(is_value[order]) - is_value[order]
+    idx = np.empty(len(query_values), dtype=np.int64)
+    idx[order[~is_value[order]] - len(values)] = before[~is_value[order]]
+    return idx
+
+
+class COCOMeanAP:
+    def __init__(self, iou_thresholds=None, rec_thresholds=None, max_dets=(1, 10, 100), class_metrics=True):
+        self.iou_thresholds = np.asarray(
+            iou_thresholds if iou_thresholds is not None else np.linspace(0.5, 0.95, 10), dtype=np.float64)
+        self.rec_thresholds = np.asarray(
+            rec_thresholds if rec_thresholds is not None else np.linspace(0.0, 1.0, 101), dtype=np.float64)
+        self.max_dets = sorted(max_dets)
+        self.class_metrics = class_metrics
+        self.reset()
+
+    def reset(self):
+        self._preds = []
+        self._targets = []
+        self.precision = None  # [T, R, K, A, M]
+        self.recall = None     # [T, K, A, M]
+        self.classes = None
+
+    def update(self, preds, targets):
+        for pred in preds:
+            self._preds.append((_to_numpy(pred["boxes"], np.float64).reshape(-1, 4),
+                                _to_numpy(pred["scores"], np.float64).reshape(-1),
+                                _to_numpy(pred["labels"], np.int64).reshape(-1)))
+        for target in targets:
+            self._targets.append((_to_numpy(target["boxes"], np.float64).reshape(-1, 4),
+                                  _to_numpy(target["labels"], np.int64).reshape(-1)))
+
+    # ------------------------------------------------------------------ matching
+    def _flatten(self):
+        num_images = len(self._targets)
+        if len(self._preds) != num_images:
+            raise ValueError(f"preds({len(self._preds)}) 와 targets({num_images}) 의 이미지 수가 다릅니다")
+
+        gt_counts = np.array([len(t[1]) for t in self._targets], dtype=np.int64)
+        gt_boxes = np.concatenate([t[0] for t in self._targets]) if num_images else np.zeros((0, 4))
+        gt_labels = np.concatenate([t[1] for t in self._targets]) if num_images else np.zeros(0, np.int64)
+        gt_image = np.repeat(np.arange(num_images), gt_counts)
+
+        dt_counts = np.array([len(p[2]) for p in self._preds], dtype=np.int64)
+        dt_boxes = np.concatenate([p[0] for p in self._preds]) if num_images else np.zeros((0, 4))
+        dt_scores = np.concatenate([p[1] for p in self._preds]) if num_images else np.zeros(0)
+        dt_labels = np.concatenate([p[2] for p in self._preds]) if num_images else np.zeros(0, np.int64)
+        dt_image = np.repeat(np.arange(num_images), dt_counts)
+
+        # (이미지, 클래스) 안에서 score 내림차순(stable) 순번 → max_dets[-1] 초과분 제거
+        order = np.lexsort((-dt_scores, dt_labels, dt_image))
+        group_key = dt_image[order] * (dt_labels.max(initial=0) + 1) + dt_labels[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(group_key)) + 1] if len(order) else np.zeros(0, np.int64)
+        group_sizes = np.diff(np.r_[starts, len(order)])
+        rank = np.arange(len(order)) - np.repeat(starts, group_sizes)
+        keep = order[rank < self.max_dets[-1]]
+        rank_sorted = rank[rank < self.max_dets[-1]]
+
+        # 이미지 안에서는 score 내림차순으로 재정렬 (같은 클래스끼리의 상대 순서는 유지됨)
+        dets = {
+            "boxes": dt_boxes[keep], "scores": dt_scores[keep], "labels": dt_labels[keep],
+            "image": dt_image[keep], "rank": rank_sorted,
+        }
+        by_image = np.lexsort((np.arange(len(keep)), -dets["scores"], dets["image"]))
+        dets = {k: v[by_image] for k, v in dets.items()}
+        gts = {"boxes": gt_boxes, "labels": gt_labels, "image": gt_image}
+        return num_images, dets, gts
+
+    @staticmethod
+    def _pad_index(image_ids, num_images):
+        # 정렬된 image id → (이미지 내 위치, 이미지별 개수)
+        counts = np.bincount(image_ids, minlength=num_images)
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        pos = np.arange(len(image_ids)) - starts[image_ids] if len(image_ids) else np.zeros(0, np.int64)
+        return pos, counts
+
+    def _match(self, num_images, dets, gts, area_bounds):
+        """반환: det_tp [A, T, D], det_ignore [A, T, D], gt_ignore [A, G] (D/G 는 평탄화된 개수)."""
+        num_areas, num_thrs = len(area_bounds), len(self.iou_thresholds)
+        thresholds = np.minimum(self.iou_thresholds, 1 - 1e-10)
+
+        dt_pos, dt_counts = self._pad_index(dets["image"], num_images)
+        gt_pos, gt_counts = self._pad_index(gts["image"], num_images)
+        max_d, max_g = int(dt_counts.max(initial=0)), int(gt_counts.max(initial=0))
+
+        gt_area = (gts["boxes"][:, 2] - gts["boxes"][:, 0]) * (gts["boxes"][:, 3] - gts["boxes"][:, 1])
+        dt_area = (dets["boxes"][:, 2] - dets["boxes"][:, 0]) * (dets["boxes"][:, 3] - dets["boxes"][:, 1])
+        lo, hi = area_bounds[:, 0:1], area_bounds[:, 1:2]
+        gt_ignore = (gt_area[None] < lo) | (gt_area[None] > hi)        # [A, G]
+        dt_out_of_range = (dt_area[None] < lo) | (dt_area[None] > hi)  # [A, D]
+
+        det_tp = np.zeros((num_areas, num_thrs, len(dt_pos)), dtype=bool)
+        det_ignore = np.zeros_like(det_tp)
+        if max_d == 0 or max_g == 0:
+            # 매칭할 쌍이 없으면 모든 detection 은 FP (범위 밖이면 ignore)
+            return det_tp, dt_out_of_range[:, None, :].repeat(num_thrs, 1), gt_ignore
+
+        per_image = num_areas * num_thrs * (max_g + 2 * max_d) + 4 * max_d * max_g
+        chunk = max(1, IMAGE_CHUNK_ELEMENTS // per_image)
+        dt_offsets = np.r_[0, np.cumsum(dt_counts)]
+        gt_offsets = np.r_[0, np.cumsum(gt_counts)]
+
+        for lo_img in range(0, num_images, chunk):
+            hi_img = min(num_images, lo_img + chunk)
+            n = hi_img - lo_img
+            d_sl = slice(dt_offsets[lo_img], dt_offsets[hi_img])
+            g_sl = slice(gt_offsets[lo_img], gt_offsets[hi_img])
+            if d_sl.stop == d_sl.start:
+                continue
+            d_img, d_pos = dets["image"][d_sl] - lo_img, dt_pos[d_sl]
+            g_img, g_pos = gts["image"][g_sl] - lo_img, gt_pos[g_sl]
+
+            # 패딩된 박스/라벨 [n, max_d|max_g]
+            pad_dt = np.zeros((n, max_d, 4))
+            pad_dt[d_img, d_pos] = dets["boxes"][d_sl]
+            pad_dt_label = np.full((n, max_d), -1, dtype=np.int64)
+            pad_dt_label[d_img, d_pos] = dets["labels"][d_sl]
+            pad_gt = np.zeros((n, max_g, 4))
+            pad_gt[g_img, g_pos] = gts["boxes"][g_sl]
+            pad_gt_label = np.full((n, max_g), -2, dtype=np.int64)
+            pad_gt_label[g_img, g_pos] = gts["labels"][g_sl]
+            pad_gt_ignore = np.ones((num_areas, n, max_g), dtype=bool)
+            pad_gt_ignore[:, g_img, g_pos] = gt_ignore[:, g_sl]
+
+            # IoU [n, max_d, max_g], 다른 클래스/패딩은 -1
+            lt = np.maximum(pad_dt[:, :, None, :2], pad_gt[:, None, :, :2])
+            rb = np.minimum(pad_dt[:, :, None, 2:], pad_gt[:, None, :, 2:])
+            wh = np.clip(rb - lt, 0, None)
+            inter = wh[..., 0] * wh[..., 1]
+            area_d = (pad_dt[..., 2] - pad_dt[..., 0]) * (pad_dt[..., 3] - pad_dt[..., 1])
+            area_g = (pad_gt[..., 2] - pad_gt[..., 0]) * (pad_gt[..., 3] - pad_gt[..., 1])
+            union = area_d[:, :, None] + area_g[:, None, :] - inter
+            ious = np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+            ious = np.where(pad_dt_label[:, :, None] == pad_gt_label[:, None, :], ious, -1.0)
+
+            gt_taken = np.zeros((num_areas, n, num_thrs, max_g), dtype=bool)
+            tp = np.zeros((num_areas, n, num_thrs, max_d), dtype=bool)
+            ign = np.zeros_like(tp)
+            ig_b = pad_gt_ignore[:, :, None, :]
+            rows = np.arange(n)[None, :, None]
+            areas_idx = np.arange(num_areas)[:, None, None]
+            thr_idx = np.arange(num_thrs)[None, None, :]
+
+            # detection 순번(이미지 안 score 순) 만큼만 반복, 나머지 축은 모두 벡터화
+            for d in range(max_d):
+                iou_d = ious[:, d, :][None, :, None, :]                     # [1, n, 1, G]
+                cand = (iou_d >= thresholds[None, None, :, None]) & ~gt_taken  # [A, n, T, G]
+                cand_keep = cand & ~ig_b
+                cand_ign = cand & ig_b
+                best_keep = _last_argmax(np.where(cand_keep, iou_d, -np.inf))
+                best_ign = _last_argmax(np.where(cand_ign, iou_d, -np.inf))
+                has_keep, has_ign = cand_keep.any(-1), cand_ign.any(-1)
+                matched = has_keep | has_ign
+                best = np.where(has_keep, best_keep, best_ign)
+
+                gt_taken[areas_idx, rows, thr_idx, best] |= matched
+                tp[:, :, :, d] = matched & has_keep
+                ign[:, :, :, d] = matched & ~has_keep
+
+            det_tp[:, :, d_sl] = tp[:, d_img, :, d_pos].transpose(1, 2, 0)
+            unmatched_out = ~tp[:, d_img, :, d_pos].transpose(1, 2, 0) & dt_out_of_range[:, None, d_sl]
+            det_ignore[:, :, d_sl] = ign[:, d_img, :, d_pos].transpose(1, 2, 0) | unmatched_out
+        return det_tp, det_ignore, gt_ignore
+
+    # ------------------------------------------------------------------ accumulate
+    def _accumulate(self, dets, gts, det_tp, det_ignore, gt_ignore, classes):
+        num_thrs, num_rec = len(self.iou_thresholds), len(self.rec_thresholds)
+        num_classes, num_areas, num_maxdets = len(classes), gt_ignore.shape[0], len(self.max_dets)
+        precision = -np.ones((num_thrs, num_rec, num_classes, num_areas, num_maxdets))
+        recall = -np.ones((num_thrs, num_classes, num_areas, num_maxdets))
+
+        cls_of_dt = np.searchsorted(classes, dets["labels"])
+        cls_of_gt = np.searchsorted(classes, gts["labels"])
+        # 클래스별 non-ignore GT 수 [K, A]
+        npig = np.stack([np.bincount(cls_of_gt[~gt_ignore[a]], minlength=num_classes) for a in range(num_areas)], 1)
+
+        # 클래스 → score 내림차순 → 이미지 순 → 이미지 내 순번 (pycocotools 의 mergesort 순서)
+        order = np.lexsort((dets["rank"], dets["image"], -dets["scores"], cls_of_dt))
+        cls_sorted, rank_sorted = cls_of_dt[order], dets["rank"][order]
+        tp_sorted, ign_sorted = det_tp[:, :, order], det_ignore[:, :, order]
+
+        for m, max_det in enumerate(self.max_dets):
+            sel = rank_sorted < max_det
+            seg = cls_sorted[sel]
+            counts = np.bincount(seg, minlength=num_classes)
+            ends = np.cumsum(counts)
+            starts = ends - counts
+            has_dets = counts > 0
+            # 클래스 구간별 오른쪽 누적 최대를 한 번에 처리하기 위한 오프셋 (pr 은 [0, 1] 이므로 2 씩 떨어뜨림)
+            envelope_offset = 2.0 * (num_classes - seg)
+            query_cls = np.repeat(np.arange(num_classes), num_rec)
+            query_val = np.tile(self.rec_thresholds, num_classes)
+
+            for a in range(num_areas):
+                valid = npig[:, a] > 0
+                for t in range(num_thrs):
+                    tp = tp_sorted[a, t, sel] & ~ign_sorted[a, t, sel]
+                    fp = ~tp_sorted[a, t, sel] & ~ign_sorted[a, t, sel]
+                    tp_cum = np.cumsum(tp, dtype=np.float64)
+                    fp_cum = np.cumsum(fp, dtype=np.float64)
+                    tp_cum -= np.repeat(np.r_[0.0, tp_cum][starts], counts)
+                    fp_cum -= np.repeat(np.r_[0.0, fp_cum][starts], counts)
+
+                    rc = tp_cum / np.maximum(npig[seg, a], 1)
+                    pr = tp_cum / (fp_cum + tp_cum + np.spacing(1))
+
+                    last = np.zeros(num_classes)
+                    last[has_dets] = rc[ends[has_dets] - 1]
+                    recall[t, :, a, m] = np.where(valid, last, -1.0)
+
+                    q = np.zeros((num_classes, num_rec))
+                    if len(rc):
+                        envelope = np.maximum.accumulate((pr + envelope_offset)[::-1])[::-1] - envelope_offset
+                        idx = _segmented_searchsorted(seg, rc, query_cls, query_val).reshape(num_classes, num_rec)
+                        inside = idx < ends[:, None]
+                        q[inside] = envelope[idx[inside]]
+                    precision[t, :, :, a, m] = np.where(valid[None, :], q.T, -1.0)
+        return precision, recall
+
+    # ------------------------------------------------------------------ summary
+    @staticmethod
+    def _mean_valid(values):
+        values = values[values > -1]
+        return float(values.mean()) if values.size else -1.0
+
+    def _summarize(self, ap=True, iou=None, area="all", max_det=100):
+        a = list(AREA_RANGES).index(area)
+        m = self.max_dets.index(max_det)
+        if ap:
+            s = self.precision[..., a, m]
+            if iou is not None:
+                s = s[np.isclose(self.iou_thresholds, iou)]
+        else:
+            s = self.recall[..., a, m]
+            if iou is not None:
+                s = s[np.isclose(self.iou_thresholds, iou)]
+        return self._mean_valid(s)
+
+    def compute(self):
+        num_images, dets, gts = self._flatten()
+        self.classes = np.unique(np.concatenate([dets["labels"], gts["labels"]]))
+        area_bounds = np.array(list(AREA_RANGES.values()))
+        max_det = self.max_dets[-1]
+
+        keys = ["map", "map_50", "map_75", "map_small", "map_medium", "map_large"] \
+            + [f"mar_{m}" for m in self.max_dets] + ["mar_small", "mar_medium", "mar_large"]
+        if num_images == 0 or (len(gts["labels"]) == 0 and len(dets["labels"]) == 0):
+            results = {k: -1.0 for k in keys}
+            results.update(map_per_class=np.array([-1.0]), **{f"mar_{max_det}_per_class": np.array([-1.0])},
+                           classes=self.classes.astype(np.int32))
+            return results
+
+        det_tp, det_ignore, gt_ignore = self._match(num_images, dets, gts, area_bounds)
+        self.precision, self.recall = self._accumulate(dets, gts, det_tp, det_ignore, gt_ignore, self.classes)
+
+        results = dict(zip(keys, [
+            self._summarize(True),
+            self._summarize(True, iou=0.5),
+            self._summarize(True, iou=0.75),
+            self._summarize(True, area="small"),
+            self._summarize(True, area="medium"),
+            self._summarize(True, area="large"),
+            *[self._summarize(False, max_det=m) for m in self.max_dets],
+            self._summarize(False, area="small"),
+            self._summarize(False, area="medium"),
+            self._summarize(False, area="large"),
+        ]))
+
+        if self.class_metrics:
+            a_all, m_last = 0, len(self.max_dets) - 1
+            results["map_per_class"] = np.array(
+                [self._mean_valid(self.precision[:, :, k, a_all, m_last]) for k in range(len(self.classes))],
+                dtype=np.float32)
+            results[f"mar_{max_det}_per_class"] = np.array(
+                [self._mean_valid(self.recall[:, k, a_all, m_last]) for k in range(len(self.classes))],
+                dtype=np.float32)
+        else:
+            results["map_per_class"] = np.array([-1.0], dtype=np.float32)
+            results[f"mar_{max_det}_per_class"] = np.array([-1.0], dtype=np.float32)
+        results["classes"] = self.classes.astype(np.int32)
+        return results
@@ -0,0 +1,151 @@
+"""
+콜라주 배치 계획: 클래스 가중치 샘플링(Fenwick tree) + occupancy grid 배치 (NumPy 만 사용, 이미지 I/O 없음).
+
+yolov11/scripts/generate_collages.py (디스크에 저장, worker 프로세스마다 import) 와
+dataset/collage.py 의 OnlineCollageDataset (학습 중 합성) 이 같은 규칙을 쓰도록 공용으로 둡니다.
+torch / albumentations 를 끌어오는 dataset 패키지와 분리되어 있어 collage worker 에서 가볍게 import 됩니다.
+"""
+import math
+
+import numpy as np
+
+CANVAS_SIZE = 1280
+GRID_CELL = 8        # occupancy grid 한 칸 크기(px), 배치 좌표도 이 단위로 정렬
+MIN_GAP = 10         # bbox 사이 최소 간격(px)
+
+
+class FenwickSampler:
+    """정수 가중치 비례 샘플링 / 가중치 갱신 모두 O(log n)."""
+
+    def __init__(self, weights):
+        self.n = len(weights)
+        self.weights = list(weights)
+        self.tree = [0] * (self.n + 1)
+        for i, w in enumerate(self.weights, start=1):
+            self.tree[i] += w
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+        self.top_bit = 1 << (self.n.bit_length() - 1) if self.n else 0
+
+    @property
+    def total(self):
+        total, i = 0, self.n
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, index, delta):
+        self.weights[index] += delta
+        i = index + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng):
+        # 누적 가중치가 u 를 넘는 첫 index (total 이 0 이면 호출하지 말 것)
+        u = rng.randrange(self.total)
+        pos, bit = 0, self.top_bit
+        while bit:
+            if pos + bit <= self.n and self.tree[pos + bit] <= u:
+                pos += bit
+                u -= self.tree[pos]
+            bit >>= 1
+        return pos
+
+
+class OccupancyGrid:
+    """놓을 수 있는 자리를 전부 계산해서 그중 하나를 고른다 (자리가 있으면 항상 찾음)."""
+
+    def __init__(self, canvas_size=CANVAS_SIZE, cell=GRID_CELL, gap=MIN_GAP):
+        self.canvas_size, self.cell, self.gap = canvas_size, cell, gap
+        self.size = math.ceil(canvas_size / cell)
+        self.occupied = np.zeros((self.size, self.size), dtype=np.int32)
+        self.integral = np.zeros((self.size + 1, self.size + 1), dtype=np.int32)  # occupied 의 2D 누적합
+        self._column_sum = np.zeros_like(self.occupied)
+        self._dirty = False
+
+    def find(self, w, h, rng):
+        # 좌상단이 cell 단위인 자리 중 w x h 영역이 비어 있는 곳 하나 (x, y), 없으면 None
+        max_cx, max_cy = (self.canvas_size - w) // self.cell, (self.canvas_size - h) // self.cell
+        if max_cx < 0 or max_cy < 0:
+            return None
+        cw, ch = math.ceil(w / self.cell), math.ceil(h / self.cell)
+        if self._dirty:
+            np.cumsum(self.occupied, axis=0, out=self._column_sum)
+            np.cumsum(self._column_sum, axis=1, out=self.integral[1:, 1:])
+            self._dirty = False
+        I = self.integral
+        window = I[ch:ch + max_cy + 1, cw:cw + max_cx + 1] - I[:max_cy + 1, cw:cw + max_cx + 1] \
+            - I[ch:ch + max_cy + 1, :max_cx + 1] + I[:max_cy + 1, :max_cx + 1]
+        free = np.flatnonzero(window.ravel() == 0)
+        if free.size == 0:
+            return None
+        cy, cx = divmod(int(free[rng.randrange(free.size)]), max_cx + 1)
+        return cx * self.cell, cy * self.cell
+
+    def mark(self, x, y, w, h):
+        # bbox 를 gap 만큼 넓혀서 점유 표시 → 다음 bbox 와 최소 gap 간격 유지
+        x0, y0 = max(0, (x - self.gap) // self.cell), max(0, (y - self.gap) // self.cell)
+        x1 = min(self.size, math.ceil((x + w + self.gap) / self.cell))
+        y1 = min(self.size, math.ceil((y + h + self.gap) / self.cell))
+        self.occupied[y0:y1, x0:x1] = 1
+        self._dirty = True
+
+
+def plan_collages(crops, rng, canvas_size=CANVAS_SIZE, cell=GRID_CELL, gap=MIN_GAP):
+    """crop 목록을 모두 쓸 때까지 콜라주 배치 계획을 하나씩 yield: [(crop, x, y), ...]
+
+    crops: (class_key, name, category_id, w, h, ...) 튜플 리스트 (앞 5개만 사용, 나머지는 그대로 전달)
+    한 장에 3~4개: 남은 crop 수에 비례해 클래스를 고르고 (4번째는 아직 안 쓴 클래스만), 클래스 안에서는 무작위.
+    클래스별 남은 crop 목록과 가중치를 계속 갱신하므로 전체 비용은 crop 수에 선형.
+    배치는 큰 crop 부터, 자리가 없는 crop 은 남은 목록으로 되돌림. 남은 crop 이 3개 미만이면 종료.
+    """
+    class_keys = sorted({crop[0] for crop in crops})
+    class_index = {key: i for i, key in enumerate(class_keys)}
+    pools = [[] for _ in class_keys]
+    for crop in crops:
+        if crop[3] > canvas_size or crop[4] > canvas_size:
+            print(f"⚠️ 캔버스보다 큰 crop 제외: {crop[1]}")
+            continue
+        pools[class_index[crop[0]]].append(crop)
+    sampler = FenwickSampler([len(pool) for pool in pools])
+
+    def take(c):
+        pool = pools[c]
+        j = rng.randrange(len(pool))
+        pool[j], pool[-1] = pool[-1], pool[j]
+        sampler.add(c, -1)
+        return pool.pop()
+
+    def put_back(c, crop):
+        pools[c].append(crop)
+        sampler.add(c, 1)
+
+    while sampler.total >= 3:
+        target_count = min(sampler.total, rng.choice([3, 4]))
+        selected, used_classes, blocked = [], set(), []
+
+        while len(selected) < target_count and sampler.total > 0:
+            c = sampler.sample(rng)
+            if c in used_classes and len(selected) >= 3:
+                # 이번 콜라주에서는 이 클래스 제외 (가중치를 잠시 0 으로)
+                blocked.append((c, sampler.weights[c]))
+                sampler.add(c, -sampler.weights[c])
+                continue
+            selected.append((c, take(c)))
+            used_classes.add(c)
+        for c, weight in blocked:
+            sampler.add(c, weight)
+
+        grid = OccupancyGrid(canvas_size, cell, gap)
+        placed = []
+        for c, crop in sorted(selected, key=lambda item: -item[1][3] * item[1][4]):
+            position = grid.find(crop[3], crop[4], rng)
+            if position is None:
+                put_back(c, crop)
+                continue
+            grid.mark(position[0], position[1], crop[3], crop[4])
+            placed.append((crop, position[0], position[1]))
+        yield placed
@@ -1,28 +1,28 @@
+import numpy as np
 import torch
 from tqdm import tqdm
-from torchmetrics.detection.mean_ap import MeanAveragePrecision
+
+from engine.trainer import get_autocast
+from engine.coco_map import COCOMeanAP
 
 @torch.no_grad()
-def run_evaluation(model, data_loader, device, epoch=None, use_wandb=False):
+def run_evaluation(model, data_loader, device, epoch=None, use_wandb=False, amp=False, logger=None):
     model.eval()
-    metric = MeanAveragePrecision(class_metrics=True)
-    metric.reset()
+    # 예측은 batch 단위로 host 에 모으고, mAP 는 검증셋 전체에 대해 마지막에 한 번에 계산
+    metric = COCOMeanAP(class_metrics=True)
 
     epoch_desc = f"(epoch={epoch+1})" if epoch is not None else "(no epoch)"
     for images, targets in tqdm(data_loader, desc=f"Evaluating {epoch_desc}"):
-        images = [img.to(device) for img in images]
-        targets = [{k: v.to(device) for k, v in t.items()} for t in targets]
-        outputs = model(images)
+        images = [img.to(device, non_blocking=True) for img in images]
+        with get_autocast(device, amp):
+            outputs = model(images)
+        outputs = [{k: v.float().cpu() if v.is_floating_point() else v.cpu() for k, v in o.items()} for o in outputs]
         metric.update(outputs, targets)
 
     results = metric.compute()
 
     log_data = {
-        f"val/{k}": (
-            v.float().mean().item() if isinstance(v, torch.Tensor) and v.numel() > 1
-            else v.item() if isinstance(v, torch.Tensor)
-            else v
-        )
+        f"val/{k}": (float(np.mean(v)) if v.size else -1.0) if isinstance(v, np.ndarray) else v
         for k, v in results.items()
     }
 
@@ -30,10 +30,16 @@ def run_evaluation(model, data_loader, device, epoch=None, use_wandb=False):
         log_data["epoch"] = epoch
 
     if use_wandb:
-        import wandb
-        wandb.log(log_data)
+        if logger is not None:
+            # 학습 step 로그와 순서가 섞이지 않도록 같은 로거 스레드로 전달
+            logger.log(log_data)
+        else:
+            import wandb
+            wandb.log(log_data)
 
     print(f"\n[Evaluation Result{' (epoch='+str(epoch+1)+')' if epoch is not None else ''}]")
     for k, v in log_data.items():
         if k != "epoch":
             print(f"{k:20s}: {v:.4f}")
+
+    return log_data
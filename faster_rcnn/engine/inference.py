@@ -0,0 +1,96 @@
+import os
+import torch
+from torchvision.models.detection import FasterRCNN
+from torchvision.models.detection.backbone_utils import resnet_fpn_backbone
+
+from engine.trainer import apply_channels_last
+from engine.checkpoint import load_checkpoint
+
+BACKENDS = ("eager", "torchscript", "onnx")
+ONNX_INPUT_NAME = "images"
+ONNX_OUTPUT_NAMES = ("boxes", "labels", "scores")
+
+def build_model(num_classes):
+    # ftrcnn_train.py 의 fasterrcnn_resnet50_fpn(num_classes) 와 같은 구조 (FrozenBatchNorm2d, trainable_layers=3)
+    # 를 ImageNet backbone 가중치 다운로드 없이 생성 (가중치는 체크포인트에서 불러옴)
+    backbone = resnet_fpn_backbone(backbone_name="resnet50", weights=None, trainable_layers=3)
+    return FasterRCNN(backbone, num_classes=num_classes)
+
+def load_model(checkpoint_path, num_classes, device, channels_last=None):
+    """ftrcnn_train.py 체크포인트 → eval 모드 eager 모델. channels_last=None 이면 체크포인트 설정을 따름."""
+    checkpoint = load_checkpoint(checkpoint_path, map_location=device)
+    model = build_model(num_classes)
+    model.load_state_dict(checkpoint["model_state_dict"])
+    model.to(device)
+    if channels_last is None:
+        channels_last = checkpoint.get("channels_last", False)
+    if channels_last:
+        apply_channels_last(model)
+    model.eval()
+    return model
+
+def export_torchscript(model, path):
+    scripted = torch.jit.script(model.eval())
+    scripted.save(path)
+    return path
+
+def export_onnx(model, path, image_size=640, opset_version=17):
+    # torchvision Faster R-CNN 의 ONNX 그래프는 이미지 1장 입력 (H/W 는 동적), batch 는 InferenceEngine 에서 반복
+    dummy = [torch.rand(3, image_size, image_size)]
+    torch.onnx.export(model.eval().cpu(), (dummy,), path, opset_version=opset_version, dynamo=False,
+                      input_names=[ONNX_INPUT_NAME], output_names=list(ONNX_OUTPUT_NAMES),
+                      dynamic_axes={ONNX_INPUT_NAME: {1: "height", 2: "width"}})
+    return path
+
+def _infer_backend(path):
+    ext = os.path.splitext(path)[1].lower()
+    return {".pth": "eager", ".pt": "torchscript", ".onnx": "onnx"}.get(ext)
+
+
+class InferenceEngine:
+    """eager / TorchScript / ONNX Runtime 백엔드를 같은 방식으로 호출하는 추론기.
+
+    engine(images) 는 CHW float tensor 리스트를 받아 모델과 같은 형식
+    [{"boxes": [N, 4] xyxy, "labels": [N], "scores": [N]}] 을 돌려주므로 run_evaluation 에 모델 대신 넘길 수 있다.
+    """
+
+    def __init__(self, path, backend=None, device="cpu", num_classes=74, num_threads=None):
+        self.backend = backend or _infer_backend(path)
+        if self.backend not in BACKENDS:
+            raise ValueError(f"지원하지 않는 백엔드: {self.backend} (파일: {path})")
+        self.device = torch.device(device)
+        self.path = path
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        if self.backend == "eager":
+            self.model = load_model(path, num_classes, self.device)
+        elif self.backend == "torchscript":
+            self.model = torch.jit.load(path, map_location=self.device).eval()
+        else:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if num_threads is not None:
+                options.intra_op_num_threads = num_threads
+            self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def eval(self):
+        return self
+
+    @torch.no_grad()
+    def __call__(self, images):
+        if self.backend == "eager":
+            return self.model([img.to(self.device) for img in images])
+        if self.backend == "torchscript":
+            # scripting 된 GeneralizedRCNN 은 항상 (losses, detections) 를 반환
+            _, detections = self.model([img.to(self.device) for img in images])
+            return detections
+
+        outputs = []
+        for img in images:
+            boxes, labels, scores = self.session.run(list(ONNX_OUTPUT_NAMES),
+                                                     {ONNX_INPUT_NAME: img.detach().cpu().float().numpy()})
+            outputs.append({"boxes": torch.from_numpy(boxes), "labels": torch.from_numpy(labels),
+                            "scores": torch.from_numpy(scores)})
+        return outputs
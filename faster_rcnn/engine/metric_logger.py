@@ -0,0 +1,95 @@
+import time
+import queue
+import threading
+import torch
+
+class AsyncLogger:
+    """로깅 payload 를 백그라운드 스레드에서 처리하는 로거.
+
+    학습 루프는 detach 된 device tensor 를 그대로 넘기고 바로 다음 step 으로 진행한다.
+    tensor → float 변환(.item(), device-host 동기화)과 wandb.log 호출은 로거 스레드에서만 일어난다.
+    """
+
+    def __init__(self, use_wandb=False):
+        self.use_wandb = use_wandb
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="async-logger", daemon=True)
+        self._thread.start()
+
+    def log(self, data):
+        # data: {key: float | 0-dim tensor}, 호출 스레드는 절대 블로킹하지 않음
+        self._queue.put(("log", data))
+
+    def print(self, message_fn, data):
+        # message_fn(values) 결과를 로거 스레드에서 stdout 으로 출력
+        self._queue.put(("print", (message_fn, data)))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    @staticmethod
+    def _materialize(data):
+        return {k: v.item() if isinstance(v, torch.Tensor) else v for k, v in data.items()}
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                kind, payload = item
+                if kind == "log":
+                    values = self._materialize(payload)
+                    if self.use_wandb:
+                        import wandb
+                        wandb.log(values)
+                else:
+                    message_fn, data = payload
+                    print(message_fn(self._materialize(data)))
+            except Exception as e:
+                print(f"[경고] 로깅 실패: {e}")
+            finally:
+                self._queue.task_done()
+
+
+class StepTimer:
+    """step 루프의 host 측 시간 측정.
+
+    - data: DataLoader 에서 다음 batch 를 기다린 시간
+    - step: forward/backward/optimizer 를 dispatch 하고 다음 step 으로 넘어가기까지 걸린 시간
+    로깅 step 과 일반 step 을 따로 집계해, 로깅이 루프를 직렬화(동기화)하지 않는지 확인한다.
+    """
+
+    def __init__(self):
+        self.data_times = []
+        self.step_times = {True: [], False: []}
+        self._mark = time.perf_counter()
+
+    def data_ready(self):
+        now = time.perf_counter()
+        self.data_times.append(now - self._mark)
+        self._mark = now
+
+    def step_done(self, is_log_step):
+        now = time.perf_counter()
+        self.step_times[is_log_step].append(now - self._mark)
+        self._mark = now
+
+    @staticmethod
+    def _stats(values):
+        if not values:
+            return "n/a"
+        ordered = sorted(values)
+        mean = 1000 * sum(ordered) / len(ordered)
+        p50 = 1000 * ordered[len(ordered) // 2]
+        p95 = 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return f"mean {mean:.1f}ms / p50 {p50:.1f}ms / p95 {p95:.1f}ms (n={len(ordered)})"
+
+    def summary(self):
+        return (f"  data wait : {self._stats(self.data_times)}\n"
+                f"  step      : {self._stats(self.step_times[False])}\n"
+                f"  log step  : {self._stats(self.step_times[True])}")
@@ -0,0 +1,59 @@
+import copy
+import torch
+import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic, get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+def _fold_bn(conv, bn):
+    # eval 모드 BN(FrozenBatchNorm2d 포함)을 앞의 conv 가중치/편향에 합침
+    scale = bn.weight * (bn.running_var + bn.eps).rsqrt()
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+    conv.weight = nn.Parameter(conv.weight.detach() * scale[:, None, None, None])
+    conv.bias = nn.Parameter((bias.detach() - bn.running_mean) * scale + bn.bias)
+
+def fold_batchnorm(module):
+    """ResNet 의 (convN, bnN) 쌍과 downsample(conv, bn) 을 conv 하나로 합친다 (bn 은 Identity 로 교체).
+
+    FrozenBatchNorm2d 는 FX 에서 conv 와 fuse 되지 않아 int8 conv 사이에 float 연산이 끼므로 먼저 접는다.
+    """
+    for name, child in list(module.named_children()):
+        if name.startswith("bn") and isinstance(getattr(module, "conv" + name[2:], None), nn.Conv2d):
+            _fold_bn(getattr(module, "conv" + name[2:]), child)
+            setattr(module, name, nn.Identity())
+        elif isinstance(child, nn.Sequential) and len(child) == 2 and isinstance(child[0], nn.Conv2d) \
+                and hasattr(child[1], "running_mean"):
+            _fold_bn(child[0], child[1])
+            child[1] = nn.Identity()
+        else:
+            fold_batchnorm(child)
+    return module
+
+@torch.no_grad()
+def quantize_model(model, calibration_images, backend="x86"):
+    """fp32 Faster R-CNN → int8 CPU 추론 모델 (원본은 그대로 둠).
+
+    - backbone(ResNet50 body + FPN): FX graph mode static int8, calibration_images 로 activation 범위 보정
+    - roi_heads 의 box head / box predictor (Linear): dynamic int8
+    - RPN head, RoIAlign, NMS 등 나머지는 fp32
+    결과는 engine.inference.export_torchscript 로 저장하면 InferenceEngine / evaluate.py 에서 .pt 로 바로 사용 가능
+    calibration_images: CHW float tensor 리스트 (val transform 을 거친 이미지)
+    """
+    torch.backends.quantized.engine = backend
+    model = copy.deepcopy(model).cpu().eval()
+    fold_batchnorm(model.backbone.body)
+
+    # backbone 입력은 GeneralizedRCNNTransform (정규화 + resize + batch) 을 거친 tensor
+    def backbone_input(image):
+        return model.transform([image.cpu()])[0].tensors
+
+    example = backbone_input(calibration_images[0])
+    prepared = prepare_fx(model.backbone, get_default_qconfig_mapping(backend), (example,))
+    for image in calibration_images:
+        prepared(backbone_input(image))
+    out_channels = model.backbone.out_channels
+    model.backbone = convert_fx(prepared)
+    model.backbone.out_channels = out_channels
+
+    model.roi_heads.box_head = quantize_dynamic(model.roi_heads.box_head, {nn.Linear}, dtype=torch.qint8)
+    model.roi_heads.box_predictor = quantize_dynamic(model.roi_heads.box_predictor, {nn.Linear}, dtype=torch.qint8)
+    return model
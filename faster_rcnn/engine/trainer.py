@@ -1,34 +1,102 @@
+import contextlib
 import torch
 from tqdm import tqdm
 
-def train_one_epoch(model, optimizer, data_loader, device, epoch, use_wandb=False, log_interval=10):
+from engine.metric_logger import AsyncLogger, StepTimer
+
+def autocast_dtype(device):
+    # CUDA 는 float16 (+GradScaler), CPU 는 bfloat16 (스케일링 불필요)
+    return torch.float16 if device.type == "cuda" else torch.bfloat16
+
+def get_autocast(device, amp=False):
+    if not amp:
+        return contextlib.nullcontext()
+    return torch.autocast(device_type=device.type, dtype=autocast_dtype(device))
+
+def make_grad_scaler(device, amp=False):
+    # float16 autocast 일 때만 활성화, 그 외에는 scale/step/update 가 그대로 통과
+    return torch.amp.GradScaler(device.type, enabled=amp and autocast_dtype(device) == torch.float16)
+
+def apply_channels_last(model):
+    # ResNet50-FPN backbone 의 conv 가중치와 입력 batch 를 NHWC 로 유지
+    model.backbone.to(memory_format=torch.channels_last)
+    model.backbone.register_forward_pre_hook(
+        lambda module, inputs: (inputs[0].contiguous(memory_format=torch.channels_last),) + inputs[1:]
+    )
+    return model
+
+def train_one_epoch(model, optimizer, data_loader, device, epoch, use_wandb=False, log_interval=10,
+                    amp=False, scaler=None, logger=None, report_timing=True, accumulation_steps=1, global_step=0):
+    """micro-batch accumulation_steps 개마다 optimizer step 1회. log_interval / global_step 은 optimizer step 기준.
+    AMP(float16) 에서 GradScaler 가 inf/nan 때문에 건너뛴 step 은 global_step 에 세지 않는다.
+
+    반환값: 이번 epoch 이후의 global_step (누적 optimizer step 수)
+    """
     model.train()
-    running_loss = 0.0
+    # loss 는 device 에 누적하고 로깅 시점에만 로거 스레드에서 host 로 가져옴 (step 마다 .item() 동기화 없음)
+    running_loss = torch.zeros((), device=device)
+    if scaler is None:
+        scaler = make_grad_scaler(device, amp)
+    own_logger = logger is None
+    if own_logger:
+        logger = AsyncLogger(use_wandb=use_wandb)
+    timer = StepTimer()
+    num_batches = len(data_loader)
+    skipped_steps = 0
 
+    optimizer.zero_grad(set_to_none=True)
     for step, (images, targets) in enumerate(tqdm(data_loader, desc=f"Epoch {epoch+1} - Training")):
-        images = [img.to(device) for img in images]
-        targets = [{k: v.to(device) for k, v in t.items()} for t in targets]
+        timer.data_ready()
+        images = [img.to(device, non_blocking=True) for img in images]
+        targets = [{k: v.to(device, non_blocking=True) for k, v in t.items()} for t in targets]
+
+        with get_autocast(device, amp):
+            loss_dict = model(images, targets)
+            losses = sum(loss for loss in loss_dict.values())
 
-        loss_dict = model(images, targets)
-        losses = sum(loss for loss in loss_dict.values())
+        # 마지막 묶음이 accumulation_steps 보다 짧으면 실제 micro-batch 수로 나눔
+        window_start = step - step % accumulation_steps
+        window_size = min(accumulation_steps, num_batches - window_start)
+        scaler.scale(losses / window_size).backward()
 
-        optimizer.zero_grad()
-        losses.backward()
-        optimizer.step()
+        running_loss += losses.detach()
 
-        running_loss += losses.item()
+        is_update = step - window_start + 1 == window_size
+        stepped = False
+        if is_update:
+            # scaler.step 이 inf 검사로 이미 host 동기화를 하므로 get_scale() 비교는 추가 비용이 거의 없음
+            scale_before = scaler.get_scale() if scaler.is_enabled() else None
+            scaler.step(optimizer)
+            scaler.update()
+            optimizer.zero_grad(set_to_none=True)
+            # step 을 건너뛰면 update() 가 scale 을 줄임 → 실제로 적용된 optimizer step 만 셈
+            stepped = scale_before is None or scaler.get_scale() >= scale_before
+            if stepped:
+                global_step += 1
+            else:
+                skipped_steps += 1
 
-        # 선택적 wandb 로깅
-        if use_wandb and step % log_interval == 0:
-            import wandb
-            log_data = {f"train/{k}": v.item() for k, v in loss_dict.items()}
-            log_data["train/total_loss"] = losses.item()
+        # 선택적 wandb 로깅: detach 된 tensor 만 넘기고 변환/전송은 로거 스레드에서
+        is_log_step = use_wandb and stepped and global_step % log_interval == 0
+        if is_log_step:
+            log_data = {f"train/{k}": v.detach() for k, v in loss_dict.items()}
+            log_data["train/total_loss"] = losses.detach()
+            log_data["train/lr"] = optimizer.param_groups[0]["lr"]
+            log_data["train/optimizer_step"] = global_step
             log_data["epoch"] = epoch
-            wandb.log(log_data)
+            logger.log(log_data)
 
-    avg_loss = running_loss / len(data_loader)
+        timer.step_done(is_log_step)
 
+    epoch_loss = {"train/epoch_loss": running_loss / num_batches, "train/optimizer_step": global_step, "epoch": epoch}
     if use_wandb:
-        wandb.log({"train/epoch_loss": avg_loss, "epoch": epoch})
+        logger.log(epoch_loss)
+    logger.print(lambda v: f"[Epoch {epoch+1}] Avg Loss: {v['train/epoch_loss']:.4f} (optimizer step {global_step})", epoch_loss)
+    if skipped_steps:
+        print(f"[Epoch {epoch+1}] GradScaler 가 inf/nan 으로 건너뛴 optimizer step: {skipped_steps}")
+    if report_timing:
+        print(f"[Epoch {epoch+1}] step timing (host)\n{timer.summary()}")
 
-    print(f"[Epoch {epoch+1}] Avg Loss: {avg_loss:.4f}")
+    if own_logger:
+        logger.close()
+    return global_step
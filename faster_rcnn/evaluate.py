@@ -2,30 +2,31 @@ import os
 import argparse
 import torch
 import pandas as pd
-from torchvision.models.detection import fasterrcnn_resnet50_fpn
+import yaml
 from torch.utils.data import DataLoader
 
 from engine.evaluator import run_evaluation
-from dataset import FasterRCNNDataset, get_val_transform, collate_fn
-
-def load_model(checkpoint_path, num_classes, device):
-    checkpoint = torch.load(checkpoint_path, map_location=device)
-    model = fasterrcnn_resnet50_fpn(num_classes=num_classes)
-    model.load_state_dict(checkpoint["model_state_dict"])
-    model.to(device)
-    model.eval()
-    return model
+from engine.inference import InferenceEngine, BACKENDS
+from dataset import FasterRCNNDataset, get_val_transform, loader_kwargs
 
 def main(args):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-    # 모델 로드
-    model = load_model(args.checkpoint, args.num_classes, device)
+    # 모델 로드 (.pth → eager, .pt → TorchScript, .onnx → ONNX Runtime; export.py 참고)
+    model = InferenceEngine(args.checkpoint, backend=args.backend, device=device, num_classes=args.num_classes)
+    if model.backend == "onnx":
+        device = torch.device("cpu")  # ONNX Runtime 은 CPU provider 만 사용
 
     # 데이터셋 로딩
     df_val = pd.read_csv("data/val_df.csv")
     val_dataset = FasterRCNNDataset(df_val, image_dir="val_images", transforms=get_val_transform())
-    val_loader = DataLoader(val_dataset, batch_size=4, shuffle=False, collate_fn=collate_fn)
+    loader_cfg = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r") as f:
+            loader_cfg = yaml.safe_load(f).get("loader", {})
+    if args.num_workers is not None:
+        loader_cfg["num_workers"] = args.num_workers
+    val_loader = DataLoader(val_dataset, batch_size=args.batch_size, shuffle=False, **loader_kwargs(loader_cfg))
 
     # wandb 조건부
     if args.use_wandb:
@@ -35,13 +36,18 @@ def main(args):
         os.environ["WANDB_MODE"] = "disabled"
 
     # 평가 실행
-    run_evaluation(model, val_loader, device, epoch=None, use_wandb=args.use_wandb)
+    run_evaluation(model, val_loader, device, epoch=None, use_wandb=args.use_wandb, amp=args.amp)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--checkpoint", type=str, required=True, help="Path to .pth checkpoint file")
+    parser.add_argument("--checkpoint", type=str, required=True, help="Path to .pth checkpoint file (또는 export.py / quantize.py 결과 .pt / .onnx)")
+    parser.add_argument("--backend", type=str, default=None, choices=BACKENDS, help="기본: 파일 확장자로 결정")
     parser.add_argument("--num_classes", type=int, default=74)
     parser.add_argument("--use_wandb", action="store_true")
+    parser.add_argument("--config", type=str, default="ftrcnn_config.yaml", help="loader 설정을 읽을 yaml")
+    parser.add_argument("--num_workers", type=int, default=None, help="config 의 loader.num_workers 덮어쓰기")
+    parser.add_argument("--batch_size", type=int, default=8, help="검증 추론 batch 크기")
+    parser.add_argument("--amp", action="store_true", help="autocast 로 추론 (CUDA: float16, CPU: bfloat16)")
     args = parser.parse_args()
 
     main(args)
@@ -0,0 +1,40 @@
+import os
+import argparse
+import torch
+
+from engine.inference import load_model, export_torchscript, export_onnx, InferenceEngine
+
+def main(args):
+    # export 는 항상 CPU / 기본 메모리 포맷 모델에서 (channels_last forward hook 은 scripting/ONNX 대상이 아님)
+    model = load_model(args.checkpoint, args.num_classes, torch.device("cpu"), channels_last=False)
+    os.makedirs(args.out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.checkpoint))[0]
+
+    dummy = [torch.rand(3, args.image_size, args.image_size)]
+    with torch.no_grad():
+        reference = model(dummy)[0]
+
+    for fmt in args.formats:
+        if fmt == "torchscript":
+            path = export_torchscript(model, os.path.join(args.out_dir, f"{stem}.pt"))
+        else:
+            path = export_onnx(model, os.path.join(args.out_dir, f"{stem}.onnx"), args.image_size, args.opset)
+
+        # 간단 확인: 같은 입력에 대한 eager 결과와 비교 (val set 비교는 benchmarks/check_export_parity.py)
+        output = InferenceEngine(path, num_classes=args.num_classes)(dummy)[0]
+        same_count = len(output["boxes"]) == len(reference["boxes"])
+        box_diff = (output["boxes"] - reference["boxes"]).abs().max().item() if same_count and len(output["boxes"]) else 0.0
+        print(f"[{fmt}] {path} ({os.path.getsize(path) / 1e6:.1f} MB) | "
+              f"detections {len(output['boxes'])} vs eager {len(reference['boxes'])}, max box diff {box_diff:.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, required=True, help="ftrcnn_train.py 가 저장한 .pth")
+    parser.add_argument("--out_dir", type=str, default="exported")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--image_size", type=int, default=640, help="ONNX export 용 더미 입력 크기 (H/W 는 동적 축)")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    main(args)
@@ -3,64 +3,173 @@ import argparse
 import torch
 import pandas as pd
 from torchvision.models.detection import fasterrcnn_resnet50_fpn
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, ConcatDataset
 import yaml
 
-from engine.trainer import train_one_epoch
+from engine.trainer import train_one_epoch, make_grad_scaler, apply_channels_last
 from engine.evaluator import run_evaluation
-from dataset import FasterRCNNDataset, get_train_transform, get_val_transform, collate_fn
-
-# --- argparse, yaml ---
-parser = argparse.ArgumentParser()
-parser.add_argument("--use_wandb", action="store_true", help="Enable Weights & Biases logging")
-parser.add_argument("--ckpt_dir", type=str, default="checkpoints_3", help="Directory to save checkpoints")
-args = parser.parse_args()
-
-with open("ftrcnn_config.yaml", "r") as f:
-    config = yaml.safe_load(f)
-
-# --- wandb 조건부 활성화 ---
-if args.use_wandb:
-    import wandb
-    wandb.init(project="pill-detection", name=f"fasterrcnn-{args.ckpt_dir}")
-else:
-    os.environ["WANDB_MODE"] = "disabled"
-
-# --- 기본 설정 ---
-EPOCHS = config["training"]["epochs"]
-start_epoch = config["training"]["start_epoch"]
-NUM_CLASSES = config["model"]["num_classes"]  # (배경 포함)
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print("Using device: ", device)
-os.makedirs(args.ckpt_dir, exist_ok=True)
-
-# --- 모델 및 옵티마이저 정의 ---
-model = fasterrcnn_resnet50_fpn(num_classes=NUM_CLASSES)
-model.to(device)
-
-optimizer = torch.optim.Adam(model.parameters(),
-                            lr=config["training"]["learning_rate"],
-                            weight_decay=config["training"]["weight_decay"])
-
-# --- 데이터셋/로더 정의 ---
-train_df = pd.read_csv(config["data"]["train_csv"])
-val_df = pd.read_csv(config["data"]["val_csv"])
-image_dir = config["data"]["image_dir"]
-
-train_dataset = FasterRCNNDataset(train_df, image_dir=image_dir, transforms=get_train_transform())
-val_dataset = FasterRCNNDataset(val_df, image_dir=image_dir, transforms=get_val_transform())
-
-train_loader = DataLoader(train_dataset, batch_size=config["training"]["batch_size"], shuffle=True, collate_fn=collate_fn, num_workers=0, pin_memory=True)
-val_loader = DataLoader(val_dataset, batch_size=1, shuffle=False, collate_fn=collate_fn,num_workers=0, pin_memory=True)
-
-# --- 학습 루프 ---
-for epoch in range(start_epoch, EPOCHS):
-    train_one_epoch(model, optimizer, train_loader, device, epoch, use_wandb=args.use_wandb)
-    run_evaluation(model, val_loader, device, epoch, use_wandb=args.use_wandb)
-
-    # 모델 저장
-    torch.save({
-        "epoch": epoch,
-        "model_state_dict": model.state_dict(),
-        "optimizer_state_dict": optimizer.state_dict()
-    }, os.path.join(args.ckpt_dir, f"epoch_{epoch+1:02d}.pth"))
+from engine.metric_logger import AsyncLogger
+from engine.batching import scale_hyperparams, find_max_micro_batch, plan_batches
+from engine.checkpoint import CheckpointManager, load_checkpoint, restore_rng_state
+from dataset import FasterRCNNDataset, get_train_transform, get_val_transform, loader_kwargs
+from dataset import CropBank, OnlineCollageDataset, get_collage_transform
+
+def build_datasets(config):
+    train_df = pd.read_csv(config["data"]["train_csv"])
+    val_df = pd.read_csv(config["data"]["val_csv"])
+    image_dir = config["data"]["image_dir"]
+    image_size = config["augmentation"]["image_size"]
+    shard_dir = config["data"].get("shard_dir")
+
+    # 디코딩 캐시를 쓰면 LongestMaxSize + PadIfNeeded 는 캐시에서 처리되므로 transform 에서 제외
+    cache_dir = config["data"].get("cache_dir")
+    use_cache = cache_dir is not None
+    cache_max_bytes = int(config["data"].get("cache_max_gb", 8) * 1024 ** 3)
+
+    train_dataset = FasterRCNNDataset(train_df, image_dir=image_dir,
+                                      transforms=get_train_transform(image_size, resize=not use_cache),
+                                      cache_dir=os.path.join(cache_dir, "train") if use_cache else None,
+                                      image_size=image_size, cache_max_bytes=cache_max_bytes, shard_dir=shard_dir)
+    val_dataset = FasterRCNNDataset(val_df, image_dir=image_dir,
+                                    transforms=get_val_transform(image_size, resize=not use_cache),
+                                    cache_dir=os.path.join(cache_dir, "val") if use_cache else None,
+                                    image_size=image_size, cache_max_bytes=cache_max_bytes, shard_dir=shard_dir)
+
+    # 학습 중 콜라주 합성: 부족한 클래스의 crop 을 메모리에 두고 epoch 마다 collages_per_epoch 장을 새로 만들어 추가
+    collage_cfg = config.get("online_collage", {})
+    if collage_cfg.get("enabled", False):
+        bank = CropBank.from_dataset(train_dataset, target_count=collage_cfg.get("target_count", 300),
+                                     max_iter=collage_cfg.get("max_iter", 50))
+        collage_dataset = OnlineCollageDataset(bank, collage_cfg.get("collages_per_epoch", 1000),
+                                               transforms=get_train_transform(image_size),
+                                               augment=get_collage_transform("pascal_voc", "labels"),
+                                               image_size=image_size,
+                                               canvas_size=collage_cfg.get("canvas_size", 1280),
+                                               seed=collage_cfg.get("seed", 0))
+        print(f"online collage: crop {len(bank.crops)}개 (부족분 포함 {len(bank)}개), epoch 당 {len(collage_dataset)}장")
+        train_dataset = ConcatDataset([train_dataset, collage_dataset])
+    return train_dataset, val_dataset
+
+def main(args):
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f)
+
+    # --- wandb 조건부 활성화 ---
+    if args.use_wandb:
+        import wandb
+        wandb.init(project="pill-detection", name=f"fasterrcnn-{args.ckpt_dir}")
+        # train/* 는 실제 optimizer step, val/* 는 epoch 기준으로 x 축 지정
+        wandb.define_metric("train/optimizer_step")
+        wandb.define_metric("train/*", step_metric="train/optimizer_step")
+        wandb.define_metric("val/*", step_metric="epoch")
+    else:
+        os.environ["WANDB_MODE"] = "disabled"
+
+    # --- 기본 설정 ---
+    EPOCHS = config["training"]["epochs"]
+    start_epoch = config["training"]["start_epoch"]
+    NUM_CLASSES = config["model"]["num_classes"]  # (배경 포함)
+    AMP = config["training"].get("amp", False)
+    CHANNELS_LAST = config["training"].get("channels_last", False)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print("Using device: ", device)
+    os.makedirs(args.ckpt_dir, exist_ok=True)
+
+    # --- 모델 및 옵티마이저 정의 ---
+    model = fasterrcnn_resnet50_fpn(num_classes=NUM_CLASSES)
+    model.to(device)
+    if CHANNELS_LAST:
+        apply_channels_last(model)
+
+    # --- micro-batch / gradient accumulation ---
+    train_cfg = config["training"]
+    micro_batch = train_cfg["batch_size"]
+    accumulation_steps = train_cfg.get("accumulation_steps", 1)
+    target_batch = micro_batch * accumulation_steps
+    if train_cfg.get("auto_batch", False):
+        probed = find_max_micro_batch(model, device, image_size=config["augmentation"]["image_size"],
+                                      num_classes=NUM_CLASSES, amp=AMP,
+                                      max_batch=min(train_cfg.get("max_micro_batch", 16), target_batch))
+        if probed is not None:
+            micro_batch = probed
+            accumulation_steps, _ = plan_batches(target_batch, micro_batch)
+    effective_batch = micro_batch * accumulation_steps
+
+    learning_rate, weight_decay = scale_hyperparams(train_cfg["learning_rate"], train_cfg["weight_decay"],
+                                                    effective_batch, train_cfg.get("base_batch_size", train_cfg["batch_size"]),
+                                                    train_cfg.get("lr_scaling", "linear"))
+    print(f"micro-batch {micro_batch} x accumulation {accumulation_steps} = effective batch {effective_batch} "
+          f"(lr {learning_rate:.2e}, weight_decay {weight_decay:.2e})")
+
+    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
+    scaler = make_grad_scaler(device, AMP)
+    print(f"AMP: {AMP} (scaler {'on' if scaler.is_enabled() else 'off'}), channels_last: {CHANNELS_LAST}")
+
+    # --- 체크포인트에서 이어서 학습 (--resume 이 없으면 ckpt_dir 의 최신 체크포인트 자동 사용) ---
+    ckpt_manager = CheckpointManager(args.ckpt_dir, keep_top_k=train_cfg.get("keep_top_k", 3),
+                                     metric=train_cfg.get("checkpoint_metric", "val/map"))
+    resume_path = args.resume or (None if args.no_auto_resume else ckpt_manager.latest())
+    if not resume_path:
+        ckpt_manager.start_new_run()  # 이전 실행의 체크포인트가 top-k 경쟁에 끼지 않도록
+    global_step = 0
+    checkpoint = None
+    if resume_path:
+        checkpoint = load_checkpoint(resume_path, map_location=device)
+        model.load_state_dict(checkpoint["model_state_dict"])
+        optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+        if scaler.is_enabled() and checkpoint.get("scaler_state_dict"):
+            scaler.load_state_dict(checkpoint["scaler_state_dict"])
+        if checkpoint.get("amp", False) != AMP or checkpoint.get("channels_last", False) != CHANNELS_LAST:
+            print(f"[경고] 체크포인트 설정(amp={checkpoint.get('amp', False)}, channels_last={checkpoint.get('channels_last', False)})"
+                  f" 과 현재 설정이 다릅니다 → 현재 설정으로 계속")
+        start_epoch = checkpoint["epoch"] + 1
+        global_step = checkpoint.get("global_step", 0)
+        print(f"Resume: {resume_path} → epoch {start_epoch + 1} 부터")
+
+    # --- 데이터셋/로더 정의 ---
+    train_dataset, val_dataset = build_datasets(config)
+
+    loader_cfg = config.get("loader", {})
+    train_loader = DataLoader(train_dataset, batch_size=micro_batch, shuffle=True, **loader_kwargs(loader_cfg))
+    val_loader = DataLoader(val_dataset, batch_size=train_cfg.get("val_batch_size", 8), shuffle=False,
+                            **loader_kwargs(loader_cfg))
+
+    # 셔플/augmentation 순서까지 이어지도록 RNG 상태는 로더 생성 후 복원
+    if checkpoint is not None and "rng_state" in checkpoint:
+        restore_rng_state(checkpoint["rng_state"])
+
+    # --- 학습 루프 ---
+    logger = AsyncLogger(use_wandb=args.use_wandb)
+    for epoch in range(start_epoch, EPOCHS):
+        global_step = train_one_epoch(model, optimizer, train_loader, device, epoch, use_wandb=args.use_wandb,
+                                      amp=AMP, scaler=scaler, logger=logger,
+                                      accumulation_steps=accumulation_steps, global_step=global_step)
+        logger.flush()
+        val_metrics = run_evaluation(model, val_loader, device, epoch, use_wandb=args.use_wandb, amp=AMP, logger=logger)
+
+        # 모델 저장: CPU 스냅샷만 뜨고 파일 쓰기/오래된 체크포인트 정리는 백그라운드 스레드에서
+        ckpt_manager.save(epoch, {
+            "global_step": global_step,
+            "effective_batch_size": effective_batch,
+            "model_state_dict": model.state_dict(),
+            "optimizer_state_dict": optimizer.state_dict(),
+            "scaler_state_dict": scaler.state_dict() if scaler.is_enabled() else None,
+            "amp": AMP,
+            "channels_last": CHANNELS_LAST,
+        }, metric_value=val_metrics.get(ckpt_manager.metric))
+
+    ckpt_manager.close()
+    logger.close()
+
+# DataLoader worker 가 spawn 방식(macOS/Windows)으로 이 모듈을 다시 import 해도 학습이 재실행되지 않도록 main 가드 사용
+if __name__ == "__main__":
+    # --- argparse, yaml ---
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--use_wandb", action="store_true", help="Enable Weights & Biases logging")
+    parser.add_argument("--ckpt_dir", type=str, default="checkpoints_3", help="Directory to save checkpoints")
+    parser.add_argument("--config", type=str, default="ftrcnn_config.yaml", help="Path to config yaml")
+    parser.add_argument("--resume", type=str, default=None, help="이어서 학습할 .pth 체크포인트 (기본: ckpt_dir 의 최신)")
+    parser.add_argument("--no_auto_resume", action="store_true", help="ckpt_dir 에 체크포인트가 있어도 처음부터 학습")
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Subset
+
+from engine.evaluator import run_evaluation
+from engine.inference import InferenceEngine, load_model, export_torchscript
+from engine.quantization import quantize_model
+from dataset import FasterRCNNDataset, get_val_transform, collate_fn
+
+def timed_evaluation(model, loader, num_images):
+    start = time.perf_counter()
+    metrics = run_evaluation(model, loader, torch.device("cpu"))
+    return metrics, 1000 * (time.perf_counter() - start) / num_images
+
+def main(args):
+    torch.set_num_threads(args.threads or torch.get_num_threads())
+    stem = os.path.splitext(args.checkpoint)[0]
+    out_path = args.out or f"{stem}_int8.pt"
+
+    # --- fp32 모델 / val 데이터 ---
+    model = load_model(args.checkpoint, args.num_classes, torch.device("cpu"), channels_last=False)
+    val_df = pd.read_csv(args.val_csv)
+    val_dataset = FasterRCNNDataset(val_df, image_dir=args.image_dir, transforms=get_val_transform())
+
+    # --- calibration: val_df 이미지 중 무작위 표본 ---
+    rng = np.random.default_rng(args.seed)
+    calib_indices = rng.choice(len(val_dataset), size=min(args.calib_images, len(val_dataset)), replace=False)
+    calibration_images = [val_dataset[int(i)][0] for i in calib_indices]
+    print(f"calibration: val 이미지 {len(calibration_images)}장 (seed={args.seed})")
+
+    quantized = quantize_model(model, calibration_images, backend=args.backend)
+    export_torchscript(quantized, out_path)
+    print(f"int8 모델 저장: {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+
+    # --- fp32 vs int8: mAP / 이미지당 지연 시간 ---
+    eval_dataset = val_dataset if args.eval_images is None else Subset(val_dataset, range(min(args.eval_images, len(val_dataset))))
+    loader = DataLoader(eval_dataset, batch_size=args.batch_size, shuffle=False, collate_fn=collate_fn)
+    fp32_metrics, fp32_ms = timed_evaluation(model, loader, len(eval_dataset))
+    int8_metrics, int8_ms = timed_evaluation(InferenceEngine(out_path, device="cpu"), loader, len(eval_dataset))
+
+    map_delta = int8_metrics["val/map"] - fp32_metrics["val/map"]
+    report = {
+        "checkpoint": args.checkpoint,
+        "quantized": out_path,
+        "quantized_engine": args.backend,
+        "calibration_images": len(calibration_images),
+        "eval_images": len(eval_dataset),
+        "threads": torch.get_num_threads(),
+        "fp32": {"map": fp32_metrics["val/map"], "map_50": fp32_metrics["val/map_50"], "ms_per_image": fp32_ms},
+        "int8": {"map": int8_metrics["val/map"], "map_50": int8_metrics["val/map_50"], "ms_per_image": int8_ms},
+        "map_delta": map_delta,
+        "map_50_delta": int8_metrics["val/map_50"] - fp32_metrics["val/map_50"],
+        "speedup": fp32_ms / int8_ms,
+        "fp32_size_mb": os.path.getsize(args.checkpoint) / 1e6,
+        "int8_size_mb": os.path.getsize(out_path) / 1e6,
+        "accepted": -map_delta <= args.max_map_drop,
+    }
+    report_path = os.path.splitext(out_path)[0] + ".json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n[Quantization Report] ({report['eval_images']} val images, threads={report['threads']})")
+    print(f"mAP        : fp32 {report['fp32']['map']:.4f} → int8 {report['int8']['map']:.4f} ({map_delta:+.4f})")
+    print(f"mAP@0.5    : fp32 {report['fp32']['map_50']:.4f} → int8 {report['int8']['map_50']:.4f} ({report['map_50_delta']:+.4f})")
+    print(f"ms / image : fp32 {fp32_ms:.1f} → int8 {int8_ms:.1f} (x{report['speedup']:.2f})")
+    print(f"판정       : {'채택' if report['accepted'] else '기각'} (허용 mAP 하락 {args.max_map_drop}) → {report_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", type=str, required=True, help="ftrcnn_train.py 가 저장한 .pth")
+    parser.add_argument("--out", type=str, default=None, help="기본: <checkpoint>_int8.pt (TorchScript)")
+    parser.add_argument("--val_csv", type=str, default="data/val_df.csv")
+    parser.add_argument("--image_dir", type=str, default="val_images")
+    parser.add_argument("--num_classes", type=int, default=74)
+    parser.add_argument("--calib_images", type=int, default=64, help="calibration 에 쓸 val 이미지 수")
+    parser.add_argument("--eval_images", type=int, default=None, help="mAP / 속도 비교에 쓸 val 이미지 수 (기본: 전체)")
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--backend", type=str, default="x86", choices=["x86", "fbgemm", "qnnpack"], help="양자화 커널 (ARM: qnnpack)")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max_map_drop", type=float, default=0.01, help="허용 mAP 하락 (넘으면 기각)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    main(args)
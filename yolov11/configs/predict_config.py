@@ -1,5 +1,8 @@
-YOLO_PREDICT_PARAMS = {
-    "conf": 0.5,
-    "iou": 0.5,
-    "agnostic_nms": True
-}
\ No newline at end of file
+YOLO_PREDICT_PARAMS = {
+    "conf": 0.5,
+    "iou": 0.5,
+    "agnostic_nms": True
+}
+
+# 앙상블 오답 분석용 (두 모델 예측을 합친 뒤 판단하므로 conf 를 낮춤)
+ENSEMBLE_PREDICT_PARAMS = {**YOLO_PREDICT_PARAMS, "conf": 0.3}
@@ -1,28 +1,44 @@
 import os
+import sys
 from pathlib import Path
 from collections import defaultdict
 
 # ✅ BASE_DIR = yolov11/scripts → parent = yolov11
 BASE_DIR = Path(__file__).resolve().parent
 TRAIN_LABEL_DIR = BASE_DIR.parent / "yolo_dataset" / "labels" / "train"
+TRAIN_IMAGE_DIR = BASE_DIR.parent / "yolo_dataset" / "images" / "train"
+TRAIN_SHARD_DIR = BASE_DIR.parent / "shards" / "yolo_train"   # scripts/pack_shards.py 결과 (원본과 같은 상태면 우선 사용)
+
+
+# ✅ 라벨 텍스트 순회: shard 가 최신이면 이미지 바이트는 건드리지 않고 라벨 record 만 순차로 읽음
+def iter_label_texts():
+    if (TRAIN_SHARD_DIR / "index.json").exists():
+        sys.path.append(str(BASE_DIR.parent.parent / "faster_rcnn"))
+        from dataset.shards import ShardReader, is_shard_current
+        if is_shard_current(TRAIN_SHARD_DIR, TRAIN_IMAGE_DIR, TRAIN_LABEL_DIR, ".txt"):
+            for record in ShardReader(TRAIN_SHARD_DIR):
+                yield record.ann_text()
+            return
+        print(f"⚠️ shard 가 원본보다 오래됨 → 개별 라벨 파일 사용 (scripts/pack_shards.py 로 다시 묶으세요): {TRAIN_SHARD_DIR}")
+
+    for file in os.listdir(TRAIN_LABEL_DIR):
+        if not file.endswith(".txt"):
+            continue
+        with open(TRAIN_LABEL_DIR / file, "r") as f:
+            yield f.read()
 
 # 클래스별 어노테이션 수 저장용
 class_counts = defaultdict(int)
 total_annotations = 0
 
-# .txt 라벨 파일 순회
-for file in os.listdir(TRAIN_LABEL_DIR):
-    if not file.endswith(".txt"):
-        continue
-
-    file_path = TRAIN_LABEL_DIR / file
-    with open(file_path, "r") as f:
-        for line in f:
-            if line.strip() == "":
-                continue
-            class_id = line.strip().split()[0]
-            class_counts[class_id] += 1
-            total_annotations += 1
+# .txt 라벨 순회
+for text in iter_label_texts():
+    for line in text.splitlines():
+        if line.strip() == "":
+            continue
+        class_id = line.strip().split()[0]
+        class_counts[class_id] += 1
+        total_annotations += 1
 
 # ✅ 출력
 print("📊 YOLO 학습 데이터 클래스 통계 (yolo_dataset/labels/train 기준):")
@@ -0,0 +1,260 @@
+"""
+이미지별 COCO JSON 을 한 번만 파싱해 만든 열(column) 단위 어노테이션 저장소 (NPZ).
+
+convert_to_yolo / convert_with_aug / crop_balancer / generate_collages 가 수천 개의 작은 JSON 을
+매번 json.load 하는 대신 이 저장소를 조회합니다.
+
+이미지 테이블 (이미지 1장 = 1행)
+    json_name, file_name, image_path, width, height, json_mtime_ns, json_size
+    ann_offsets: 이미지 i 의 어노테이션은 ann_offsets[i]:ann_offsets[i + 1]
+어노테이션 테이블 (bbox 1개 = 1행)
+    ann_image (이미지 행 번호), bbox [x, y, w, h], category_id (-1: 정수 변환 실패)
+    class_index (-1: 매핑 없음) 는 파일에 저장하지 않고 build() 때 넘긴 category_to_class 로 매번 계산
+    (매핑을 넘기는 스크립트와 안 넘기는 스크립트가 번갈아 실행돼도 저장소 파일은 그대로)
+카테고리 테이블
+    category_ids, category_json (JSON "categories" 항목 원문, 처음 등장한 것)
+
+build() 는 JSON 의 mtime/size 가 바뀐 파일과 새 파일만 프로세스 풀에서 다시 파싱하고, 사라진 JSON 의 행은 제거합니다.
+
+    python scripts/annotation_store.py            # ORIGINAL / ADD 저장소 갱신
+"""
+import os
+import json
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+STORE_VERSION = 1
+
+# ✅ 경로 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+PROJECT_DIR = BASE_DIR.parent                         # Project/
+DATA_DIR = PROJECT_DIR / "data"
+STORE_DIR = BASE_DIR / "annotation_store"
+MAPPING_PATH = BASE_DIR / "configs" / "class_to_category.txt"
+
+# ✅ 저장소 이름 → (annotation 폴더, image 폴더)
+SOURCES = {
+    "ORIGINAL": (DATA_DIR / "ORIGINAL" / "annotations", DATA_DIR / "ORIGINAL" / "images"),
+    "ADD": (DATA_DIR / "ADD" / "annotations", DATA_DIR / "ADD" / "images"),
+    "crops": (BASE_DIR / "crops_data" / "jsons", BASE_DIR / "crops_data" / "images"),
+    "collage": (BASE_DIR / "collage_json", BASE_DIR / "collage_images"),
+}
+
+IMAGE_COLUMNS = ("json_name", "file_name", "image_path", "width", "height", "json_mtime_ns", "json_size")
+ANN_COLUMNS = ("ann_image", "bbox", "category_id")
+
+
+def load_category_to_class_map(mapping_path=MAPPING_PATH):
+    category_to_class = {}
+    with open(mapping_path, 'r', encoding='utf-8') as f:
+        for class_index, line in enumerate(f):
+            category_id = int(line.strip())
+            category_to_class[category_id] = class_index
+    return category_to_class
+
+
+def _to_category_id(value):
+    try:
+        return int(value)
+    except Exception:
+        return -1
+
+
+# ✅ JSON 1개 파싱 (worker 프로세스에서 실행)
+def parse_json(json_path):
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        image_info = data['images'][0]
+        anns = data['annotations']
+        bboxes = [[float(v) for v in ann['bbox']] for ann in anns]
+        category_ids = [_to_category_id(ann['category_id']) for ann in anns]
+        categories = [(c['id'], json.dumps(c, ensure_ascii=False)) for c in data.get('categories', [])]
+        file_name = image_info.get('file_name', Path(json_path).stem + ".png")
+        return (file_name, image_info['width'], image_info['height'], bboxes, category_ids, categories), None
+    except Exception as e:
+        return None, f"{json_path} - {e}"
+
+
+class AnnotationStore:
+    """열 단위 어노테이션 저장소. build() 로 만들고/갱신하고, load() 로 읽기만 할 수 있다."""
+
+    def __init__(self, columns, categories):
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.categories = categories  # category_id → categories 항목 dict
+        self._stem_index = None
+
+    # ---------- 조회 ----------
+    def __len__(self):
+        return len(self.json_name)
+
+    @property
+    def num_annotations(self):
+        return len(self.ann_image)
+
+    def annotations(self, i):
+        # 이미지 i 의 어노테이션 행 범위
+        return slice(self.ann_offsets[i], self.ann_offsets[i + 1])
+
+    def find(self, name):
+        # 파일 stem (또는 확장자 포함 파일명) → 이미지 행 번호, 없으면 None
+        if self._stem_index is None:
+            self._stem_index = {Path(n).stem: i for i, n in enumerate(self.json_name)}
+        return self._stem_index.get(Path(name).stem)
+
+    @property
+    def ann_image_path(self):
+        # 어노테이션 행마다 이미지 경로 (비정규화 view)
+        return self.image_path[self.ann_image]
+
+    def category_counts(self):
+        # category_id → 어노테이션 수 (정수 변환 실패 행 제외)
+        ids, counts = np.unique(self.category_id[self.category_id >= 0], return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def set_class_index(self, category_to_class):
+        lookup = {int(k): v for k, v in category_to_class.items()}
+        self.class_index = np.array([lookup.get(c, -1) for c in self.category_id.tolist()], dtype=np.int32)
+
+    # ---------- 저장 / 로드 ----------
+    def save(self, store_path):
+        store_path = Path(store_path)
+        store_path.parent.mkdir(parents=True, exist_ok=True)
+        category_ids = np.array(sorted(self.categories), dtype=np.int64)
+        category_json = np.array([json.dumps(self.categories[c], ensure_ascii=False) for c in category_ids.tolist()],
+                                 dtype=str)
+        tmp_path = store_path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, version=np.int64(STORE_VERSION), ann_offsets=self.ann_offsets,
+                 category_ids=category_ids, category_json=category_json,
+                 **{name: getattr(self, name) for name in IMAGE_COLUMNS + ANN_COLUMNS})
+        os.replace(tmp_path, store_path)
+
+    @classmethod
+    def load(cls, store_path):
+        with np.load(store_path, allow_pickle=False) as npz:
+            if int(npz["version"]) != STORE_VERSION:
+                raise ValueError(f"저장소 버전 불일치: {store_path}")
+            columns = {name: npz[name] for name in IMAGE_COLUMNS + ANN_COLUMNS + ("ann_offsets",)}
+            categories = {int(c): json.loads(s) for c, s in zip(npz["category_ids"].tolist(), npz["category_json"].tolist())}
+        store = cls(columns, categories)
+        store.set_class_index({})
+        return store
+
+    @classmethod
+    def build(cls, ann_dir, image_dir, store_path, category_to_class=None, workers=None, verbose=True):
+        """ann_dir 의 *.json 으로 저장소를 만들거나 갱신해서 반환한다 (바뀐 JSON 만 다시 파싱).
+
+        store_path 가 None 이면 파일로 저장하지 않고 매번 전부 파싱한다.
+        """
+        ann_dir, image_dir = Path(ann_dir), Path(image_dir)
+        store_path = Path(store_path) if store_path is not None else None
+        old = None
+        if store_path is not None and store_path.exists():
+            try:
+                old = cls.load(store_path)
+            except (ValueError, KeyError, OSError) as e:
+                print(f"⚠️ 저장소 재생성: {e}")
+
+        json_names = sorted(f for f in os.listdir(ann_dir) if f.endswith(".json")) if ann_dir.exists() else []
+        stats = [os.stat(ann_dir / name) for name in json_names]
+
+        # 1) mtime/size 가 같은 JSON 은 이전 행 재사용
+        old_index = {} if old is None else {n: i for i, n in enumerate(old.json_name.tolist())}
+        reuse, to_parse = {}, []
+        for name, st in zip(json_names, stats):
+            i = old_index.get(name)
+            if i is not None and old.json_mtime_ns[i] == st.st_mtime_ns and old.json_size[i] == st.st_size:
+                reuse[name] = i
+            else:
+                to_parse.append(name)
+
+        # 2) 새/변경 JSON 병렬 파싱
+        paths = [str(ann_dir / name) for name in to_parse]
+        workers = workers or os.cpu_count()
+        if workers > 1 and len(paths) > 64:
+            # 모듈 최상위에서 바로 실행되는 스크립트(crop_balancer 등)에서도 쓰이므로 가능하면 fork 로 worker 생성
+            context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                parsed = list(pool.map(parse_json, paths, chunksize=max(1, min(256, len(paths) // (workers * 4)))))
+        else:
+            parsed = [parse_json(p) for p in paths]
+        parsed = dict(zip(to_parse, parsed))
+
+        # 3) JSON 파일명 순서대로 다시 조립
+        categories = dict(old.categories) if old is not None else {}
+        image_rows = {name: [] for name in IMAGE_COLUMNS}
+        bbox_parts, category_parts, counts = [], [], []
+        failed = 0
+        for name, st in zip(json_names, stats):
+            if name in reuse:
+                i = reuse[name]
+                rows = old.annotations(i)
+                file_name, width, height = old.file_name[i], old.width[i], old.height[i]
+                bbox, category_id = old.bbox[rows], old.category_id[rows]
+            else:
+                record, error = parsed[name]
+                if record is None:
+                    print(f"❌ 오류 발생: {error}")
+                    failed += 1
+                    continue
+                file_name, width, height, bboxes, category_ids, file_categories = record
+                bbox = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+                category_id = np.array(category_ids, dtype=np.int64)
+                for cid, c in file_categories:
+                    categories.setdefault(_to_category_id(cid), json.loads(c))
+
+            for column, value in zip(IMAGE_COLUMNS, (name, file_name, str(image_dir / file_name), width, height,
+                                                     st.st_mtime_ns, st.st_size)):
+                image_rows[column].append(value)
+            bbox_parts.append(bbox)
+            category_parts.append(category_id)
+            counts.append(len(category_id))
+
+        columns = {
+            "json_name": np.array(image_rows["json_name"], dtype=str),
+            "file_name": np.array(image_rows["file_name"], dtype=str),
+            "image_path": np.array(image_rows["image_path"], dtype=str),
+            "width": np.array(image_rows["width"], dtype=np.int64),
+            "height": np.array(image_rows["height"], dtype=np.int64),
+            "json_mtime_ns": np.array(image_rows["json_mtime_ns"], dtype=np.int64),
+            "json_size": np.array(image_rows["json_size"], dtype=np.int64),
+            "ann_offsets": np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64),
+            "ann_image": np.repeat(np.arange(len(counts), dtype=np.int32), counts),
+            "bbox": np.concatenate(bbox_parts) if bbox_parts else np.zeros((0, 4)),
+            "category_id": np.concatenate(category_parts) if category_parts else np.zeros(0, dtype=np.int64),
+            "class_index": None,
+        }
+        store = cls(columns, categories)
+        store.set_class_index(category_to_class or {})
+
+        removed = len(old_index) - len(reuse) - sum(1 for n in to_parse if n in old_index)
+        if verbose:
+            print(f"🗂️ 어노테이션 저장소 {ann_dir.name if store_path is None else store_path.name}: 이미지 {len(store)}장 / bbox {store.num_annotations}개 "
+                  f"(재사용 {len(reuse)}, 파싱 {len(to_parse) - failed}, 실패 {failed}, 삭제 {removed})")
+        if store_path is not None and (to_parse or removed or old is None):
+            store.save(store_path)
+        return store
+
+
+def open_store(name, category_to_class=None, workers=None):
+    """SOURCES 에 등록된 저장소를 갱신 후 반환."""
+    ann_dir, image_dir = SOURCES[name]
+    return AnnotationStore.build(ann_dir, image_dir, STORE_DIR / f"{name}.npz",
+                                 category_to_class=category_to_class, workers=workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", nargs="+", default=["ORIGINAL", "ADD"], choices=list(SOURCES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    category_to_class = load_category_to_class_map()
+    for name in args.names:
+        open_store(name, category_to_class, workers=args.workers)
@@ -0,0 +1,57 @@
+"""
+generate_collages.plan_collages 확장성 벤치마크: crop 수에 따른 콜라주 계획(클래스 샘플링 + 배치) 시간.
+
+이미지 I/O 없이 합성 crop 목록(클래스 수 --classes, 크기 --min_size ~ --max_size px)으로 측정합니다.
+crop 수가 늘어도 crop 1개당 시간(µs/crop)이 일정하면 선형입니다.
+
+    python yolov11/scripts/bench_collages.py --sizes 10000 50000 100000
+"""
+import time
+import random
+import argparse
+from pathlib import Path
+
+from generate_collages import plan_collages, CANVAS_SIZE
+
+# ✅ 디렉토리 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+
+
+def make_crops(num_crops, num_classes, min_size, max_size, seed):
+    rng = random.Random(seed)
+    crops = []
+    for n in range(num_crops):
+        # 실제 데이터처럼 클래스별 개수가 고르지 않게 (앞쪽 클래스일수록 많음)
+        category_id = 1000 + min(int(rng.expovariate(3 / num_classes)), num_classes - 1)
+        crops.append((str(category_id), f"{category_id}_{n}.png", category_id,
+                      rng.randint(min_size, max_size), rng.randint(min_size, max_size)))
+    return crops
+
+
+def bench(crops, seed):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    num_collages = placed = 0
+    for collage in plan_collages(crops, rng):
+        num_collages += 1
+        placed += len(collage)
+    return time.perf_counter() - start, num_collages, placed
+
+
+def main(args):
+    print(f"canvas {CANVAS_SIZE}px, 클래스 {args.classes}개, crop 크기 {args.min_size}~{args.max_size}px")
+    print(f"{'crops':>8s} {'collages':>9s} {'placed':>8s} {'sec':>8s} {'µs/crop':>8s}")
+    for num_crops in args.sizes:
+        crops = make_crops(num_crops, args.classes, args.min_size, args.max_size, args.seed)
+        elapsed, num_collages, placed = bench(crops, args.seed)
+        print(f"{num_crops:8d} {num_collages:9d} {placed:8d} {elapsed:8.2f} {1e6 * elapsed / num_crops:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 25000, 50000, 100000])
+    parser.add_argument("--classes", type=int, default=74)
+    parser.add_argument("--min_size", type=int, default=60)
+    parser.add_argument("--max_size", type=int, default=320)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
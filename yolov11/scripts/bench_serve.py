@@ -0,0 +1,121 @@
+"""
+serve_model.py 부하 테스트: max_batch 별 p50 / p99 지연 시간과 처리량.
+
+max_batch 값마다 서버를 별도 프로세스로 띄우고(--url 을 주면 이미 떠 있는 서버 하나만 측정),
+--concurrency 개의 클라이언트 스레드가 val 이미지를 쉬지 않고 POST /predict 합니다.
+
+    python yolov11/scripts/bench_serve.py --max_batches 1 2 4 8 --concurrency 16 --requests 400
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ✅ 디렉토리 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+IMAGE_DIR = BASE_DIR / "yolo_dataset" / "images" / "val"
+MODEL_PATH = BASE_DIR / "runs" / "yolov11l_aug" / "exp" / "weights" / "best.pt"
+
+
+def load_payloads(image_dir, limit):
+    files = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg"))[:limit]
+    if not files:
+        raise FileNotFoundError(f"이미지 없음: {image_dir}")
+    return [f.read_bytes() for f in files]
+
+
+def get_json(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def wait_ready(url, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("서버 프로세스가 종료되었습니다")
+        try:
+            return get_json(f"{url}/health", timeout=1)
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"서버 준비 시간 초과: {url}")
+
+
+def run_load(url, payloads, num_requests, concurrency):
+    def send(i):
+        request = urllib.request.Request(f"{url}/predict", data=payloads[i % len(payloads)],
+                                         headers={"Content-Type": "application/octet-stream"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=60) as response:
+            body = json.loads(response.read())
+        return time.perf_counter() - start, body["batch_size"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(num_requests)))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "throughput": num_requests / wall,
+        "mean_batch": float(np.mean([r[1] for r in results])),
+    }
+
+
+def bench_server(args, url, payloads, process=None):
+    info = wait_ready(url, process, args.startup_timeout)
+    # warmup (측정 제외)
+    run_load(url, payloads, min(args.concurrency, args.requests), args.concurrency)
+    result = run_load(url, payloads, args.requests, args.concurrency)
+    return info["max_batch"], result
+
+
+def main(args):
+    payloads = load_payloads(args.image_dir, args.images)
+    print(f"이미지 {len(payloads)}장, 요청 {args.requests}개, 동시 클라이언트 {args.concurrency}")
+    print(f"{'max_batch':>9s} {'p50 ms':>9s} {'p99 ms':>9s} {'req/s':>8s} {'평균 batch':>10s}")
+
+    def report(max_batch, r):
+        print(f"{max_batch:9d} {r['p50_ms']:9.1f} {r['p99_ms']:9.1f} {r['throughput']:8.2f} {r['mean_batch']:10.2f}")
+
+    if args.url:
+        report(*bench_server(args, args.url.rstrip("/"), payloads))
+        return
+
+    for i, max_batch in enumerate(args.max_batches):
+        port = args.port + i
+        command = [sys.executable, str(SCRIPT_DIR / "serve_model.py"), "--model", args.model,
+                   "--port", str(port), "--max_batch", str(max_batch), "--max_wait_ms", str(args.max_wait_ms)]
+        if args.device is not None:
+            command += ["--device", args.device]
+        process = subprocess.Popen(command)
+        try:
+            report(*bench_server(args, f"http://127.0.0.1:{port}", payloads, process))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default=str(MODEL_PATH))
+    parser.add_argument("--url", type=str, default=None, help="이미 실행 중인 서버 (예: http://127.0.0.1:8000)")
+    parser.add_argument("--max_batches", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--max_wait_ms", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--image_dir", type=str, default=str(IMAGE_DIR))
+    parser.add_argument("--images", type=int, default=64, help="요청에 돌려 쓸 val 이미지 수")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument("--startup_timeout", type=float, default=180)
+    main(parser.parse_args())
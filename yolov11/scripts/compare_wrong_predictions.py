@@ -1,36 +1,33 @@
 import os
 import sys
-import cv2
+import csv
 import numpy as np
-from ultralytics import YOLO
 
 # ✅ 경로 설정
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))         # yolov11/scripts
 BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir)) # yolov11/
+PROJECT_DIR = os.path.abspath(os.path.join(BASE_DIR, os.pardir)) # 프로젝트 루트
 sys.path.append(BASE_DIR)  # configs 모듈 import 가능하게 설정
+sys.path.append(os.path.join(PROJECT_DIR, "faster_rcnn"))  # engine.coco_map / engine.box_matching import 가능하게 설정
 
 from configs.predict_config import YOLO_PREDICT_PARAMS
+from engine.coco_map import COCOMeanAP
+from engine.box_matching import ErrorAnalyzer
+from prediction_cache import PredictionCache, list_images
 
 IMAGE_DIR = os.path.join(BASE_DIR, "yolo_dataset", "images", "val")
 LABEL_DIR = os.path.join(BASE_DIR, "yolo_dataset", "labels", "val")
 PILL_LIST_PATH = os.path.join(BASE_DIR, "configs", "pill_list.txt")
+REPORT_PATH = os.path.join(BASE_DIR, "results", "wrong_predictions_by_class.csv")
+
+# ✅ 오류 분석 설정 (예측 ↔ GT 1:1 매칭, 임계값 여러 개를 한 번에 계산)
+IOU_THRESHOLDS = (0.5, 0.75, 0.9)
+MATCH_METHOD = "score"   # "score": score 순 greedy (COCO 방식) / "optimal": 같은 클래스 우선 최적 할당
 
 # ✅ 클래스 이름 불러오기
 with open(PILL_LIST_PATH, encoding="utf-8") as f:
     class_names = [line.strip() for line in f]
 
-# ✅ IoU 계산 함수
-def compute_iou(box1, box2):
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
-    inter = max(0, x2 - x1) * max(0, y2 - y1)
-    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-    union = area1 + area2 - inter
-    return inter / union if union != 0 else 0
-
 # ✅ GT YOLO bbox 로드
 def load_gt_boxes(label_path, img_w, img_h):
     boxes, classes = [], []
@@ -57,60 +54,54 @@ model_paths = {
 }
 
 # ✅ 모델별 평가 루프
+image_paths = list_images(IMAGE_DIR)
+report_rows = []
 for model_name, model_path in model_paths.items():
     if not os.path.exists(model_path):
         print(f"\n📌 {model_name} 모델 파일 없음: {model_path}")
         continue
 
     print(f"\n🚀 {model_name} 예측 및 오류 분석 시작")
-    model = YOLO(model_path)
+    # 같은 best.pt + 같은 이미지면 prediction_cache/ 에 저장된 예측을 그대로 사용 (없는 이미지만 추론)
+    cache = PredictionCache(model_path, {key: YOLO_PREDICT_PARAMS[key] for key in ("conf", "iou", "agnostic_nms")})
+    predictions = cache.predict(image_paths)
 
-    results = model.predict(
-        source=IMAGE_DIR,
-        conf=YOLO_PREDICT_PARAMS["conf"],
-        iou=YOLO_PREDICT_PARAMS["iou"],
-        agnostic_nms=YOLO_PREDICT_PARAMS["agnostic_nms"],
-        save=False,
-        verbose=False
-    )
+    coco_map = COCOMeanAP()
+    analyzer = ErrorAnalyzer(iou_thresholds=IOU_THRESHOLDS, method=MATCH_METHOD, num_classes=len(class_names))
 
-    class_error = 0
-    bbox_error = 0
-
-    for result in results:
-        img_name = os.path.basename(result.path)
-        img_path = os.path.join(IMAGE_DIR, img_name)
+    for prediction in predictions:
+        img_name = os.path.basename(prediction.path)
         label_path = os.path.join(LABEL_DIR, os.path.splitext(img_name)[0] + ".txt")
-
-        img = cv2.imread(img_path)
-        if img is None:
-            continue
-        h, w, _ = img.shape
+        h, w = prediction.orig_shape  # 원본 크기는 캐시에 있으므로 이미지를 다시 읽지 않음
 
         gt_boxes, gt_classes = load_gt_boxes(label_path, w, h)
-        used_gt = set()
-
-        pred_boxes = result.boxes.xyxy.cpu().numpy()
-        pred_classes = result.boxes.cls.cpu().numpy()
-
-        for pb, pc in zip(pred_boxes, pred_classes):
-            matched = False
-            for i, (gb, gc) in enumerate(zip(gt_boxes, gt_classes)):
-                iou = compute_iou(pb, gb)
-                if iou >= 0.5:
-                    if int(pc) != int(gc):
-                        class_error += 1  # 클래스 불일치
-                    used_gt.add(i)
-                    matched = True
-                    break
-            if not matched:
-                bbox_error += 1  # false positive
-
-        for i in range(len(gt_boxes)):
-            if i not in used_gt:
-                bbox_error += 1  # missed GT box
+        pred = {"boxes": prediction.boxes, "scores": prediction.scores, "labels": prediction.classes}
+        target = {"boxes": gt_boxes, "labels": gt_classes}
+        coco_map.update([pred], [target])
+        analyzer.update([pred], [target])
 
     # ✅ 결과 출력
+    map_results = coco_map.compute()
+    errors = analyzer.compute()
     print(f"🌟 {model_name} 결과 요약")
-    print(f"   - 분류 오류 개수 (클래스 불일치): {class_error}")
-    print(f"   - BBox 오류 개수 (누락/과검출): {bbox_error}")
\ No newline at end of file
+    print(f"   - mAP@0.5:0.95 / mAP@0.5 (conf={YOLO_PREDICT_PARAMS['conf']}): "
+          f"{map_results['map']:.4f} / {map_results['map_50']:.4f}")
+    for t, iou_thr in enumerate(IOU_THRESHOLDS):
+        print(f"   - IoU≥{iou_thr}: 분류 오류 (클래스 불일치) {errors['class_error'][t]}, "
+              f"과검출 {errors['false_positive'][t]}, 누락 {errors['missed'][t]}")
+
+    # 클래스별 (오류가 있는 클래스만)
+    per_class = errors["per_class"]
+    for c in np.flatnonzero((per_class["class_error"] + per_class["false_positive"] + per_class["missed"]).sum(axis=0)):
+        report_rows.extend(
+            [model_name, iou_thr, int(c), class_names[c] if c < len(class_names) else str(c),
+             int(per_class["class_error"][t, c]), int(per_class["false_positive"][t, c]), int(per_class["missed"][t, c])]
+            for t, iou_thr in enumerate(IOU_THRESHOLDS))
+
+# ✅ 모델 × IoU 임계값 × 클래스별 오류 저장
+os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+with open(REPORT_PATH, "w", newline="", encoding="utf-8-sig") as f:
+    writer = csv.writer(f)
+    writer.writerow(["model", "iou", "class_id", "class_name", "class_error", "false_positive", "missed"])
+    writer.writerows(report_rows)
+print(f"\n📄 클래스별 오류 저장 → {REPORT_PATH}")
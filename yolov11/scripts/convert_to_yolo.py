@@ -1,7 +1,17 @@
 import os
+import sys
 import json
-import cv2
+import hashlib
+import argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from annotation_store import AnnotationStore, STORE_DIR
+
+MANIFEST_VERSION = 2
 
 # ✅ category_id → class_id 매핑 로드
 def load_category_to_class_map(mapping_path):
@@ -12,79 +22,264 @@ def load_category_to_class_map(mapping_path):
             category_to_class[category_id] = class_index
     return category_to_class
 
-# ✅ YOLO 형식 변환 함수
-def convert_dataset_to_yolo(image_dir, json_dir, output_image_dir, output_label_dir, category_to_class, target_size=640):
-    os.makedirs(output_image_dir, exist_ok=True)
-    os.makedirs(output_label_dir, exist_ok=True)
-
-    if not image_dir.exists() or not json_dir.exists():
-        print(f"❌ 경로 없음: {image_dir if not image_dir.exists() else json_dir}")
-        return
+# ✅ 매핑 버전: 매핑 파일 내용 해시 (바뀌면 모든 라벨 재생성)
+def load_mapping_version(mapping_path):
+    with open(mapping_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
 
+# ✅ 변환 대상 목록 → (samples, 원본 이미지 파일명 전체)
+# 각 sample: (이미지 파일명, 이미지 위치, YOLO 라벨 줄, 변경 감지용 stamp)
+# JSON 이 없어 건너뛴 이미지도 원본 목록에는 포함 (이전 출력은 원본 이미지가 사라졌을 때만 삭제)
+#   - 개별 파일: 라벨은 어노테이션 저장소(annotation_store.py)에서 조회, stamp = 이미지/JSON 의 mtime/size
+#   - shard:    라벨은 shard 안의 JSON,                                 stamp = shard 파일 전체 fingerprint
+def list_loose_samples(image_dir, store, target_size):
     image_files = sorted([f for f in os.listdir(image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))])
     print(f"\n📂 변환 시작: {image_dir.name} ({len(image_files)}장)")
 
+    samples = []
     for img_file in image_files:
-        base_name = Path(img_file).stem
-        json_file = base_name + ".json"
-
-        img_path = image_dir / img_file
-        json_path = json_dir / json_file
+        json_file = Path(img_file).stem + ".json"
+        i = store.find(img_file)
 
-        if not json_path.exists():
+        if i is None:
             print(f"⚠️ 매칭되는 JSON 없음: {json_file}")
             continue
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        yolo_lines = store_yolo_lines(store, i, target_size, json_file)
+        img_stat = os.stat(image_dir / img_file)
+        stamp = [img_stat.st_mtime_ns, img_stat.st_size, int(store.json_mtime_ns[i]), int(store.json_size[i])]
+        samples.append((img_file, ("file", str(image_dir / img_file)), yolo_lines, stamp))
+    return samples, set(image_files)
 
-        image_info = data['images'][0]
-        original_w, original_h = image_info['width'], image_info['height']
+# ✅ shard 레이아웃 (scripts/pack_shards.py 로 생성)
+def list_shard_samples(shard_dir, category_to_class, target_size):
+    reader = open_shard_reader(shard_dir)
+    print(f"\n📂 변환 시작 (shard): {shard_dir} ({len(reader)}장)")
 
-        img = cv2.imread(str(img_path))
-        if img is None:
-            print(f"❌ 이미지 로딩 실패: {img_path}")
+    stamp = reader.fingerprint()
+    samples, image_files = [], set()
+    for record in reader:
+        image_files.add(record.image_name)
+        if not record.has_annotation:
+            print(f"⚠️ 매칭되는 JSON 없음: {record.key}.json")
             continue
+        yolo_lines = to_yolo_lines(record.ann_json(), category_to_class, target_size, record.key + ".json")
+        samples.append((record.image_name, ("shard", str(shard_dir), record.key), yolo_lines, stamp))
+    return samples, image_files
+
+_shard_readers = {}
 
-        resized_img = cv2.resize(img, (target_size, target_size))
-        scale_x = target_size / original_w
-        scale_y = target_size / original_h
+def open_shard_reader(shard_dir):
+    # 프로세스마다 shard_dir 별로 한 번만 mmap
+    shard_dir = str(shard_dir)
+    if shard_dir not in _shard_readers:
+        sys.path.append(str(PROJECT_DIR / "faster_rcnn"))
+        from dataset.shards import ShardReader
+        _shard_readers[shard_dir] = ShardReader(shard_dir)
+    return _shard_readers[shard_dir]
 
-        yolo_lines = []
-        for ann in data['annotations']:
-            x, y, w, h = ann['bbox']
-            x *= scale_x
-            y *= scale_y
-            w *= scale_x
-            h *= scale_y
+# ✅ shard 가 원본 폴더와 같은 상태일 때만 사용 (원본에 파일이 추가/수정/삭제되었으면 개별 파일로 읽음)
+def shard_is_current(shard_dir, image_dir, json_dir):
+    if not (shard_dir / "index.json").exists():
+        return False
+    sys.path.append(str(PROJECT_DIR / "faster_rcnn"))
+    from dataset.shards import is_shard_current
+    if is_shard_current(shard_dir, image_dir, json_dir, ".json"):
+        return True
+    print(f"⚠️ shard 가 원본보다 오래됨 → 개별 파일 사용 (scripts/pack_shards.py 로 다시 묶으세요): {shard_dir}")
+    return False
 
-            x_center = (x + w / 2) / target_size
-            y_center = (y + h / 2) / target_size
-            w_norm = w / target_size
-            h_norm = h / target_size
+def read_image_bytes(source):
+    if source[0] == "shard":
+        return open_shard_reader(source[1]).get(source[2]).image_bytes
+    with open(source[1], 'rb') as f:
+        return f.read()
 
-            try:
-                category_id = int(ann['category_id'])
-            except Exception as e:
-                print(f"❌ category_id 에러: {ann.get('category_id')} → {json_file}")
-                continue
+def format_yolo_line(class_id, x, y, w, h, scale_x, scale_y, target_size):
+    x *= scale_x
+    y *= scale_y
+    w *= scale_x
+    h *= scale_y
+
+    x_center = (x + w / 2) / target_size
+    y_center = (y + h / 2) / target_size
+    w_norm = w / target_size
+    h_norm = h / target_size
+    return f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}"
+
+# ✅ 저장소 행 → YOLO 라벨 줄
+def store_yolo_lines(store, i, target_size, json_file):
+    scale_x = target_size / store.width[i]
+    scale_y = target_size / store.height[i]
+
+    yolo_lines = []
+    rows = store.annotations(i)
+    for (x, y, w, h), category_id, class_id in zip(store.bbox[rows].tolist(), store.category_id[rows].tolist(),
+                                                   store.class_index[rows].tolist()):
+        if category_id < 0:
+            print(f"❌ category_id 에러 → {json_file}")
+            continue
+        if class_id < 0:
+            print(f"⚠️ 매핑 누락 category_id {category_id} → {json_file}")
+            continue
+        yolo_lines.append(format_yolo_line(class_id, x, y, w, h, scale_x, scale_y, target_size))
+    return yolo_lines
+
+# ✅ COCO JSON(dict) → YOLO 라벨 줄
+def to_yolo_lines(data, category_to_class, target_size, json_file):
+    image_info = data['images'][0]
+    original_w, original_h = image_info['width'], image_info['height']
+    scale_x = target_size / original_w
+    scale_y = target_size / original_h
+
+    yolo_lines = []
+    for ann in data['annotations']:
+        x, y, w, h = ann['bbox']
+
+        try:
+            category_id = int(ann['category_id'])
+        except Exception as e:
+            print(f"❌ category_id 에러: {ann.get('category_id')} → {json_file}")
+            continue
+
+        if category_id not in category_to_class:
+            print(f"⚠️ 매핑 누락 category_id {category_id} → {json_file}")
+            continue
 
-            if category_id not in category_to_class:
-                print(f"⚠️ 매핑 누락 category_id {category_id} → {json_file}")
-                continue
+        class_id = category_to_class[category_id]
+        yolo_lines.append(format_yolo_line(class_id, x, y, w, h, scale_x, scale_y, target_size))
+    return yolo_lines
 
-            class_id = category_to_class[category_id]
-            yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}")
+# ✅ 이미지 1장 변환 (worker 프로세스에서 실행)
+# 원본 이미지 + 라벨 내용 해시가 manifest 의 이전 해시와 같으면 (mtime 만 바뀐 경우) 디코딩 없이 "unchanged"
+def convert_one(task):
+    img_file, source, label_text, prev_hash, save_img_path, save_lbl_path, target_size = task
+    image_bytes = read_image_bytes(source)
 
-        # 저장
-        save_img_path = output_image_dir / img_file
-        save_lbl_path = output_label_dir / (base_name + ".txt")
+    h = hashlib.sha1(image_bytes)
+    h.update(label_text.encode('utf-8'))
+    src_hash = h.hexdigest()
+    if src_hash == prev_hash:
+        return img_file, "unchanged", src_hash
 
-        cv2.imwrite(str(save_img_path), resized_img)
-        with open(save_lbl_path, 'w') as f:
-            f.write('\n'.join(yolo_lines))
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return img_file, "failed", src_hash
 
-        print(f"✅ 변환 완료: {img_file}")
+    # 저장
+    resized_img = cv2.resize(img, (target_size, target_size))
+    cv2.imwrite(save_img_path, resized_img)
+    with open(save_lbl_path, 'w') as f:
+        f.write(label_text)
+    return img_file, "converted", src_hash
+
+def init_worker():
+    cv2.setNumThreads(1)  # 프로세스 단위로 병렬화하므로 OpenCV 내부 스레드는 끔
+
+# ✅ manifest: 출력 이미지 파일명 → 원본 hash/stamp, target_size, 매핑 버전, 출력 경로
+def load_manifest(manifest_path):
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest["entries"]
+    return {}
+
+def save_manifest(manifest_path, entries):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "entries": entries}, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+def remove_outputs(entry):
+    for key in ("image", "label"):
+        try:
+            os.remove(entry[key])
+        except FileNotFoundError:
+            pass
+
+# ✅ 변환 결과를 manifest 항목에 반영 (실패한 이미지는 이전 출력 삭제)
+def record_results(results, tasks, entries, stamps, counts, target_size, mapping_version):
+    for (img_file, status, src_hash), task in zip(results, tasks):
+        counts[status] += 1
+        if status == "failed":
+            print(f"❌ 이미지 로딩 실패: {img_file}")
+            if img_file in entries:
+                remove_outputs(entries.pop(img_file))
+            continue
+        entries[img_file] = {
+            "src_hash": src_hash,
+            "stamp": stamps[img_file],
+            "target_size": target_size,
+            "mapping_version": mapping_version,
+            "image": task[4],
+            "label": task[5],
+        }
+        if status == "converted":
+            print(f"✅ 변환 완료: {img_file}")
+
+# ✅ YOLO 형식 변환 함수 (shard_dir 가 원본과 같은 상태면 shard 에서 읽음)
+# 개별 파일 레이아웃의 어노테이션은 store_path 의 저장소로 읽음 (바뀐 JSON 만 다시 파싱)
+# manifest_path 가 있으면 새로 추가/변경된 이미지만 변환하고, 원본이 사라진 출력은 삭제
+def convert_dataset_to_yolo(image_dir, json_dir, output_image_dir, output_label_dir, category_to_class, target_size=640,
+                            shard_dir=None, manifest_path=None, mapping_version=None, workers=1, store_path=None):
+    os.makedirs(output_image_dir, exist_ok=True)
+    os.makedirs(output_label_dir, exist_ok=True)
+
+    if shard_dir is not None and shard_is_current(shard_dir, image_dir, json_dir):
+        samples, source_images = list_shard_samples(shard_dir, category_to_class, target_size)
+    elif not image_dir.exists() or not json_dir.exists():
+        print(f"❌ 경로 없음: {image_dir if not image_dir.exists() else json_dir}")
+        return
+    else:
+        store = AnnotationStore.build(json_dir, image_dir, store_path, category_to_class=category_to_class, workers=workers)
+        samples, source_images = list_loose_samples(image_dir, store, target_size)
+
+    entries = load_manifest(manifest_path) if manifest_path is not None else {}
+
+    # 1) 원본 이미지가 없어진 출력 삭제 (JSON 만 빠진 이미지는 이전 출력 유지)
+    stale = [img_file for img_file in entries if img_file not in source_images]
+    for img_file in stale:
+        remove_outputs(entries.pop(img_file))
+        print(f"🗑️ 원본 없음 → 삭제: {img_file}")
+
+    # 2) stamp / target_size / 매핑 버전 / 출력 파일이 모두 그대로면 건너뜀
+    tasks, stamps = [], {}
+    for img_file, source, yolo_lines, stamp in samples:
+        save_img_path = str(output_image_dir / img_file)
+        save_lbl_path = str(output_label_dir / (Path(img_file).stem + ".txt"))
+        entry = entries.get(img_file)
+        same_config = entry is not None and entry["target_size"] == target_size \
+            and entry["mapping_version"] == mapping_version \
+            and entry["image"] == save_img_path and entry["label"] == save_lbl_path \
+            and os.path.exists(save_img_path) and os.path.exists(save_lbl_path)
+        if same_config and entry["stamp"] == stamp:
+            continue
+        prev_hash = entry["src_hash"] if same_config else None
+        tasks.append((img_file, source, '\n'.join(yolo_lines), prev_hash, save_img_path, save_lbl_path, target_size))
+        stamps[img_file] = stamp
+
+    skipped = len(samples) - len(tasks)
+    print(f"🔎 변환 대상 {len(tasks)}장 / 최신 상태 {skipped}장 / 삭제 {len(stale)}장 (workers={workers})")
+
+    # 3) 변환 (workers > 1 이면 프로세스 풀)
+    counts = {"converted": 0, "unchanged": 0, "failed": 0}
+    try:
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                results = pool.map(convert_one, tasks, chunksize=max(1, min(64, len(tasks) // (workers * 4))))
+                record_results(results, tasks, entries, stamps, counts, target_size, mapping_version)
+        else:
+            init_worker()
+            record_results(map(convert_one, tasks), tasks, entries, stamps, counts, target_size, mapping_version)
+    finally:
+        # 중간에 실패해도 완료된 이미지까지는 기록 → 다음 실행에서 이어서 변환
+        if manifest_path is not None:
+            save_manifest(manifest_path, entries)
+
+    print(f"📊 변환 {counts['converted']}장, 내용 동일 {counts['unchanged'] + skipped}장, "
+          f"실패 {counts['failed']}장, 삭제 {len(stale)}장")
 
 # ✅ 경로 설정
 SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
@@ -93,34 +288,55 @@ PROJECT_DIR = BASE_DIR.parent                         # Project/
 
 MAPPING_PATH = BASE_DIR / "configs" / "class_to_category.txt"
 YOLO_OUT_DIR = BASE_DIR / "yolo_dataset"
+MANIFEST_DIR = YOLO_OUT_DIR / "manifests"
 DATA_DIR = PROJECT_DIR / "data"
 
-# ✅ 매핑 로드
-category_to_class = load_category_to_class_map(MAPPING_PATH)
-
 # ✅ 데이터셋 변환 설정 (train: ADD, ORIGINAL)
+# shard_dir 가 있고 원본 폴더와 같은 상태면 (scripts/pack_shards.py) 개별 파일 대신 shard 에서 읽음
 datasets = [
     {
         "name": "ADD",
         "image_dir": DATA_DIR / "ADD" / "images",
         "json_dir": DATA_DIR / "ADD" / "annotations",
+        "shard_dir": DATA_DIR / "shards" / "ADD",
         "output_type": "train"
     },
     {
         "name": "ORIGINAL",
         "image_dir": DATA_DIR / "ORIGINAL" / "images",
         "json_dir": DATA_DIR / "ORIGINAL" / "annotations",
+        "shard_dir": DATA_DIR / "shards" / "ORIGINAL",
         "output_type": "train"
     }
 ]
 
-# ✅ 변환 실행
-for ds in datasets:
-    print(f"\n🚀 {ds['name']} 변환 중...")
-    convert_dataset_to_yolo(
-        image_dir=ds["image_dir"],
-        json_dir=ds["json_dir"],
-        output_image_dir=YOLO_OUT_DIR / "images" / ds["output_type"],
-        output_label_dir=YOLO_OUT_DIR / "labels" / ds["output_type"],
-        category_to_class=category_to_class
-    )
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="변환 프로세스 수 (1 = 단일 프로세스)")
+    parser.add_argument("--target_size", type=int, default=640)
+    parser.add_argument("--force", action="store_true", help="manifest 를 무시하고 전부 다시 변환")
+    args = parser.parse_args()
+
+    # ✅ 매핑 로드
+    category_to_class = load_category_to_class_map(MAPPING_PATH)
+    mapping_version = load_mapping_version(MAPPING_PATH)
+
+    # ✅ 변환 실행
+    for ds in datasets:
+        print(f"\n🚀 {ds['name']} 변환 중...")
+        manifest_path = MANIFEST_DIR / f"{ds['name']}.json"
+        if args.force and manifest_path.exists():
+            manifest_path.unlink()
+        convert_dataset_to_yolo(
+            image_dir=ds["image_dir"],
+            json_dir=ds["json_dir"],
+            output_image_dir=YOLO_OUT_DIR / "images" / ds["output_type"],
+            output_label_dir=YOLO_OUT_DIR / "labels" / ds["output_type"],
+            category_to_class=category_to_class,
+            target_size=args.target_size,
+            shard_dir=ds["shard_dir"],
+            manifest_path=manifest_path,
+            mapping_version=mapping_version,
+            workers=args.workers,
+            store_path=STORE_DIR / f"{ds['name']}.npz"
+        )
@@ -1,8 +1,18 @@
 import os
-import json
+import sys
+import time
+import random
+import zlib
+import argparse
 import cv2
-import albumentations as A
+import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from annotation_store import AnnotationStore, STORE_DIR
+
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent / "faster_rcnn"))
+from dataset.transforms import get_collage_transform
 
 def load_category_to_class_map(mapping_path):
     category_to_class = {}
@@ -12,96 +22,133 @@ def load_category_to_class_map(mapping_path):
             category_to_class[category_id] = class_index
     return category_to_class
 
-# ✅ 증강 정의
-transform = A.Compose([
-    A.HueSaturationValue(hue_shift_limit=25, sat_shift_limit=35, val_shift_limit=25, p=0.5),
-    A.RGBShift(r_shift_limit=25, g_shift_limit=25, b_shift_limit=25, p=0.5),
-    A.ColorJitter(brightness=0.2, contrast=0.2, saturation=0.35, hue=0.15, p=0.5),
-    A.OneOf([
-        A.InvertImg(p=0.15),
-        A.Solarize(p=0.2),
-        A.RandomToneCurve(p=0.25)
-    ], p=0.25),
-    A.Rotate(limit=5, border_mode=0, p=0.7),
-    A.OneOf([
-        A.GaussianBlur(blur_limit=(3, 5)),
-        A.MotionBlur(blur_limit=7),
-        A.Blur(blur_limit=5)
-    ], p=0.4)
-], bbox_params=A.BboxParams(format='coco', label_fields=['category_ids']))
-
-def convert_json_folder_to_yolo_with_aug(image_dir, json_dir, output_image_dir, output_label_dir, mapping_path, target_size=640):
+# ✅ 증강 정의 (faster_rcnn/dataset/transforms.py, 학습 중 콜라주 합성과 공용)
+transform = get_collage_transform(bbox_format='coco', label_field='category_ids')
+
+# ✅ 변형(variant)별 시드: (seed, 원본 파일명, 변형 번호) 로 정해짐 → 파일이 추가/삭제돼도 다른 이미지의 결과는 그대로
+def variant_seed(seed, stem, k):
+    return int(np.random.SeedSequence([seed, zlib.crc32(stem.encode("utf-8")), k]).generate_state(1)[0])
+
+# ✅ 출력 파일명: num_variants 가 None 이면 기존처럼 원본 이름 그대로 (덮어씀), 아니면 {stem}_aug{k}.png 로 원본과 겹치지 않게
+def variant_file_name(img_filename, k, num_variants):
+    if num_variants is None:
+        return img_filename
+    stem, ext = os.path.splitext(img_filename)
+    return f"{stem}_aug{k:0{max(2, len(str(num_variants - 1)))}d}{ext}"
+
+# ✅ YOLO 라벨 (bbox 배열 한 번에 정규화/포맷)
+def to_yolo_text(bboxes, class_ids, target_size):
+    if len(class_ids) == 0:
+        return ""
+    xywh = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    norm = np.column_stack([xywh[:, 0] + xywh[:, 2] / 2, xywh[:, 1] + xywh[:, 3] / 2, xywh[:, 2], xywh[:, 3]]) / target_size
+    class_ids = np.asarray(class_ids, dtype=np.int64).tolist()  # albumentations 가 label 을 float 로 돌려줄 수 있음
+    return '\n'.join(f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}" for c, (x, y, w, h) in zip(class_ids, norm.tolist()))
+
+# ✅ 증강 시드 설정: albumentations >= 1.4.24 는 Compose 자체 RNG, 그 이전 버전은 전역 random / np.random 을 사용
+def seed_transform(seed):
+    if hasattr(transform, "set_random_seed"):
+        transform.set_random_seed(seed)
+    random.seed(seed)
+    np.random.seed(seed)
+
+def init_worker():
+    cv2.setNumThreads(1)  # 프로세스 단위로 병렬화하므로 OpenCV 내부 스레드는 끔
+    # fork 된 worker 는 부모의 RNG 상태를 그대로 물려받음 → 시드 없는 기존 동작에서도 worker 마다 다른 증강이 나오도록 다시 시드
+    seed_transform(int.from_bytes(os.urandom(4), "little"))
+
+# ✅ 원본 1장 → 변형 K장 (worker 프로세스에서 실행): 디코딩/리사이즈는 한 번만 하고 K개 변형이 공유
+# 이미지는 worker 에서 저장하고, 라벨 텍스트는 돌려받아 메인 프로세스에서 한꺼번에 씀
+def augment_source(task):
+    img_path, img_filename, bboxes, class_ids, variants, output_image_dir, target_size = task
+    img = cv2.imread(img_path)
+    if img is None:
+        return [], [f"❌ 이미지 로딩 실패: {img_path}"]
+    resized_img = cv2.resize(img, (target_size, target_size))
+
+    labels, errors = [], []
+    for save_name, seed in variants:
+        if seed is not None:
+            seed_transform(seed)
+        try:
+            augmented = transform(image=resized_img, bboxes=bboxes, category_ids=class_ids)
+        except Exception as e:
+            errors.append(f"⚠️ 증강 오류: {save_name} - {e}")
+            continue
+        cv2.imwrite(os.path.join(output_image_dir, save_name), augmented['image'].astype("uint8"))
+        labels.append((os.path.splitext(save_name)[0] + '.txt',
+                       to_yolo_text(augmented['bboxes'], augmented['category_ids'], target_size)))
+    return labels, errors
+
+# 어노테이션은 store_path 의 저장소(annotation_store.py)로 읽음 (바뀐 JSON 만 다시 파싱)
+# num_variants=None: 원본마다 증강 1장을 원본 이름으로 저장 (기존 동작, 시드 없음)
+# num_variants=K: 원본마다 (seed, 파일명, 변형 번호) 로 정해진 증강 K장을 {stem}_augNN.png 로 저장
+def convert_json_folder_to_yolo_with_aug(image_dir, json_dir, output_image_dir, output_label_dir, mapping_path, target_size=640,
+                                         store_path=None, num_variants=None, seed=0, workers=1):
     os.makedirs(output_image_dir, exist_ok=True)
     os.makedirs(output_label_dir, exist_ok=True)
 
     category_to_class = load_category_to_class_map(mapping_path)
-    json_files = [f for f in os.listdir(json_dir) if f.endswith('.json')]
+    store = AnnotationStore.build(json_dir, image_dir, store_path, category_to_class=category_to_class)
 
-    for json_file in json_files:
-        json_path = os.path.join(json_dir, json_file)
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        image_info = data['images'][0]
-        img_filename = image_info['file_name']
-        img_path = os.path.join(image_dir, img_filename)
+    tasks = []
+    for i in range(len(store)):
+        json_file = store.json_name[i]
+        img_filename = str(store.file_name[i])
+        img_path = str(store.image_path[i])
 
         if not os.path.exists(img_path):
             print(f"❌ 이미지 없음: {img_path}")
             continue
 
-        img = cv2.imread(img_path)
-        original_h, original_w = image_info['height'], image_info['width']
+        original_h, original_w = int(store.height[i]), int(store.width[i])
         scale_x = target_size / original_w
         scale_y = target_size / original_h
 
-        bboxes, category_ids = [], []
-        for ann in data['annotations']:
-            x, y, w, h = ann['bbox']
-            x *= scale_x
-            y *= scale_y
-            w *= scale_x
-            h *= scale_y
-            bboxes.append([x, y, w, h])
-            category_ids.append(int(ann['category_id']))
-
-        if not bboxes:
-            continue
-
-        resized_img = cv2.resize(img, (target_size, target_size))
-
-        try:
-            augmented = transform(image=resized_img, bboxes=bboxes, category_ids=category_ids)
-        except Exception as e:
-            print(f"⚠️ 증강 오류: {img_filename} - {e}")
+        rows = store.annotations(i)
+        if rows.start == rows.stop:
             continue
-
-        image_aug = augmented['image'].astype("uint8")
-        bboxes_aug = augmented['bboxes']
-        category_ids_aug = augmented['category_ids']
-
-        yolo_lines = []
-        for bbox, category_id in zip(bboxes_aug, category_ids_aug):
-            if category_id not in category_to_class:
-                print(f"⚠️ category_id {category_id} 매핑 누락: {json_file}")
-                continue
-
-            x, y, w, h = bbox
-            x_center = (x + w / 2) / target_size
-            y_center = (y + h / 2) / target_size
-            w_norm = w / target_size
-            h_norm = h / target_size
-            class_id = category_to_class[category_id]
-            yolo_lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {w_norm:.6f} {h_norm:.6f}")
-
-        save_img_path = os.path.join(output_image_dir, img_filename)
-        save_label_path = os.path.join(output_label_dir, img_filename.replace('.png', '.txt'))
-
-        cv2.imwrite(save_img_path, image_aug)
-        with open(save_label_path, 'w') as f:
-            f.write('\n'.join(yolo_lines))
-
-        print(f"✅ 변환 및 증강 완료: {img_filename}")
+        mapped = store.class_index[rows] >= 0
+        for category_id in store.category_id[rows][~mapped].tolist():
+            print(f"⚠️ category_id {category_id} 매핑 누락: {json_file}")
+        bboxes = (store.bbox[rows][mapped] * [scale_x, scale_y, scale_x, scale_y]).tolist()
+        class_ids = store.class_index[rows][mapped].tolist()
+
+        stem = Path(img_filename).stem
+        variants = [(img_filename, None)] if num_variants is None else \
+            [(variant_file_name(img_filename, k, num_variants), variant_seed(seed, stem, k)) for k in range(num_variants)]
+        tasks.append((img_path, img_filename, bboxes, class_ids, variants, str(output_image_dir), target_size))
+
+    names = [name for task in tasks for name, _ in task[4]]
+    if len(set(names)) != len(names):
+        raise ValueError("출력 파일명이 겹칩니다 (같은 이미지 파일명을 가진 JSON 이 여러 개)")
+
+    start = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            results = pool.map(augment_source, tasks, chunksize=max(1, min(16, len(tasks) // (workers * 4))))
+            written = write_results(results, output_label_dir)
+    else:
+        written = write_results(map(augment_source, tasks), output_label_dir)
+    elapsed = time.perf_counter() - start
+
+    cores = workers if workers > 1 and len(tasks) > 1 else 1
+    rate = written / elapsed if elapsed > 0 else 0.0
+    print(f"✅ 변환 및 증강 완료: 원본 {len(tasks)}장 → 증강 {written}장, {elapsed:.1f}s "
+          f"({rate:.1f} images/s, 코어당 {rate / cores:.1f} images/s, workers={cores})")
+    return written
+
+# ✅ 라벨은 원본 단위로 모아서 한꺼번에 기록
+def write_results(results, output_label_dir):
+    written = 0
+    for labels, errors in results:
+        for message in errors:
+            print(message)
+        for label_name, text in labels:
+            with open(os.path.join(output_label_dir, label_name), 'w') as f:
+                f.write(text)
+        written += len(labels)
+    return written
 
 # ✅ 실행부
 if __name__ == "__main__":
@@ -109,11 +156,22 @@ if __name__ == "__main__":
     # 기준 디렉토리: yolov11/
     BASE_DIR = Path(__file__).resolve().parent.parent
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variants", type=int, default=None,
+                        help="원본마다 만들 증강 수 K ({stem}_augNN.png, 원본과 겹치지 않음). 없으면 원본 이름으로 1장 (기존 동작)")
+    parser.add_argument("--seed", type=int, default=0, help="--variants 사용 시 증강 시드 (같은 seed → 같은 결과)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="증강 프로세스 수 (1 = 단일 프로세스)")
+    args = parser.parse_args()
+
     convert_json_folder_to_yolo_with_aug(
         image_dir=BASE_DIR / "collage_images",
         json_dir=BASE_DIR / "collage_json",
         output_image_dir=BASE_DIR / "yolo_dataset" / "images" / "train",
         output_label_dir=BASE_DIR / "yolo_dataset" / "labels" / "train",
         mapping_path=BASE_DIR / "configs" / "class_to_category.txt",
-        target_size=640
-    )
\ No newline at end of file
+        target_size=640,
+        store_path=STORE_DIR / "collage.npz",
+        num_variants=args.variants,
+        seed=args.seed,
+        workers=args.workers
+    )
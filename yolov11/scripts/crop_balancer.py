@@ -1,10 +1,15 @@
 from pathlib import Path
 import os
 import json
+import argparse
 import cv2
+import numpy as np
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
+from annotation_store import AnnotationStore, STORE_DIR
+
 # ✅ 빈 경로 설정
 SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts/
 BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
@@ -16,127 +21,158 @@ OUTPUT_JSON_DIR = BASE_DIR / "crops_data" / "jsons"
 
 # ✅ 파라미터 설정
 TARGET_COUNT = 300
-MAX_ITER = 50
+MAX_ITER = 50        # 같은 어노테이션을 최대 몇 번까지 반복해서 crop 할지
+START_IMG_ID = 100000
 
 # ✅ 경로 리스트
 annotation_dirs = [
-    {"ann": ORIGINAL_DIR / "annotations", "img": ORIGINAL_DIR / "images"},
-    {"ann": ADD_DIR / "annotations", "img": ADD_DIR / "images"},
+    {"name": "ORIGINAL", "ann": ORIGINAL_DIR / "annotations", "img": ORIGINAL_DIR / "images"},
+    {"name": "ADD", "ann": ADD_DIR / "annotations", "img": ADD_DIR / "images"},
 ]
 
-# ✅ 저장 폴더 생성
-os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
-os.makedirs(OUTPUT_JSON_DIR, exist_ok=True)
-
-# ✅ 1단계: category_id 등장 개수 초기화
-category_id_counter = defaultdict(int)
-print("🔍 [1단계] 카테고리 등장 횟수 초기화 중...")
-
-for dataset in annotation_dirs:
-    for file in os.listdir(dataset["ann"]):
-        if not file.endswith(".json"):
+# ✅ 1단계: planner
+# 카테고리별 부족분(TARGET_COUNT - 현재 개수)을 한 번만 계산하고, 어노테이션 저장소에서 crop 할 bbox 를 배정.
+# 기존 반복 방식(전체 어노테이션을 최대 MAX_ITER 번 순회하며 부족한 카테고리를 하나씩 채움)과
+# 같은 순서/같은 파일명({cat_id}_{n}.png)/같은 image id 가 나오도록 (반복 회차, 어노테이션 순서) 로 정렬함.
+def plan_crops(stores, target_count=TARGET_COUNT, max_iter=MAX_ITER):
+    category_id_counter = defaultdict(int)
+    for store in stores:
+        for cat_id, count in store.category_counts().items():
+            category_id_counter[cat_id] += count
+
+    # crop 가능한 bbox (원본 이미지 범위로 자른 뒤 w, h > 0, 이미지 파일 존재)
+    candidates = defaultdict(list)  # cat_id → [(store 번호, 어노테이션 행, x, y, w, h)]
+    for s, store in enumerate(stores):
+        exists = np.array([os.path.exists(p) for p in store.image_path.tolist()], dtype=bool)
+        xywh = store.bbox.astype(np.int64)
+        width, height = store.width[store.ann_image], store.height[store.ann_image]
+        x, y = np.maximum(xywh[:, 0], 0), np.maximum(xywh[:, 1], 0)
+        w, h = np.minimum(xywh[:, 2], width - x), np.minimum(xywh[:, 3], height - y)
+        valid = (w > 0) & (h > 0) & (store.category_id >= 0) & exists[store.ann_image]
+        for row in np.flatnonzero(valid).tolist():
+            cat_id = int(store.category_id[row])
+            candidates[cat_id].append((s, row, int(x[row]), int(y[row]), int(w[row]), int(h[row])))
+
+    plan = []  # (반복 회차, store 번호, 어노테이션 행, cat_id, x, y, w, h)
+    for cat_id, rows in candidates.items():
+        deficit = target_count - category_id_counter[cat_id]
+        n_take = max(0, min(deficit, len(rows) * max_iter))
+        for k in range(n_take):
+            plan.append((k // len(rows),) + rows[k % len(rows)][:2] + (cat_id,) + rows[k % len(rows)][2:])
+    plan.sort(key=lambda item: item[:3])
+
+    crop_counter = defaultdict(int)
+    crops = []
+    for n, (_, s, row, cat_id, x, y, w, h) in enumerate(plan):
+        crop_counter[cat_id] += 1
+        crops.append({
+            "store": s,
+            "image": int(stores[s].ann_image[row]),
+            "cat_id": cat_id,
+            "save_name": f"{cat_id}_{crop_counter[cat_id]}",
+            "box": (x, y, w, h),
+            "img_id": START_IMG_ID + n,
+            "ann_id": 1 + n,
+        })
+    return crops, category_id_counter
+
+# ✅ 2단계: executor
+# 원본 이미지 1장당 한 번만 디코딩해서 그 이미지에서 나오는 crop 을 모두 저장 (worker 프로세스에서 실행)
+def crop_image(task):
+    image_path, crops = task
+    img = cv2.imread(image_path)
+    if img is None:
+        return []
+
+    written = []
+    for crop in crops:
+        x, y, w, h = crop["box"]
+        crop_img = img[y:y + h, x:x + w]
+        if crop_img.size == 0:
             continue
-        json_path = dataset["ann"] / file
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            for ann in data["annotations"]:
-                cat_id = str(ann["category_id"])
-                category_id_counter[cat_id] += 1
-        except Exception as e:
-            print(f"❌ 오류 발생: {json_path} - {e}")
-
-# ✅ crop용 카운터 및 ID 초기화
-crop_counter = defaultdict(int)
-img_id = 100000
-ann_id = 1
-
-# ✅ 2단계: 부족한 category_id에 대해 crop
-for iter_num in range(MAX_ITER):
-    print(f"\n🔁 [반복 {iter_num + 1}] 부족한 category_id 채워기 시작...")
 
+        save_name = crop["save_name"]
+        cv2.imwrite(str(OUTPUT_IMG_DIR / f"{save_name}.png"), crop_img)
+
+        json_data = {
+            "images": [{
+                "file_name": f"{save_name}.png",
+                "width": w,
+                "height": h,
+                "id": crop["img_id"]
+            }],
+            "annotations": [{
+                "id": crop["ann_id"],
+                "image_id": crop["img_id"],
+                "bbox": [0, 0, w, h],
+                "area": w * h,
+                "iscrowd": 0,
+                "ignore": 0,
+                "segmentation": [],
+                "category_id": crop["cat_id"]
+            }],
+            "categories": crop["categories"]
+        }
+
+        with open(OUTPUT_JSON_DIR / f"{save_name}.json", 'w', encoding='utf-8') as jf:
+            json.dump(json_data, jf, ensure_ascii=False, indent=2)
+        written.append(crop["cat_id"])
+    return written
+
+def init_worker():
+    cv2.setNumThreads(1)  # 프로세스 단위로 병렬화하므로 OpenCV 내부 스레드는 끔
+
+def execute_plan(stores, crops, workers):
+    by_image = defaultdict(list)
+    for crop in crops:
+        store = stores[crop["store"]]
+        category = store.categories.get(crop["cat_id"])
+        crop["categories"] = [category] if category is not None else []
+        by_image[(crop["store"], crop["image"])].append(crop)
+    tasks = [(str(stores[s].image_path[i]), image_crops) for (s, i), image_crops in by_image.items()]
+    print(f"🖼️ 원본 이미지 {len(tasks)}장에서 crop {len(crops)}개 생성 (workers={workers})")
+
+    written = defaultdict(int)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            results = pool.map(crop_image, tasks, chunksize=max(1, min(32, len(tasks) // (workers * 4))))
+            for cat_ids in tqdm(results, total=len(tasks), desc="crop"):
+                for cat_id in cat_ids:
+                    written[cat_id] += 1
+    else:
+        for task in tqdm(tasks, desc="crop"):
+            for cat_id in crop_image(task):
+                written[cat_id] += 1
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="crop 프로세스 수 (1 = 단일 프로세스)")
+    args = parser.parse_args()
+
+    # ✅ 저장 폴더 생성
+    os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_JSON_DIR, exist_ok=True)
+
+    # 어노테이션은 JSON 을 매번 읽지 않고 저장소(annotation_store.py)에서 조회 (바뀐 JSON 만 다시 파싱)
+    stores = [AnnotationStore.build(dataset["ann"], dataset["img"], STORE_DIR / f"{dataset['name']}.npz")
+              for dataset in annotation_dirs]
+
+    print("🔍 [1단계] 카테고리별 부족분 계산 및 crop 배정 중...")
+    crops, category_id_counter = plan_crops(stores)
     still_short = sum(1 for v in category_id_counter.values() if v < TARGET_COUNT)
     print(f"⏳ 현재 {TARGET_COUNT}개 미만인 category 수: {still_short}")
-    updated = False
-
-    for dataset in annotation_dirs:
-        for file in os.listdir(dataset["ann"]):
-            if not file.endswith(".json"):
-                continue
-            json_path = dataset["ann"] / file
-            try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                image_info = data["images"][0]
-                image_path = dataset["img"] / image_info["file_name"]
-                width, height = image_info["width"], image_info["height"]
-                categories = {str(c["id"]): c for c in data["categories"]}
-
-                for ann in data["annotations"]:
-                    cat_id = str(ann["category_id"])
-                    if category_id_counter[cat_id] >= TARGET_COUNT:
-                        continue
-
-                    img = cv2.imread(str(image_path))
-                    if img is None:
-                        continue
-
-                    x, y, w, h = map(int, ann["bbox"])
-                    x, y = max(0, x), max(0, y)
-                    w, h = min(w, width - x), min(h, height - y)
-                    if w <= 0 or h <= 0:
-                        continue
-
-                    crop_img = img[y:y + h, x:x + w]
-                    if crop_img.size == 0:
-                        continue
-
-                    crop_counter[cat_id] += 1
-                    save_name = f"{cat_id}_{crop_counter[cat_id]}"
-                    save_img_path = OUTPUT_IMG_DIR / f"{save_name}.png"
-                    save_json_path = OUTPUT_JSON_DIR / f"{save_name}.json"
-                    cv2.imwrite(str(save_img_path), crop_img)
-
-                    json_data = {
-                        "images": [{
-                            "file_name": f"{save_name}.png",
-                            "width": w,
-                            "height": h,
-                            "id": img_id
-                        }],
-                        "annotations": [{
-                            "id": ann_id,
-                            "image_id": img_id,
-                            "bbox": [0, 0, w, h],
-                            "area": w * h,
-                            "iscrowd": 0,
-                            "ignore": 0,
-                            "segmentation": [],
-                            "category_id": int(cat_id)
-                        }],
-                        "categories": [categories[cat_id]] if cat_id in categories else []
-                    }
-
-                    with open(save_json_path, 'w', encoding='utf-8') as jf:
-                        json.dump(json_data, jf, ensure_ascii=False, indent=2)
-
-                    category_id_counter[cat_id] += 1
-                    img_id += 1
-                    ann_id += 1
-                    updated = True
-
-                    print(f"✅ crop 완료: category_id {cat_id} → {category_id_counter[cat_id]} / {TARGET_COUNT}")
-
-            except Exception as e:
-                print(f"❌ 오류: {json_path} - {e}")
-
-    if not updated:
-        print("✅ 더 이상 추가할 수 있는 항목이 없습니다. 반복 종료.")
-        break
-
-# ✅ 출력 요조
-print("\n📊 참조 카테고리별 개수 요조:")
-for cat_id, count in sorted(category_id_counter.items(), key=lambda x: int(x[0])):
-    status = f"✅ 완료" if count >= TARGET_COUNT else f"⚠️ 부족({count}/{TARGET_COUNT})"
-    print(f"  - category_id {cat_id}: {status}")
\ No newline at end of file
+
+    print("\n✂️ [2단계] crop 저장 중...")
+    written = execute_plan(stores, crops, args.workers)
+    failed = len(crops) - sum(written.values())
+    if failed:
+        print(f"⚠️ 이미지 로딩 실패 등으로 저장하지 못한 crop: {failed}개")
+    for cat_id, count in written.items():
+        category_id_counter[cat_id] += count
+
+    # ✅ 출력 요조
+    print("\n📊 참조 카테고리별 개수 요조:")
+    for cat_id, count in sorted(category_id_counter.items()):
+        status = f"✅ 완료" if count >= TARGET_COUNT else f"⚠️ 부족({count}/{TARGET_COUNT})"
+        print(f"  - category_id {cat_id}: {status}")
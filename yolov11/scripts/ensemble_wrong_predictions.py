@@ -1,17 +1,25 @@
 import os
+import sys
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import matplotlib as mpl
-import torch
-from ultralytics import YOLO
-from ultralytics.utils.metrics import bbox_iou
 import random
+from pathlib import Path
+
+from prediction_cache import PredictionCache, list_images
 
 # ✅ 경로 설정
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 BASE_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir))
+PROJECT_DIR = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_DIR, "faster_rcnn"))  # engine.coco_map import 가능하게 설정
+sys.path.append(BASE_DIR)  # configs 모듈 import 가능하게 설정
+
+from engine.coco_map import box_iou
+from configs.predict_config import ENSEMBLE_PREDICT_PARAMS
+
 PILL_LIST_PATH = os.path.join(BASE_DIR, "configs", "pill_list.txt")
 IMAGE_DIR = os.path.join(BASE_DIR, "yolo_dataset", "images", "val")
 LABEL_DIR = os.path.join(BASE_DIR, "yolo_dataset", "labels", "val")
@@ -29,9 +37,10 @@ mpl.rcParams['axes.unicode_minus'] = False
 with open(PILL_LIST_PATH, "r", encoding="utf-8") as f:
     class_names = [line.strip() for line in f.readlines()]
 
-# ✅ 모델 로드
-model_m = YOLO(MODEL_M_PATH)
-model_l = YOLO(MODEL_L_PATH)
+# ✅ 예측 (prediction_cache/ 에 있으면 재사용, 없는 이미지만 추론)
+image_paths = list_images(IMAGE_DIR)
+predictions_m = PredictionCache(MODEL_M_PATH, ENSEMBLE_PREDICT_PARAMS).predict(image_paths)
+predictions_l = PredictionCache(MODEL_L_PATH, ENSEMBLE_PREDICT_PARAMS).predict(image_paths)
 
 # ✅ 색상
 random.seed(42)
@@ -39,43 +48,29 @@ colors = [(random.random(), random.random(), random.random()) for _ in class_nam
 
 # ✅ 결과 집계
 total_wrong = 0
-image_names = sorted(os.listdir(IMAGE_DIR))
 
-for img_name in image_names:
-    img_path = os.path.join(IMAGE_DIR, img_name)
-    label_path = os.path.join(LABEL_DIR, os.path.splitext(img_name)[0] + ".txt")
+# 읽지 못해 빠진 이미지가 있을 수 있으므로 경로로 맞춤
+predictions_l = {pred.path: pred for pred in predictions_l}
 
-    result_m = model_m(img_path, conf=0.3, iou=0.5, agnostic_nms=True, verbose=False)[0]
-    result_l = model_l(img_path, conf=0.3, iou=0.5, agnostic_nms=True, verbose=False)[0]
-
-    if result_m.boxes is None or result_l.boxes is None:
+for pred_m in predictions_m:
+    if pred_m.path not in predictions_l:
         continue
+    pred_l = predictions_l[pred_m.path]
+    img_path = Path(pred_m.path)
+    img_name = img_path.name
+    label_path = os.path.join(LABEL_DIR, img_path.stem + ".txt")
 
-    boxes_m = result_m.boxes.xyxy.cpu().numpy()
-    confs_m = result_m.boxes.conf.cpu().numpy()
-    mask = confs_m >= 0.5
-    boxes_m = boxes_m[mask]
-    confs_m = confs_m[mask]
-
-    boxes_l = result_l.boxes.xyxy.cpu().numpy()
-    classes_l = result_l.boxes.cls.cpu().numpy().astype(int)
-    confs_l = result_l.boxes.conf.cpu().numpy()
+    mask = pred_m.scores >= 0.5
+    boxes_m = pred_m.boxes[mask]
 
-    if len(boxes_m) == 0 or len(boxes_l) == 0:
+    if len(boxes_m) == 0 or len(pred_l.boxes) == 0:
         continue
 
-    pred_labels = []
-    final_classes = []
-    final_confs = []
-
-    for box_m in boxes_m:
-        ious = np.array([bbox_iou(torch.tensor(box_m), torch.tensor(box_l)) for box_l in boxes_l])
-        best_idx = np.argmax(ious)
-        cls = classes_l[best_idx]
-        conf = confs_l[best_idx]
-        pred_labels.append(class_names[cls])
-        final_classes.append(cls)
-        final_confs.append(conf)
+    # M 박스마다 IoU 가 가장 큰 L 박스의 클래스/신뢰도 사용
+    best_idx = np.argmax(box_iou(boxes_m, pred_l.boxes), axis=1)
+    final_classes = pred_l.classes[best_idx].astype(int)
+    final_confs = pred_l.scores[best_idx]
+    pred_labels = [class_names[cls] for cls in final_classes]
 
     if os.path.exists(label_path):
         with open(label_path, 'r') as f:
@@ -90,7 +85,7 @@ for img_name in image_names:
         print(f"📌 예측 클래스: {sorted(pred_labels)}")
         print(f"✅ 정답 클래스: {gt_labels}")
 
-        img = cv2.imread(img_path)
+        img = cv2.imread(str(img_path))
         if img is None:
             continue
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
@@ -1,12 +1,16 @@
 import os
+import sys
+import random
+import resource
+from pathlib import Path
+
 import cv2
-import numpy as np
+import matplotlib as mpl
+mpl.use("Agg")  # 화면 없이 실행 (시각화는 파일로 저장)
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
-import matplotlib as mpl
-from ultralytics import YOLO
-import random
-from pathlib import Path
+
+from prediction_cache import PredictionCache
 
 # ✅ 디렉토리 설정
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -15,10 +19,17 @@ MODEL_PATH = BASE_DIR / "runs" / "yolov11l_aug" / "exp" / "weights" / "best.pt"
 IMAGE_DIR = BASE_DIR / "yolo_dataset" / "images" / "val"
 LABEL_DIR = BASE_DIR / "yolo_dataset" / "labels" / "val"
 PILL_LIST_PATH = BASE_DIR / "configs" / "pill_list.txt"
+SAVE_DIR = BASE_DIR / "results" / "eval_aug_wrong_outputs"
+SAVE_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.append(str(BASE_DIR))  # configs 모듈 import 가능하게 설정
+
+from configs.predict_config import YOLO_PREDICT_PARAMS
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
 
 # ✅ 한글 폰트 설정
 font_path = '/usr/share/fonts/truetype/nanum/NanumGothic.ttf'
-font_prop = fm.FontProperties(fname=font_path)
+font_prop = fm.FontProperties(fname=font_path) if os.path.exists(font_path) else None
 mpl.rcParams['axes.unicode_minus'] = False
 
 # ✅ 클래스 이름 로드
@@ -29,37 +40,65 @@ with open(PILL_LIST_PATH, "r", encoding="utf-8") as f:
 random.seed(42)
 colors = [(random.random(), random.random(), random.random()) for _ in class_names]
 
-# ✅ 모델 로드
+# ✅ GT 라벨 (예측의 이미지 경로로 라벨을 찾음)
+def read_gt_classes(img_path):
+    label_path = LABEL_DIR / (img_path.stem + ".txt")
+    if not label_path.exists():
+        return []
+    with open(label_path, 'r') as f:
+        return [int(line.split()[0]) for line in f if line.strip()]
+
+# ✅ 틀린 예측 시각화 → 파일 저장 (figure 는 바로 닫아서 누적되지 않게)
+def save_visualization(prediction, pred_classes, save_path):
+    # 캐시된 예측에는 원본 이미지가 없으므로 틀린 이미지만 다시 읽음
+    img = cv2.cvtColor(cv2.imread(prediction.path), cv2.COLOR_BGR2RGB)
+
+    fig = plt.figure(figsize=(8, 8))
+    plt.imshow(img)
+    ax = plt.gca()
+    for i, box in enumerate(prediction.boxes):
+        cls = pred_classes[i]
+        label = class_names[cls]
+        conf = float(prediction.scores[i]) * 100
+        label_text = f"{label} {conf:.1f}%"
+        color = colors[cls]
+        x1, y1, x2, y2 = box
+
+        rect = plt.Rectangle((x1, y1), x2 - x1, y2 - y1,
+                             edgecolor=color, facecolor='none', linewidth=2)
+        ax.add_patch(rect)
+        ax.text(x1, y1 - 5, label_text,
+                color=color, fontsize=10, fontproperties=font_prop,
+                bbox=dict(facecolor='white', alpha=0.5, edgecolor='none'))
+
+    plt.axis('off')
+    plt.title("YOLOv11-l_aug 틀린 예측", fontproperties=font_prop)
+    fig.savefig(save_path, bbox_inches="tight")
+    plt.close(fig)
+
+# ✅ 예측 (prediction_cache/ 에 있으면 재사용, 없는 이미지만 stream=True 로 한 장씩 디코딩해서 추론)
 print(f"\n🔍 YOLOv11-l_aug 예측 시작\n" + "-" * 50)
-model = YOLO(str(MODEL_PATH))
+image_paths = sorted(p for p in IMAGE_DIR.iterdir() if p.suffix.lower() in IMAGE_EXTS)
 
-results = model.predict(
-    source=str(IMAGE_DIR),
-    conf=0.5,
-    iou=0.5,
-    agnostic_nms=True,
-    save=False,
-    verbose=False
-)
+# 예측은 이미지당 boxes/scores/classes 만 보관 (원본 이미지는 들고 있지 않음)
+predictions = PredictionCache(MODEL_PATH, YOLO_PREDICT_PARAMS).predict(image_paths)
 
 total_wrong = 0
+total_images = 0
 
-# ✅ 예측 결과 확인
-for result in results:
-    img_name = os.path.basename(result.path)
-    label_path = LABEL_DIR / (Path(img_name).stem + ".txt")
+# ✅ 예측 결과 확인 (GT 는 prediction.path 기준으로 매칭)
+for prediction in predictions:
+    img_path = Path(prediction.path)
+    img_name = img_path.name
+    gt_classes = read_gt_classes(img_path)
+    total_images += 1
 
     # 예측 클래스
-    pred_classes = [int(c) for c in result.boxes.cls.cpu().numpy()]
+    pred_classes = prediction.classes.tolist()
     pred_labels = [class_names[i] for i in pred_classes]
 
     # 정답 클래스
-    if label_path.exists():
-        with open(label_path, 'r') as f:
-            gt_classes = [int(line.strip().split()[0]) for line in f.readlines()]
-        gt_labels = [class_names[i] for i in sorted(gt_classes)]
-    else:
-        gt_labels = []
+    gt_labels = sorted(class_names[i] for i in gt_classes)
 
     if sorted(pred_labels) != gt_labels:
         total_wrong += 1
@@ -67,34 +106,12 @@ for result in results:
         print(f"📌 예측 클래스: {sorted(pred_labels)}")
         print(f"✅ 정답 클래스: {gt_labels}")
 
-        # 이미지 로드 및 시각화
-        img_path = IMAGE_DIR / img_name
-        img = cv2.imread(str(img_path))
-        if img is None:
-            continue
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-        plt.figure(figsize=(8, 8))
-        plt.imshow(img)
-        ax = plt.gca()
-
-        for i, box in enumerate(result.boxes.xyxy.cpu().numpy()):
-            cls = pred_classes[i]
-            label = class_names[cls]
-            conf = float(result.boxes.conf[i].cpu().numpy()) * 100
-            label_text = f"{label} {conf:.1f}%"
-            color = colors[cls]
-            x1, y1, x2, y2 = box
-
-            rect = plt.Rectangle((x1, y1), x2 - x1, y2 - y1,
-                                 edgecolor=color, facecolor='none', linewidth=2)
-            ax.add_patch(rect)
-            ax.text(x1, y1 - 5, label_text,
-                    color=color, fontsize=10, fontproperties=font_prop,
-                    bbox=dict(facecolor='white', alpha=0.5, edgecolor='none'))
-
-        plt.axis('off')
-        plt.title("YOLOv11-l_aug 틀린 예측", fontproperties=font_prop)
-        plt.show()
-
-print(f"\n❌ YOLOv11-l_aug - 틀린 이미지 개수: {total_wrong}장")
\ No newline at end of file
+        save_path = SAVE_DIR / f"{img_path.stem}.png"
+        save_visualization(prediction, pred_classes, save_path)
+        print(f"💾 저장: {save_path}")
+
+# ru_maxrss: Linux 는 KB, macOS 는 byte 단위
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_rss_mb = peak_rss / 1024 if os.uname().sysname == "Linux" else peak_rss / 1024 ** 2
+print(f"\n❌ YOLOv11-l_aug - 틀린 이미지 개수: {total_wrong}장 / {total_images}장")
+print(f"📈 최대 메모리(RSS): {peak_rss_mb:.0f} MB, 시각화 저장 폴더: {SAVE_DIR}")
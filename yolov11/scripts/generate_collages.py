@@ -1,11 +1,16 @@
 import os
+import sys
 import cv2
 import json
+import argparse
 import numpy as np
 import random
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from annotation_store import AnnotationStore, STORE_DIR
+
 # ✅ 경로 설정 (수정 버전)
 SCRIPT_DIR = Path(__file__).resolve().parent        # yolov11/scripts
 BASE_DIR = SCRIPT_DIR.parent                        # yolov11/
@@ -13,129 +18,131 @@ CROP_IMG_DIR = BASE_DIR / "crops_data" / "images"
 CROP_JSON_DIR = BASE_DIR / "crops_data" / "jsons"
 OUTPUT_IMG_DIR = BASE_DIR / "collage_images"
 OUTPUT_JSON_DIR = BASE_DIR / "collage_json"
+sys.path.append(str(BASE_DIR.parent / "faster_rcnn"))  # 콜라주 선택/배치 규칙은 faster_rcnn/engine/collage_planner.py 와 공용
+
+# 클래스 가중치 샘플링(Fenwick tree) + occupancy grid 배치, 학습 중 합성(OnlineCollageDataset)과 같은 규칙
+from engine.collage_planner import plan_collages, CANVAS_SIZE
 
 # ✅ 콜라주 설정
-CANVAS_SIZE = 1280
-MIN_DISTANCE = 50
-
-# ✅ 폴더 생성
-os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
-os.makedirs(OUTPUT_JSON_DIR, exist_ok=True)
-
-# ✅ 클래스별 이미지 정리
-class_to_images = defaultdict(list)
-for fname in os.listdir(CROP_IMG_DIR):
-    if fname.endswith('.png'):
-        class_id = fname.split('_')[0]
-        class_to_images[class_id].append(fname)
-
-# ✅ 전체 이미지 리스트 및 셔플
-all_images = [(cls, fname) for cls, fnames in class_to_images.items() for fname in fnames]
-random.shuffle(all_images)
-used_images = set()
-collage_index = 1
-
-# ✅ bbox 충돌 검사 함수
-def is_valid_position(new_box, existing_boxes, min_distance):
-    x, y, w, h = new_box
-    for ex, ey, ew, eh in existing_boxes:
-        if (abs(x - ex) < min_distance and abs(y - ey) < min_distance):
-            return False
-        if not (x + w < ex or ex + ew < x or y + h < ey or ey + eh < y):
-            return False
-    return True
-
-# ✅ 콜라주 생성 반복
-while True:
-    available = [(cls, fname) for cls, fname in all_images if fname not in used_images]
-    if len(available) < 3:
-        break
-
-    canvas = np.ones((CANVAS_SIZE, CANVAS_SIZE, 3), dtype=np.uint8) * 255
+NUM_SHARDS = 16      # crop 분할 수 (worker 수와 무관하게 고정해야 같은 seed → 같은 결과)
+
+# ✅ crop 목록: 저장소 행 중 이미지 파일이 있는 것 (클래스 = 파일명 앞부분 category_id)
+def load_crops(store, image_dir):
+    image_files = {fname for fname in os.listdir(image_dir) if fname.endswith('.png')}
+    crops = []
+    for i in range(len(store)):
+        fname = str(store.file_name[i])
+        rows = store.annotations(i)
+        if fname not in image_files or rows.start == rows.stop:
+            continue
+        w, h = int(store.bbox[rows.start, 2]), int(store.bbox[rows.start, 3])
+        crops.append((fname.split('_')[0], fname, int(store.category_id[rows.start]), w, h))
+    return crops
+
+# ✅ 콜라주 1장 저장
+def render_collage(placed, collage_name, canvas_size=CANVAS_SIZE):
+    canvas = np.ones((canvas_size, canvas_size, 3), dtype=np.uint8) * 255
     annotations = []
-    placed_boxes = []
-    used_classes = set()
-    selected = []
-
-    class_weights = {cls: len([f for f in fnames if f not in used_images]) for cls, fnames in class_to_images.items()}
-    target_count = min(len(available), random.choice([3, 4]))
-
-    while len(selected) < target_count:
-        weighted_classes = [cls for cls in class_weights if class_weights[cls] > 0]
-        if not weighted_classes:
-            break
-        weights = [class_weights[cls] for cls in weighted_classes]
-        chosen_class = random.choices(weighted_classes, weights=weights, k=1)[0]
-
-        candidates = [f for f in class_to_images[chosen_class] if f not in used_images and (chosen_class not in used_classes or len(selected) < 3)]
-        if not candidates:
-            class_weights[chosen_class] = 0
+    for (_, fname, category_id, w, h), x, y in placed:
+        img = cv2.imread(str(CROP_IMG_DIR / fname))
+        if img is None:
+            print(f"❌ 오류: {fname}, 이미지 로딩 실패")
             continue
+        canvas[y:y + h, x:x + w] = img[:h, :w]
+        annotations.append({
+            "bbox": [x, y, w, h],
+            "category_id": category_id
+        })
 
-        chosen_img = random.choice(candidates)
-        selected.append((chosen_class, chosen_img))
-        used_classes.add(chosen_class)
-        class_weights[chosen_class] -= 1
-
-    if len(selected) < 3:
-        break
-
-    success = True
-    for class_id, fname in selected:
-        img_path = CROP_IMG_DIR / fname
-        json_path = CROP_JSON_DIR / fname.replace('.png', '.json')
-
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            ann = data['annotations'][0]
-            category_id = ann['category_id']
-            w, h = int(ann['bbox'][2]), int(ann['bbox'][3])
-            img = cv2.imread(str(img_path))
-        except Exception as e:
-            print(f"❌ 오류: {fname}, {e}")
-            success = False
-            break
-
-        placed = False
-        for _ in range(100):
-            x = random.randint(0, CANVAS_SIZE - w)
-            y = random.randint(0, CANVAS_SIZE - h)
-            if is_valid_position((x, y, w, h), placed_boxes, MIN_DISTANCE):
-                canvas[y:y + h, x:x + w] = img
-                annotations.append({
-                    "bbox": [x, y, w, h],
-                    "category_id": category_id
-                })
-                placed_boxes.append((x, y, w, h))
-                used_images.add(fname)
-                placed = True
-                break
-
-        if not placed:
-            success = False
-            break
-
-    if not success:
-        continue
-
-    collage_name = f"collage_{collage_index}.png"
     json_name = collage_name.replace('.png', '.json')
     cv2.imwrite(str(OUTPUT_IMG_DIR / collage_name), canvas)
 
     json_data = {
         "images": [{
             "file_name": collage_name,
-            "width": CANVAS_SIZE,
-            "height": CANVAS_SIZE
+            "width": canvas_size,
+            "height": canvas_size
         }],
         "annotations": annotations
     }
 
     with open(OUTPUT_JSON_DIR / json_name, 'w', encoding='utf-8') as f:
         json.dump(json_data, f, indent=2, ensure_ascii=False)
-
-    print(f"✅ 저장됨: {collage_name} ({len(annotations)} objects)")
-    collage_index += 1
-
-print("🎉 모든 이미지 사용 완료 또는 남은 수 < 3 → 종료합니다.")
\ No newline at end of file
+    return len(annotations)
+
+# ✅ shard 분할: 클래스별로 섞은 뒤 돌아가며 배정 → shard 마다 클래스 구성이 비슷하고 크기가 균등
+def partition_crops(crops, num_shards, seed):
+    rng = random.Random(seed)
+    by_class = defaultdict(list)
+    for crop in sorted(crops, key=lambda crop: crop[1]):
+        by_class[crop[0]].append(crop)
+
+    shards = [[] for _ in range(num_shards)]
+    offset = 0
+    for key in sorted(by_class):
+        group = by_class[key]
+        rng.shuffle(group)
+        for j, crop in enumerate(group):
+            shards[(offset + j) % num_shards].append(crop)
+        offset += len(group)
+    return shards
+
+def shard_seeds(seed, num_shards):
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(num_shards)]
+
+def collage_file_name(shard_id, index, num_shards):
+    if num_shards == 1:
+        return f"collage_{index}.png"
+    return f"collage_s{shard_id:03d}_{index:05d}.png"
+
+# ✅ shard 1개 생성 (worker 프로세스에서 실행): shard 의 crop 과 seed 만으로 결과가 정해짐
+def generate_shard(task):
+    shard_id, crops, seed, num_shards = task
+    cv2.setNumThreads(1)  # 프로세스 단위로 병렬화하므로 OpenCV 내부 스레드는 끔
+    rng = random.Random(seed)
+    num_collages = num_objects = 0
+    for index, placed in enumerate(plan_collages(crops, rng), start=1):
+        num_objects += render_collage(placed, collage_file_name(shard_id, index, num_shards))
+        num_collages += 1
+    return shard_id, num_collages, num_objects
+
+def remove_previous_outputs():
+    # 이전 실행(다른 shard 수 등)의 콜라주가 섞이지 않도록 삭제
+    for directory, ext in ((OUTPUT_IMG_DIR, ".png"), (OUTPUT_JSON_DIR, ".json")):
+        for fname in os.listdir(directory):
+            if fname.startswith("collage_") and fname.endswith(ext):
+                os.remove(directory / fname)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=None, help="없으면 무작위로 정하고 출력")
+    parser.add_argument("--shards", type=int, default=NUM_SHARDS, help="crop 분할 수 (1 = 전체를 한 번에)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="shard 를 처리할 프로세스 수")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+
+    # ✅ 폴더 생성
+    os.makedirs(OUTPUT_IMG_DIR, exist_ok=True)
+    os.makedirs(OUTPUT_JSON_DIR, exist_ok=True)
+    remove_previous_outputs()
+
+    # ✅ crop 어노테이션 저장소 (crop JSON 을 매번 읽지 않고 조회, 바뀐 JSON 만 다시 파싱)
+    store = AnnotationStore.build(CROP_JSON_DIR, CROP_IMG_DIR, STORE_DIR / "crops.npz")
+    crops = load_crops(store, CROP_IMG_DIR)
+
+    # ✅ shard 별 콜라주 생성 (같은 seed / shard 수면 worker 수와 관계없이 같은 결과)
+    shards = partition_crops(crops, args.shards, seed)
+    tasks = [(shard_id, shard, shard_seed, args.shards)
+             for shard_id, (shard, shard_seed) in enumerate(zip(shards, shard_seeds(seed, args.shards)))]
+    print(f"🧩 crop {len(crops)}개 → shard {args.shards}개 (seed={seed}, workers={args.workers})")
+
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(tasks))) as pool:
+            results = list(pool.map(generate_shard, tasks))
+    else:
+        results = [generate_shard(task) for task in tasks]
+
+    for shard_id, num_collages, num_objects in results:
+        print(f"✅ shard {shard_id}: 콜라주 {num_collages}장 ({num_objects} objects)")
+    print(f"🎉 총 {sum(r[1] for r in results)}장 저장 → {OUTPUT_IMG_DIR}")
@@ -0,0 +1,190 @@
+"""
+train_model.py 하이퍼파라미터(lr0, batch, imgsz 등) 탐색: ASHA (asynchronous successive halving).
+
+모든 trial 을 --max_epochs 로 시작하고 (학습률 스케줄이 trial 마다 같도록),
+rung epoch (min_epochs * eta^k) 에 도달할 때마다 results.csv 의 지표를 같은 rung 의 다른 trial 과 비교해
+상위 1/eta 에 들지 못하면 바로 중단합니다. 살아남은 trial 만 다음 rung (더 긴 학습)까지 진행.
+trial 실행/동시성/재시작은 train_scheduler.py 의 작업 큐를 그대로 사용 (search 폴더마다 큐 1개).
+
+    python scripts/hparam_search.py --name lr_batch --trials 27 --min_epochs 2 --max_epochs 54 --eta 3 --devices 0 1
+    python scripts/hparam_search.py --name smoke --data /path/to/small/data.yaml --trials 6 --min_epochs 1 --max_epochs 4 --devices cpu
+
+중단 후 같은 --name 으로 다시 실행하면 rung 기록(asha.json)과 큐에서 이어서 진행합니다.
+"""
+import os
+import json
+import math
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from train_scheduler import (JobQueue, Scheduler, make_job, read_results, run_dir, stop_job, default_devices,
+                             MODEL_PATHS, DATA_YAML, RUNS_DIR, POLL_INTERVAL)
+
+# ✅ 경로 설정
+SEARCH_DIR = RUNS_DIR / "hparam_search"
+
+# ✅ 탐색 공간 (train_model.py 의 설정값 + ultralytics train 인자)
+SEARCH_SPACE = {
+    "lr0": ("log", 1e-4, 1e-2),
+    "weight_decay": ("log", 1e-5, 1e-3),
+    "batch": ("choice", [8, 16, 32]),
+    "imgsz": ("choice", [512, 640]),
+    "mosaic": ("uniform", 0.5, 1.0),
+}
+METRIC = "metrics/mAP50-95(B)"
+
+
+def sample_config(seed, index, space=SEARCH_SPACE):
+    # trial 번호와 seed 만으로 정해짐 → 재시작해도 같은 trial 은 같은 설정
+    rng = random.Random(int(np.random.SeedSequence([seed, index]).generate_state(1)[0]))
+    config = {}
+    for key, (kind, *spec) in space.items():
+        if kind == "log":
+            config[key] = float(f"{math.exp(rng.uniform(math.log(spec[0]), math.log(spec[1]))):.3g}")
+        elif kind == "uniform":
+            config[key] = round(rng.uniform(spec[0], spec[1]), 3)
+        else:
+            config[key] = rng.choice(spec[0])
+    return config
+
+
+def rung_epochs(min_epochs, max_epochs, eta):
+    rungs, r = [], min_epochs
+    while r < max_epochs:
+        rungs.append(r)
+        r *= eta
+    return rungs
+
+
+class Asha:
+    """rung 별 기록과 계속/중단 판정 (asha.json 에 저장)."""
+
+    def __init__(self, rungs, eta, path):
+        self.rungs, self.eta, self.path = rungs, eta, Path(path)
+        self.records = {str(r): {} for r in rungs}   # rung → {trial: 지표}
+        self.stopped = {}                            # trial → 중단된 rung
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.records.update(state["records"])
+            self.stopped = state["stopped"]
+
+    def save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rungs": self.rungs, "eta": self.eta, "records": self.records, "stopped": self.stopped}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def report(self, trial, values):
+        """trial 의 epoch 별 지표 목록으로 아직 기록 안 한 rung 을 판정. 상위 1/eta 밖이면 그 rung, 아니면 None."""
+        for r in self.rungs:
+            if len(values) < r or trial in self.records[str(r)]:
+                continue
+            value = max(values[:r])  # rung 까지의 최고값 (ultralytics best.pt 기준과 같음)
+            self.records[str(r)][trial] = value
+            cutoff = np.percentile(list(self.records[str(r)].values()), (1 - 1 / self.eta) * 100)
+            if value < cutoff:
+                return r
+        return None
+
+
+def metric_values(job, metric=METRIC):
+    return [float(row[metric]) for row in read_results(run_dir(job)) if row.get(metric)]
+
+
+def search(args):
+    root = SEARCH_DIR / args.name
+    queue = JobQueue(root / "queue")
+    rungs = rung_epochs(args.min_epochs, args.max_epochs, args.eta)
+    asha = Asha(rungs, args.eta, root / "asha.json")
+    scheduler = Scheduler(queue, args.devices or default_devices(), args.jobs_per_device, args.cpus)
+    grid_epochs = args.trials * args.max_epochs
+    budget = args.budget or grid_epochs
+    print(f"🔎 trial {args.trials}개, rung {rungs} → {args.max_epochs} epoch, eta={args.eta}, 예산 {budget} epoch")
+
+    while True:
+        jobs = queue.snapshot()
+        used_epochs = sum(len(read_results(run_dir(job))) for job in jobs.values())
+
+        # 1) rung 판정: 지는 trial 은 중단 (poll 사이에 끝난 trial 도 rung 기록에는 포함)
+        for job in jobs.values():
+            if job["status"] not in ("running", "done") or job["id"] in asha.stopped:
+                continue
+            rung = asha.report(job["id"], metric_values(job, args.metric))
+            if rung is not None and job["status"] == "running":
+                asha.stopped[job["id"]] = rung
+                stop_job(queue, job["id"])
+                print(f"✂️ {job['id']} 중단 (rung {rung} epoch, {job['train_args']})")
+        asha.save()
+
+        # 2) 빈 자리만큼 새 trial 추가 (예상 최소 비용이 예산 안일 때만)
+        active = sum(1 for job in jobs.values() if job["status"] in ("running", "pending"))
+        capacity = sum(scheduler.slots.values()) or 1
+        if used_epochs < budget:
+            for index in range(len(jobs), min(args.trials, len(jobs) + capacity - active)):
+                if used_epochs + args.min_epochs * (index - len(jobs) + 1) > budget:
+                    break
+                train_args = {"epochs": args.max_epochs, "patience": args.max_epochs, **sample_config(args.seed, index)}
+                queue.add(make_job(f"trial{index:03d}", MODEL_PATHS.get(args.model, args.model), data=args.data,
+                                   project=root / "trials", name=f"trial{index:03d}", train_args=train_args,
+                                   threads=args.threads, workers=args.workers))
+        else:
+            for job in jobs.values():
+                if job["status"] in ("running", "pending"):
+                    stop_job(queue, job["id"])
+                    print(f"💸 예산 소진으로 중단: {job['id']}")
+
+        status = scheduler.step()
+        counts = status["counts"]
+        if not counts.get("running") and not counts.get("pending") and \
+                (len(status["jobs"]) >= args.trials or used_epochs + args.min_epochs > budget):
+            break
+        time.sleep(args.poll)
+
+    summarize(queue, asha, args, root, grid_epochs)
+
+
+def summarize(queue, asha, args, root, grid_epochs):
+    results = []
+    for job in queue.snapshot().values():
+        values = metric_values(job, args.metric)
+        results.append({"trial": job["id"], "status": job["status"], "epochs": len(values),
+                        "best": max(values) if values else None, "stopped_at": asha.stopped.get(job["id"]),
+                        "config": {k: job["train_args"][k] for k in SEARCH_SPACE if k in job["train_args"]}})
+    results.sort(key=lambda r: -1 if r["best"] is None else r["best"], reverse=True)
+    used = sum(r["epochs"] for r in results)
+    summary = {"metric": args.metric, "epochs_used": used, "grid_epochs": grid_epochs, "trials": results}
+    with open(root / "summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"\n📊 사용 epoch {used} / grid {grid_epochs} ({used / max(grid_epochs, 1):.0%})")
+    for r in results[:5]:
+        print(f"  {r['trial']}: {args.metric}={r['best']} ({r['epochs']} epoch, {r['status']}) {r['config']}")
+    if results and results[0]["best"] is not None:
+        print(f"🏆 최적 설정 → train_model.py: {results[0]['config']}")
+    print(f"📄 {root / 'summary.json'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--name", default="default", help="runs/hparam_search/<name>")
+    parser.add_argument("--model", default="yolov11l", help="train_scheduler.MODEL_PATHS 의 이름 또는 가중치 경로")
+    parser.add_argument("--data", default=str(DATA_YAML))
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--min_epochs", type=int, default=2, help="첫 rung")
+    parser.add_argument("--max_epochs", type=int, default=54)
+    parser.add_argument("--eta", type=int, default=3, help="rung 마다 상위 1/eta 만 계속")
+    parser.add_argument("--budget", type=int, default=None, help="전체 trial epoch 합 상한 (기본: trials * max_epochs)")
+    parser.add_argument("--metric", default=METRIC)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--devices", nargs="+", default=None)
+    parser.add_argument("--jobs_per_device", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cpus", type=int, default=os.cpu_count())
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL)
+    search(parser.parse_args())
@@ -0,0 +1,154 @@
+"""
+YOLO 학습 중 콜라주 바로 합성 (crop_balancer → generate_collages → convert_with_aug → convert_to_yolo 의 디스크 단계 없이).
+
+ORIGINAL / ADD 어노테이션 저장소에서 crop_balancer.py 와 같은 부족분 규칙으로 crop 을 메모리에 올리고
+(faster_rcnn/dataset/collage.py 의 CropBank), epoch 마다 --collages_per_epoch 장을 새로 합성해 원본 학습셋에 섞습니다.
+콜라주 배치 규칙은 generate_collages.py, 증강은 convert_with_aug.py 와 같습니다.
+
+    python scripts/online_collage.py --collages_per_epoch 2000 --seed 0
+
+단일 GPU 학습 기준 (DDP 는 ultralytics 가 trainer 를 별도 프로세스에서 다시 만들기 때문에 지원하지 않음).
+"""
+import sys
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset, ConcatDataset
+from ultralytics import YOLO
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from annotation_store import AnnotationStore, load_category_to_class_map, SOURCES, STORE_DIR
+
+# ✅ 경로 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+MODEL_PATH = BASE_DIR / "model" / "yolo11l.pt"        # 학습할 모델 (수정 가능)
+DATA_YAML = BASE_DIR / "yolo_dataset" / "data.yaml"   # 데이터셋 yaml
+RUNS_DIR = BASE_DIR / "runs" / "yolov11l_online_collage"
+sys.path.append(str(BASE_DIR.parent / "faster_rcnn"))  # CropBank / OnlineCollageDataset 은 faster_rcnn/dataset 과 공용
+
+from dataset import CropBank, OnlineCollageDataset, get_collage_transform
+
+# ✅ 학습 설정
+EPOCHS = 20
+BATCH = 16
+PATIENCE = 5
+IMG_SIZE = 640
+TARGET_COUNT = 300   # crop_balancer.py 와 같은 값
+MAX_ITER = 50
+
+
+class CollageYOLODataset(Dataset):
+    """OnlineCollageDataset 의 콜라주를 ultralytics YOLODataset 의 학습 샘플 형식(dict)으로 반환."""
+
+    def __init__(self, collages):
+        self.collages = collages
+
+    def __len__(self):
+        return len(self.collages)
+
+    def __getitem__(self, idx):
+        image, boxes, labels = self.collages.sample()
+        height, width = image.shape[:2]
+        xywh = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2 / width, (boxes[:, 1] + boxes[:, 3]) / 2 / height,
+                         (boxes[:, 2] - boxes[:, 0]) / width, (boxes[:, 3] - boxes[:, 1]) / height], axis=1)
+        return {
+            "im_file": f"online_collage_{idx}.png",
+            "ori_shape": (height, width),
+            "resized_shape": (height, width),
+            "ratio_pad": ((1.0, 1.0), (0.0, 0.0)),
+            "img": torch.from_numpy(np.ascontiguousarray(image.transpose(2, 0, 1))),  # CHW RGB (YOLODataset 과 동일)
+            "cls": torch.from_numpy(labels.astype(np.float32).reshape(-1, 1)),
+            "bboxes": torch.from_numpy(xywh.astype(np.float32).reshape(-1, 4)),
+            "batch_idx": torch.zeros(len(labels)),
+        }
+
+
+class MixedYOLODataset(ConcatDataset):
+    """원본 YOLODataset + CollageYOLODataset. trainer 가 쓰는 속성(labels, close_mosaic 등)은 원본 데이터셋으로 위임."""
+
+    def __getattr__(self, name):
+        if name == "datasets":
+            raise AttributeError(name)
+        return getattr(self.datasets[0], name)
+
+    @staticmethod
+    def collate_fn(batch):
+        # 원본(rect/mosaic 여부에 따라 키가 다를 수 있음)과 콜라주 샘플의 공통 키만 같은 순서로 맞춤
+        keys = [k for k in batch[0] if all(k in item for item in batch)]
+        return YOLODataset.collate_fn([{k: item[k] for k in keys} for item in batch])
+
+
+class OnlineCollageTrainer(DetectionTrainer):
+    """train 데이터셋에만 콜라주를 섞는 DetectionTrainer (collage_dataset 은 main 에서 지정)."""
+
+    collage_dataset = None
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+        if mode != "train" or self.collage_dataset is None:
+            return dataset
+        return MixedYOLODataset([dataset, self.collage_dataset])
+
+
+# ✅ ORIGINAL / ADD 저장소 → crop bank (label = YOLO class index, 매핑 없는 category 는 제외)
+def build_crop_bank(target_count=TARGET_COUNT, max_iter=MAX_ITER):
+    category_to_class = load_category_to_class_map()
+    image_paths, image_ids, boxes, labels = [], [], [], []
+    for name in ("ORIGINAL", "ADD"):
+        ann_dir, image_dir = SOURCES[name]
+        store = AnnotationStore.build(ann_dir, image_dir, STORE_DIR / f"{name}.npz", category_to_class=category_to_class)
+        valid = store.class_index >= 0
+        xywh = store.bbox[valid]
+        image_ids.append(store.ann_image[valid] + len(image_paths))
+        boxes.append(np.concatenate([xywh[:, :2], xywh[:, :2] + xywh[:, 2:]], axis=1))
+        labels.append(store.class_index[valid])
+        image_paths.extend(store.image_path.tolist())
+
+    def read_image(image_id):
+        image = cv2.imread(image_paths[image_id])
+        if image is None:
+            print(f"❌ 이미지 로딩 실패: {image_paths[image_id]}")
+            return np.zeros((0, 0, 3), dtype=np.uint8)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    return CropBank.from_annotations(np.concatenate(image_ids), np.concatenate(boxes), np.concatenate(labels),
+                                     read_image, target_count=target_count, max_iter=max_iter)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collages_per_epoch", type=int, default=1000, help="epoch 마다 학습셋에 섞을 콜라주 수")
+    parser.add_argument("--target_count", type=int, default=TARGET_COUNT, help="이 수 미만인 클래스만 부족분만큼 crop")
+    parser.add_argument("--max_iter", type=int, default=MAX_ITER)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bank = build_crop_bank(args.target_count, args.max_iter)
+    print(f"🧩 crop {len(bank.crops)}개 (부족분 포함 {len(bank)}개) → epoch 당 콜라주 {args.collages_per_epoch}장")
+    OnlineCollageTrainer.collage_dataset = CollageYOLODataset(OnlineCollageDataset(
+        bank, args.collages_per_epoch, augment=get_collage_transform("pascal_voc", "labels"),
+        image_size=IMG_SIZE, seed=args.seed))
+
+    # ✅ 모델 로드 및 학습
+    print(f"🚀 모델 학습 시작: {MODEL_PATH.name}")
+    model = YOLO(str(MODEL_PATH))
+    model.train(
+        trainer=OnlineCollageTrainer,
+        data=str(DATA_YAML),
+        epochs=EPOCHS,
+        imgsz=IMG_SIZE,
+        batch=BATCH,
+        patience=PATIENCE,
+        project=str(RUNS_DIR),
+        name="exp",
+        save=True,
+        device=0,
+        workers=4,
+        verbose=True
+    )
+    print(f"✅ 학습 완료: {MODEL_PATH.name}")
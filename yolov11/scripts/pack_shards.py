@@ -0,0 +1,67 @@
+"""
+📦 pack_shards.py
+
+이미지 + 어노테이션(JSON/TXT) 개별 파일 레이아웃을 shard 포맷(faster_rcnn/dataset/shards.py)으로 묶습니다.
+네트워크 파일시스템에서 수천 번의 open()/stat() 대신 큰 파일 몇 개를 순차적으로 읽게 됩니다.
+
+기본 대상 (존재하는 폴더만):
+  data/ORIGINAL, data/ADD            → data/shards/ORIGINAL, data/shards/ADD
+  yolov11/crops_data                 → yolov11/shards/crops_data
+  yolov11/collage_images + json      → yolov11/shards/collage
+  yolov11/yolo_dataset/{train,val}   → yolov11/shards/yolo_{train,val}
+
+단일 폴더 지정:
+  python scripts/pack_shards.py --image_dir <images> --ann_dir <annotations> --ann_ext .json --out <shard_dir>
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# ✅ 경로 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+PROJECT_DIR = BASE_DIR.parent                         # Project/
+DATA_DIR = PROJECT_DIR / "data"
+sys.path.append(str(PROJECT_DIR / "faster_rcnn"))     # dataset.shards import 가능하게 설정
+
+from dataset.shards import pack_directory, DEFAULT_SHARD_BYTES
+
+# ✅ 기본 변환 대상: (이미지 폴더, 어노테이션 폴더, 어노테이션 확장자, 출력 폴더)
+DEFAULT_LAYOUTS = [
+    (DATA_DIR / "ORIGINAL" / "images", DATA_DIR / "ORIGINAL" / "annotations", ".json", DATA_DIR / "shards" / "ORIGINAL"),
+    (DATA_DIR / "ADD" / "images", DATA_DIR / "ADD" / "annotations", ".json", DATA_DIR / "shards" / "ADD"),
+    (BASE_DIR / "crops_data" / "images", BASE_DIR / "crops_data" / "jsons", ".json", BASE_DIR / "shards" / "crops_data"),
+    (BASE_DIR / "collage_images", BASE_DIR / "collage_json", ".json", BASE_DIR / "shards" / "collage"),
+    (BASE_DIR / "yolo_dataset" / "images" / "train", BASE_DIR / "yolo_dataset" / "labels" / "train", ".txt", BASE_DIR / "shards" / "yolo_train"),
+    (BASE_DIR / "yolo_dataset" / "images" / "val", BASE_DIR / "yolo_dataset" / "labels" / "val", ".txt", BASE_DIR / "shards" / "yolo_val"),
+]
+
+
+def pack(image_dir, ann_dir, ann_ext, out_dir, max_shard_bytes):
+    if not image_dir.exists():
+        print(f"⚠️ 경로 없음, 건너뜀: {image_dir}")
+        return
+    start = time.perf_counter()
+    count = pack_directory(image_dir, out_dir, ann_dir=ann_dir if ann_dir and ann_dir.exists() else None,
+                           ann_ext=ann_ext, max_shard_bytes=max_shard_bytes)
+    print(f"✅ {image_dir} → {out_dir} ({count}개, {time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_dir", type=Path, default=None)
+    parser.add_argument("--ann_dir", type=Path, default=None)
+    parser.add_argument("--ann_ext", type=str, default=".json")
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--shard_mb", type=int, default=DEFAULT_SHARD_BYTES >> 20, help="shard 파일 하나의 최대 크기 (MB)")
+    args = parser.parse_args()
+
+    max_shard_bytes = args.shard_mb << 20
+    if args.image_dir is not None:
+        if args.out is None:
+            parser.error("--image_dir 를 지정하면 --out 도 필요합니다.")
+        pack(args.image_dir, args.ann_dir, args.ann_ext, args.out, max_shard_bytes)
+    else:
+        for image_dir, ann_dir, ann_ext, out_dir in DEFAULT_LAYOUTS:
+            pack(image_dir, ann_dir, ann_ext, out_dir, max_shard_bytes)
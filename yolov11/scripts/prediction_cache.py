@@ -0,0 +1,266 @@
+"""
+YOLO 예측 결과 캐시 (NPZ).
+
+compare_wrong_predictions / ensemble_wrong_predictions / eval_model_aug 가 같은 best.pt 로 검증셋 전체를
+매번 다시 추론하지 않도록, 이미지별 boxes / scores / classes 를 저장해 두고 없는 것만 추론합니다.
+
+캐시 파일 1개 = (가중치 파일 내용 hash, predict 인자) 조합 1개: prediction_cache/<key>.npz
+    image_hash [I] (이미지 파일 내용 sha1), orig_shape [I, 2] (h, w)
+    offsets [I + 1]: 이미지 i 의 예측은 offsets[i]:offsets[i + 1]
+    boxes [N, 4] (xyxy, 원본 좌표), scores [N], classes [N]
+이미지 hash 는 (경로, 크기, mtime) 가 같으면 다시 계산하지 않음 (prediction_cache/image_hashes.json).
+가중치를 다시 학습하거나 이미지/predict 인자가 바뀌면 key 가 달라져 자동으로 다시 추론됩니다.
+같은 경로의 이미지 내용이 바뀌면 predict() 에서 이전 hash 의 행을 지웁니다 (다른 경로가 같은 내용이면 유지).
+삭제된 이미지의 행은 --gc 로 정리합니다 (어떤 경로에도 연결되지 않은 hash 의 행 삭제).
+추론은 캐시에 없는 이미지 경로를 임시 .txt 목록으로 넘겨 stream=True 로 한 장씩 디코딩합니다.
+
+    cache = PredictionCache(MODEL_PATH, {"conf": 0.5, "iou": 0.5, "agnostic_nms": True})
+    for pred in cache.predict(image_paths):     # 입력 순서대로 Prediction(path, boxes, scores, classes, orig_shape)
+        ...
+
+    python scripts/prediction_cache.py --weights runs/yolov11l/exp/weights/best.pt   # 검증셋 미리 채우기
+    python scripts/prediction_cache.py --weights runs/yolov11l/exp/weights/best.pt --params default ensemble  # 앙상블용 포함
+    python scripts/prediction_cache.py --gc                                          # 삭제된 이미지의 행 정리
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import argparse
+from pathlib import Path
+from collections import namedtuple
+
+import numpy as np
+
+CACHE_VERSION = 1
+
+# ✅ 경로 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+CACHE_DIR = BASE_DIR / "prediction_cache"
+IMAGE_DIR = BASE_DIR / "yolo_dataset" / "images" / "val"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+HASH_CHUNK = 1 << 20
+
+Prediction = namedtuple("Prediction", ["path", "boxes", "scores", "classes", "orig_shape"])
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FileHashIndex:
+    """경로 → 내용 sha1. (크기, mtime) 가 같으면 파일을 다시 읽지 않는다."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self.dirty = False
+        self.replaced = set()  # 이번 프로세스에서 내용이 바뀐 경로들의 이전 hash
+
+    def get(self, file_path):
+        file_path = str(Path(file_path).resolve())
+        st = os.stat(file_path)
+        entry = self.entries.get(file_path)
+        if entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha1"]
+        digest = file_sha1(file_path)
+        if entry is not None and entry["sha1"] != digest:
+            self.replaced.add(entry["sha1"])
+        self.entries[file_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": digest}
+        self.dirty = True
+        return digest
+
+    def live_hashes(self):
+        return {entry["sha1"] for entry in self.entries.values()}
+
+    def drop_missing(self):
+        # 더 이상 없는 파일의 항목 삭제, 삭제 수 반환
+        gone = [path for path in self.entries if not os.path.exists(path)]
+        for path in gone:
+            del self.entries[path]
+        self.dirty = self.dirty or bool(gone)
+        return len(gone)
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class PredictionCache:
+    def __init__(self, weights_path, predict_params, cache_dir=CACHE_DIR, verbose=True):
+        self.weights_path = Path(weights_path)
+        self.predict_params = dict(predict_params)
+        self.cache_dir = Path(cache_dir)
+        self.verbose = verbose
+        self.hashes = FileHashIndex(self.cache_dir / "image_hashes.json")
+        self.weights_hash = self.hashes.get(self.weights_path)
+        params = json.dumps(self.predict_params, sort_keys=True)
+        self.key = hashlib.sha1(f"{CACHE_VERSION}|{self.weights_hash}|{params}".encode("utf-8")).hexdigest()[:16]
+        self.path = self.cache_dir / f"{self.key}.npz"
+        self._model = None
+        self._rows = self._load()  # image_hash → (boxes, scores, classes, orig_shape)
+
+    # ---------- 저장 / 로드 ----------
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        with np.load(self.path, allow_pickle=False) as npz:
+            if int(npz["version"]) != CACHE_VERSION:
+                return {}
+            offsets, boxes, scores, classes = npz["offsets"], npz["boxes"], npz["scores"], npz["classes"]
+            return {h: (boxes[offsets[i]:offsets[i + 1]], scores[offsets[i]:offsets[i + 1]],
+                        classes[offsets[i]:offsets[i + 1]], tuple(shape))
+                    for i, (h, shape) in enumerate(zip(npz["image_hash"].tolist(), npz["orig_shape"].tolist()))}
+
+    def save(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        image_hashes = sorted(self._rows)
+        rows = [self._rows[h] for h in image_hashes]
+        counts = [len(r[2]) for r in rows]
+        tmp_path = self.path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, version=np.int64(CACHE_VERSION),
+                 weights=np.array(str(self.weights_path)), params=np.array(json.dumps(self.predict_params, sort_keys=True)),
+                 image_hash=np.array(image_hashes, dtype=str),
+                 orig_shape=np.array([r[3] for r in rows], dtype=np.int64).reshape(-1, 2),
+                 offsets=np.r_[0, np.cumsum(counts, dtype=np.int64)].astype(np.int64),
+                 boxes=np.concatenate([r[0] for r in rows]).reshape(-1, 4) if rows else np.zeros((0, 4), np.float32),
+                 scores=np.concatenate([r[1] for r in rows]) if rows else np.zeros(0, np.float32),
+                 classes=np.concatenate([r[2] for r in rows]) if rows else np.zeros(0, np.int32))
+        os.replace(tmp_path, self.path)
+
+    # ---------- 조회 / 추론 ----------
+    @property
+    def model(self):
+        # 캐시에 없는 이미지가 있을 때만 모델 로드
+        if self._model is None:
+            from ultralytics import YOLO
+            self._model = YOLO(str(self.weights_path))
+        return self._model
+
+    def _infer(self, missing):
+        # missing: 이미지 hash → 경로. 결과는 result.path 로 다시 hash 에 연결
+        # 경로 목록을 .txt 로 넘김 (list source 는 ultralytics 가 모든 이미지를 먼저 디코딩해서 메모리에 올림)
+        hash_of = {str(Path(path).resolve()): image_hash for image_hash, path in missing.items()}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, list_path = tempfile.mkstemp(suffix=".txt", prefix="missing_", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("".join(path + "\n" for path in hash_of))
+            results = self.model.predict(source=list_path, save=False, verbose=False, stream=True,
+                                         **self.predict_params)
+            for result in results:
+                boxes = result.boxes
+                self._rows[hash_of[str(Path(result.path).resolve())]] = (boxes.xyxy.cpu().numpy().astype(np.float32),
+                                          boxes.conf.cpu().numpy().astype(np.float32),
+                                          boxes.cls.cpu().numpy().astype(np.int32),
+                                          tuple(int(v) for v in result.orig_shape))
+        finally:
+            os.remove(list_path)
+
+    def predict(self, image_paths):
+        """image_paths 순서대로 Prediction 목록 (캐시에 없는 이미지만 추론 후 저장, 읽지 못한 이미지는 빠짐)."""
+        start = time.perf_counter()
+        image_paths = [Path(p) for p in image_paths]
+        image_hashes = [self.hashes.get(p) for p in image_paths]
+        self.hashes.save()
+
+        missing = {}
+        for path, image_hash in zip(image_paths, image_hashes):
+            if image_hash not in self._rows and image_hash not in missing:
+                missing[image_hash] = path
+        # 내용이 바뀐 경로의 이전 hash 행은 정리 (다른 경로가 아직 같은 내용이면 유지)
+        live = self.hashes.live_hashes()
+        stale = [h for h in self.hashes.replaced if h in self._rows and h not in live]
+        for h in stale:
+            del self._rows[h]
+        if missing:
+            self._infer(missing)
+        if missing or stale:
+            self.save()
+
+        # ultralytics 가 읽지 못하고 건너뛴 이미지는 결과에서 제외 (캐시하지 않으므로 다음 실행에서 다시 시도)
+        failed = {h: path for h, path in missing.items() if h not in self._rows}
+        if failed:
+            print(f"⚠️ 예측 결과 없음 (이미지 읽기 실패?) {len(failed)}장: {', '.join(p.name for p in failed.values())}")
+
+        if self.verbose:
+            print(f"🗃️ 예측 캐시 {self.weights_path.name} ({self.key}): 이미지 {len(image_paths)}장, "
+                  f"hit {len(image_paths) - len(missing)} / 추론 {len(missing)} / 정리 {len(stale)} "
+                  f"({time.perf_counter() - start:.1f}s)")
+        return [Prediction(str(path), *self._rows[h]) for path, h in zip(image_paths, image_hashes) if h in self._rows]
+
+
+def gc(cache_dir=CACHE_DIR):
+    """없어진 이미지의 hash 항목을 지우고, 모든 캐시 파일에서 어떤 경로에도 연결되지 않은 hash 의 행을 삭제."""
+    cache_dir = Path(cache_dir)
+    hashes = FileHashIndex(cache_dir / "image_hashes.json")
+    dropped_paths = hashes.drop_missing()
+    hashes.save()
+    live = hashes.live_hashes()
+
+    for path in sorted(cache_dir.glob("*.npz")):
+        if path.name.endswith(".tmp.npz"):
+            continue
+        with np.load(path, allow_pickle=False) as npz:
+            data = {name: npz[name] for name in npz.files}
+        keep = np.array([h in live for h in data["image_hash"].tolist()], dtype=bool)
+        if keep.all():
+            continue
+        offsets = data["offsets"]
+        rows = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in np.flatnonzero(keep)] or
+                              [np.zeros(0, dtype=np.int64)])
+        counts = np.diff(offsets)[keep]
+        data.update(image_hash=data["image_hash"][keep], orig_shape=data["orig_shape"][keep],
+                    offsets=np.r_[0, np.cumsum(counts, dtype=np.int64)].astype(np.int64),
+                    boxes=data["boxes"][rows], scores=data["scores"][rows], classes=data["classes"][rows])
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, **data)
+        os.replace(tmp_path, path)
+        print(f"🧹 {path.name}: 이미지 {int((~keep).sum())}장 행 삭제")
+    print(f"🧹 hash 항목 {dropped_paths}개 삭제 (없는 파일)")
+
+
+def list_images(image_dir=IMAGE_DIR):
+    image_dir = Path(image_dir)
+    return sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.append(str(BASE_DIR))
+    from configs.predict_config import YOLO_PREDICT_PARAMS, ENSEMBLE_PREDICT_PARAMS
+
+    # 분석 스크립트와 같은 params 로 채워야 캐시 key 가 일치 (default: eval_model_aug / compare, ensemble: ensemble)
+    PARAM_PRESETS = {"default": YOLO_PREDICT_PARAMS, "ensemble": ENSEMBLE_PREDICT_PARAMS}
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", nargs="+", default=[])
+    parser.add_argument("--images", default=str(IMAGE_DIR))
+    parser.add_argument("--params", nargs="+", choices=sorted(PARAM_PRESETS), default=["default"],
+                        help="predict params (configs/predict_config.py), 여러 개면 모두 채움")
+    parser.add_argument("--gc", action="store_true", help="삭제된 이미지의 hash 항목 / 캐시 행 정리")
+    args = parser.parse_args()
+    if not args.weights and not args.gc:
+        parser.error("--weights 또는 --gc 가 필요합니다.")
+
+    if args.gc:
+        gc()
+    image_paths = list_images(args.images) if args.weights else []
+    for weights in args.weights:
+        for preset in args.params:
+            PredictionCache(weights, PARAM_PRESETS[preset]).predict(image_paths)
@@ -0,0 +1,200 @@
+"""
+YOLO 로컬 추론 서버 (HTTP, micro-batching).
+
+best.pt 를 한 번만 로드하고, 동시에 들어온 요청을 최대 --max_batch 장 / 첫 요청 후 최대 --max_wait_ms 까지 모아
+model.predict 한 번으로 처리합니다. 예측 파라미터는 configs/predict_config.py 의 YOLO_PREDICT_PARAMS,
+클래스 이름은 가중치에 저장된 model.names (학습 때 쓴 data.yaml 의 names) 를 사용합니다.
+
+    python yolov11/scripts/serve_model.py --model yolov11/runs/yolov11l_aug/exp/weights/best.pt --max_batch 8 --max_wait_ms 10
+
+    POST /predict   body: 인코딩된 이미지 바이트 (PNG/JPG)
+                    → {"detections": [{"class_id", "class_name", "confidence", "box": [x1, y1, x2, y2]}], "batch_size": n}
+    GET  /health    → 모델 경로 / batching 설정
+    GET  /stats     → 처리한 요청 수, batch 크기 분포
+"""
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# ✅ 디렉토리 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+MODEL_PATH = BASE_DIR / "runs" / "yolov11l_aug" / "exp" / "weights" / "best.pt"
+sys.path.append(str(BASE_DIR))  # configs 모듈 import 가능하게 설정
+
+from configs.predict_config import YOLO_PREDICT_PARAMS
+
+REQUEST_TIMEOUT = 30.0  # 초
+
+
+class MicroBatcher:
+    """요청(이미지)을 큐에 모아 predict_fn(images) 를 batch 단위로 한 번씩 호출하는 워커 스레드.
+
+    첫 요청이 들어온 시점부터 max_wait_ms 가 지나거나 max_batch 개가 모이면 바로 실행합니다.
+    submit() 은 Future 를 돌려주며, predict_fn 이 실패하면 batch 안의 모든 요청에 예외가 전달됩니다.
+    """
+
+    def __init__(self, predict_fn, max_batch=8, max_wait_ms=10):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Counter()
+        self.served = 0
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image):
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            try:
+                outputs = self.predict_fn([image for image, _ in batch])
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result((output, len(batch)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self.batch_sizes[len(batch)] += 1
+            self.served += len(batch)
+
+
+def make_predict_fn(model_path, device=None, imgsz=640):
+    from ultralytics import YOLO
+
+    model = YOLO(str(model_path))
+    class_names = model.names  # class id → 이름 (학습 데이터의 data.yaml 과 동일)
+    params = dict(conf=YOLO_PREDICT_PARAMS["conf"], iou=YOLO_PREDICT_PARAMS["iou"],
+                  agnostic_nms=YOLO_PREDICT_PARAMS["agnostic_nms"], imgsz=imgsz, save=False, verbose=False)
+    if device is not None:
+        params["device"] = device
+
+    def predict(images):
+        results = model.predict(source=images, batch=len(images), **params)
+        outputs = []
+        for result in results:
+            boxes = result.boxes.xyxy.cpu().numpy()
+            scores = result.boxes.conf.cpu().numpy()
+            classes = result.boxes.cls.cpu().numpy().astype(int)
+            outputs.append([
+                {"class_id": int(c), "class_name": class_names.get(int(c), str(c)),
+                 "confidence": round(float(s), 4), "box": [round(float(v), 1) for v in b]}
+                for b, s, c in zip(boxes, scores, classes)
+            ])
+        return outputs
+
+    # 첫 요청 지연을 줄이기 위한 warmup
+    predict([np.zeros((imgsz, imgsz, 3), dtype=np.uint8)])
+    return predict
+
+
+def make_handler(batcher, info):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", **info})
+            elif self.path == "/stats":
+                self._send_json(200, {"served": batcher.served,
+                                      "batch_sizes": {str(k): v for k, v in sorted(batcher.batch_sizes.items())}})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            data = np.frombuffer(self.rfile.read(length), dtype=np.uint8)
+            image = cv2.imdecode(data, cv2.IMREAD_COLOR) if length else None
+            if image is None:
+                self._send_json(400, {"error": "이미지 디코딩 실패"})
+                return
+            try:
+                detections, batch_size = batcher.submit(image).result(timeout=REQUEST_TIMEOUT)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"detections": detections, "batch_size": batch_size})
+
+        def log_message(self, format, *args):
+            pass  # 요청마다 stderr 출력하지 않음
+
+    return Handler
+
+
+def main(args):
+    print(f"🚀 모델 로드: {args.model}")
+    predict_fn = make_predict_fn(args.model, device=args.device, imgsz=args.imgsz)
+    batcher = MicroBatcher(predict_fn, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    info = {"model": str(args.model), "max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms,
+            "predict_params": YOLO_PREDICT_PARAMS}
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher, info))
+    server.daemon_threads = True
+    print(f"✅ http://{args.host}:{args.port} (max_batch={args.max_batch}, max_wait_ms={args.max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default=str(MODEL_PATH))
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max_batch", type=int, default=8, help="micro-batch 최대 이미지 수")
+    parser.add_argument("--max_wait_ms", type=float, default=10, help="첫 요청 이후 batch 를 모으는 최대 대기 시간")
+    parser.add_argument("--device", type=str, default=None, help="예: 0, cpu (기본: ultralytics 자동 선택)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    main(parser.parse_args())
@@ -0,0 +1,189 @@
+"""
+📄 split_manifest.py
+
+파일을 옮기지 않고 이미지 목록(.txt)으로 train/val 을 나눕니다 (split_val.py 의 shutil.move 대체).
+라벨 파일의 모든 클래스를 보고 iterative multi-label stratification 으로 분할하므로
+여러 알약이 함께 찍힌 이미지가 많은 클래스도 train/val 양쪽에 비율대로 들어갑니다.
+convert_with_aug.py --variants 로 만든 {stem}_augNN 변형은 원본 콜라주와 같은 쪽(fold)에 묶어서 배정합니다.
+
+  yolov11/yolo_dataset/
+  ├── images/train/, labels/train/     ← 분할 대상
+  ├── images/val/, labels/val/         ← split_val.py 로 따로 떼어 둔 검증셋, 분할에 섞지 않음
+  │                                      (eval_model_aug / compare / ensemble 스크립트가 계속 이 폴더로 평가)
+  ├── data.yaml                        ← train/val 이 splits/<name>/*.txt 를 가리킴
+  └── splits/
+      ├── default/train.txt, val.txt, split.json
+      └── kfold5_s0/fold0/train.txt, fold0.yaml, ..., split.json
+
+  python scripts/split_manifest.py --val_ratio 0.2 --seed 0          # data.yaml 을 splits/default 로 갱신
+  python scripts/split_manifest.py --kfold 5 --seed 0                # fold 별 목록 + fold{i}.yaml (data.yaml 은 그대로)
+"""
+import os
+import re
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from make_data_yaml import write_data_yaml, YAML_OUTPUT_PATH
+
+# ✅ 기준 경로
+SCRIPT_DIR = Path(__file__).resolve().parent
+YOLO_DIR = SCRIPT_DIR.parent / "yolo_dataset"
+SPLIT_DIR = YOLO_DIR / "splits"
+POOL_DIRS = ["train"]  # images/<dir>, labels/<dir> 를 합쳐서 분할 (images/val 은 평가 스크립트용 holdout 이라 제외)
+IMAGE_EXTS = (".png", ".jpg", ".jpeg")
+VARIANT_SUFFIX = re.compile(r"_aug\d+$")  # convert_with_aug.py 의 변형 파일명 {stem}_augNN
+
+
+# ✅ 이미지 + 라벨의 클래스 집합 + 그룹 key 수집 (라벨 파일 없음 = 배경 이미지)
+# 그룹 key = 변형 접미사(_augNN)를 뗀 파일 stem → 같은 콜라주의 변형/원본은 같은 key
+def collect_samples(yolo_dir=YOLO_DIR, pool_dirs=POOL_DIRS):
+    image_paths, class_sets, groups = [], [], []
+    for sub in pool_dirs:
+        image_dir, label_dir = yolo_dir / "images" / sub, yolo_dir / "labels" / sub
+        if not image_dir.exists():
+            continue
+        for fname in sorted(os.listdir(image_dir)):
+            if not fname.lower().endswith(IMAGE_EXTS):
+                continue
+            label_path = label_dir / (os.path.splitext(fname)[0] + ".txt")
+            classes = set()
+            if label_path.exists():
+                with open(label_path, "r") as f:
+                    classes = {int(line.split()[0]) for line in f if line.strip()}
+            image_paths.append(str((image_dir / fname).resolve()))
+            class_sets.append(classes)
+            groups.append(VARIANT_SUFFIX.sub("", os.path.splitext(fname)[0]))
+    return image_paths, class_sets, groups
+
+
+def to_label_matrix(class_sets):
+    num_classes = max((max(s) for s in class_sets if s), default=-1) + 1
+    Y = np.zeros((len(class_sets), num_classes), dtype=bool)
+    for i, classes in enumerate(class_sets):
+        Y[i, list(classes)] = True
+    return Y
+
+
+# ✅ iterative stratification (Sechidis et al., 2011)
+# 남은 이미지가 가장 적은 클래스부터, 그 클래스를 가진 이미지를 해당 클래스가 가장 모자란 fold 에 배정
+# (동률이면 전체 이미지가 가장 모자란 fold, 그래도 동률이면 seed 로 무작위)
+# weights: 행마다 이미지 수 (행 = 이미지 그룹일 때), 없으면 모두 1
+def iterative_stratification(Y, ratios, seed=0, weights=None):
+    rng = np.random.default_rng(seed)
+    ratios = np.asarray(ratios, dtype=np.float64) / np.sum(ratios)
+    n, num_classes = Y.shape
+    weights = np.ones(n, dtype=np.float64) if weights is None else np.asarray(weights, dtype=np.float64)
+    desired_label = ratios[:, None] * (weights[:, None] * Y).sum(axis=0)[None, :]  # [fold, class]
+    desired_total = ratios * weights.sum()
+    remaining = Y.sum(axis=0).astype(np.int64)
+    members = [np.flatnonzero(Y[:, c]) for c in range(num_classes)]
+    fold_of = np.full(n, -1, dtype=np.int64)
+
+    def assign(i, fold):
+        fold_of[i] = fold
+        desired_label[fold] -= weights[i] * Y[i]
+        desired_total[fold] -= weights[i]
+        remaining[:] -= Y[i]
+
+    while remaining.any():
+        counts = np.where(remaining > 0, remaining, np.iinfo(np.int64).max)
+        candidates = np.flatnonzero(counts == counts.min())
+        c = int(candidates[rng.integers(len(candidates))])
+        rows = members[c][fold_of[members[c]] < 0]
+        for i in rng.permutation(rows).tolist():
+            best = np.flatnonzero(desired_label[:, c] == desired_label[:, c].max())
+            if len(best) > 1:
+                best = best[desired_total[best] == desired_total[best].max()]
+            assign(i, int(best[rng.integers(len(best))]))
+
+    # 라벨 없는 이미지는 전체 개수만 맞춤
+    for i in rng.permutation(np.flatnonzero(fold_of < 0)).tolist():
+        best = np.flatnonzero(desired_total == desired_total.max())
+        fold_of[i] = int(best[rng.integers(len(best))])
+        desired_total[fold_of[i]] -= weights[i]
+    return fold_of
+
+
+# ✅ 그룹 단위 분할: 그룹의 클래스 = 구성 이미지 클래스의 합집합, 그룹 크기만큼 가중치 → 이미지별 fold 로 펼침
+def grouped_stratification(Y, groups, ratios, seed=0):
+    _, group_of, sizes = np.unique(np.asarray(groups), return_inverse=True, return_counts=True)
+    Y_group = np.zeros((len(sizes), Y.shape[1]), dtype=bool)
+    np.logical_or.at(Y_group, group_of, Y)
+    return iterative_stratification(Y_group, ratios, seed, weights=sizes)[group_of]
+
+
+def write_list(path, image_paths, indices):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("".join(image_paths[i] + "\n" for i in indices))
+    os.replace(tmp_path, path)
+
+
+# ✅ val 에 들어간 비율 (클래스별) 요약
+def coverage(Y, val_mask):
+    totals = Y.sum(axis=0)
+    present = totals > 0
+    val_ratio = Y[val_mask].sum(axis=0)[present] / totals[present]
+    missing = int(((Y[val_mask].sum(axis=0) == 0) & present).sum())
+    if val_ratio.size == 0:
+        return 0.0, 0.0, missing
+    return float(val_ratio.min()), float(val_ratio.max()), missing
+
+
+def split_train_val(image_paths, Y, groups, val_ratio, seed, out_dir):
+    fold_of = grouped_stratification(Y, groups, [1 - val_ratio, val_ratio], seed)
+    write_list(out_dir / "train.txt", image_paths, np.flatnonzero(fold_of == 0))
+    write_list(out_dir / "val.txt", image_paths, np.flatnonzero(fold_of == 1))
+    return fold_of
+
+
+def split_kfold(image_paths, Y, groups, k, seed, out_dir):
+    fold_of = grouped_stratification(Y, groups, [1] * k, seed)
+    for fold in range(k):
+        fold_dir = out_dir / f"fold{fold}"
+        write_list(fold_dir / "train.txt", image_paths, np.flatnonzero(fold_of != fold))
+        write_list(fold_dir / "val.txt", image_paths, np.flatnonzero(fold_of == fold))
+        write_data_yaml(out_dir / f"fold{fold}.yaml", train=(fold_dir / "train.txt").relative_to(YOLO_DIR).as_posix(),
+                        val=(fold_dir / "val.txt").relative_to(YOLO_DIR).as_posix())
+    return fold_of
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--val_ratio", type=float, default=0.2)
+    parser.add_argument("--kfold", type=int, default=None, help="K-fold 목록 생성 (data.yaml 은 바꾸지 않음)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name", default=None, help="splits/<name> (기본: default 또는 kfold{K}_s{seed})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    image_paths, class_sets, groups = collect_samples()
+    if not image_paths:
+        raise SystemExit(f"❌ 이미지 없음: {YOLO_DIR / 'images'}")
+    Y = to_label_matrix(class_sets)
+
+    name = args.name or ("default" if args.kfold is None else f"kfold{args.kfold}_s{args.seed}")
+    out_dir = SPLIT_DIR / name
+    if args.kfold is None:
+        fold_of = split_train_val(image_paths, Y, groups, args.val_ratio, args.seed, out_dir)
+        write_data_yaml(YAML_OUTPUT_PATH, train=f"splits/{name}/train.txt", val=f"splits/{name}/val.txt")
+        lo, hi, missing = coverage(Y, fold_of == 1)
+        print(f"✅ train {int((fold_of == 0).sum())}장 / val {int((fold_of == 1).sum())}장 → {out_dir} (data.yaml 갱신)")
+        print(f"📊 클래스별 val 비율 {lo:.2f} ~ {hi:.2f}, val 에 없는 클래스 {missing}개")
+    else:
+        fold_of = split_kfold(image_paths, Y, groups, args.kfold, args.seed, out_dir)
+        for fold in range(args.kfold):
+            lo, hi, missing = coverage(Y, fold_of == fold)
+            print(f"✅ fold{fold}: val {int((fold_of == fold).sum())}장, 클래스별 비율 {lo:.2f} ~ {hi:.2f}, "
+                  f"없는 클래스 {missing}개 → {out_dir / f'fold{fold}.yaml'}")
+
+    with open(out_dir / "split.json", "w", encoding="utf-8") as f:
+        json.dump({"seed": args.seed, "val_ratio": args.val_ratio if args.kfold is None else None, "kfold": args.kfold,
+                   "num_images": len(image_paths), "num_groups": len(set(groups)), "num_classes": int(Y.shape[1]),
+                   "fold_sizes": np.bincount(fold_of).tolist()}, f, indent=2)
+    print(f"⏱️ {time.perf_counter() - start:.2f}s")
@@ -1,41 +1,33 @@
-from pathlib import Path
-from ultralytics import YOLO
-
-# ✅ BASE_DIR = yolov11/
-BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_DIR = BASE_DIR / "model"
-DATA_YAML = BASE_DIR / "yolo_dataset" / "data.yaml"
-RUNS_DIR = BASE_DIR / "runs"
-
-# ✅ 학습할 모델 경로들
-model_paths = {
-    "yolov11s": MODEL_DIR / "yolo11s.pt",
-    "yolov11m": MODEL_DIR / "yolo11m.pt",
-    "yolov11l": MODEL_DIR / "yolo11l.pt"
-}
-
-# ✅ 학습 설정
-EPOCHS = 300
-PATIENCE = 5
-
-# ✅ 모델별 학습 실행
-for model_name, model_path in model_paths.items():
-    print(f"\n🚀 모델 학습 시작: {model_name}")
-
-    if not model_path.exists():
-        print(f"❌ 모델 파일 없음: {model_path}")
-        continue
-
-    model = YOLO(str(model_path))
-
-    model.train(
-        data=str(DATA_YAML),
-        epochs=EPOCHS,
-        patience=PATIENCE,
-        imgsz=640,
-        project=str(RUNS_DIR / model_name),  # ex: yolov11/runs/yolov11s
-        name="exp",
-        save=True
-    )
-
-    print(f"✅ {model_name} 학습 완료")
\ No newline at end of file
+import os
+import argparse
+
+from train_scheduler import JobQueue, Scheduler, build_jobs, default_devices, MODEL_PATHS, DATA_YAML, EPOCHS, PATIENCE
+
+# ✅ 학습할 모델 (가중치 경로는 train_scheduler.MODEL_PATHS)
+MODELS = ["yolov11s", "yolov11m", "yolov11l"]
+
+# ✅ 모델별 학습을 스케줄러 큐에 넣고 동시에 실행
+# 결과 위치는 기존과 같음 (yolov11/runs/<model>/exp)
+# 실행할 때마다 처음부터 다시 학습 (이전 exp 는 exp_<시각> 으로 보관), 중단된 학습만 다시 실행하면 last.pt 에서 이어서 학습
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", nargs="+", default=None, help="사용할 device (기본: 모든 GPU, 없으면 cpu)")
+    parser.add_argument("--jobs_per_device", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4, help="모델당 CPU 스레드")
+    parser.add_argument("--workers", type=int, default=4, help="모델당 dataloader worker")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    queue = JobQueue()
+    for model_name in MODELS:
+        if not MODEL_PATHS[model_name].exists():
+            print(f"❌ 모델 파일 없음: {MODEL_PATHS[model_name]}")
+            continue
+        for job in build_jobs([model_name], data=DATA_YAML, train_args={"epochs": EPOCHS, "patience": PATIENCE, "imgsz": 640},
+                              threads=args.threads, workers=args.workers):
+            if queue.add(job, rerun=True):
+                print(f"📥 모델 학습 예약: {model_name}")
+            else:
+                print(f"🔁 중단된 학습 이어서 진행: {model_name}")
+
+    Scheduler(queue, args.devices or default_devices(), args.jobs_per_device, args.cpus).run()
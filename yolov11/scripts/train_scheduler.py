@@ -0,0 +1,447 @@
+"""
+여러 YOLO 학습(모델 / K-fold / 하이퍼파라미터 sweep)을 동시에 돌리는 스케줄러.
+
+- 작업 큐는 runs/scheduler/queue.json 에 저장 (재시작해도 유지, 같은 작업 id 는 다시 추가되지 않음,
+  add --rerun 이면 끝난 작업을 처음부터 다시 학습하도록 교체)
+- 작업마다 CPU 스레드 수, dataloader worker 수, device 를 지정. 작업은 별도 프로세스로 실행
+  (OMP/MKL 스레드 수와 CUDA_VISIBLE_DEVICES 를 작업별로 설정)
+- 중단된 작업(스케줄러/프로세스 종료)은 다음 실행 때 weights/last.pt 에서 resume
+  (새로 추가된 작업의 첫 실행은 resume 하지 않고, 같은 폴더에 남은 이전 결과는 <name>_<시각> 으로 옮김)
+- 전체 상태는 runs/scheduler/status.json (작업별 상태, epoch, mAP, 로그 경로), 로그는 runs/scheduler/logs/<id>.log
+
+    python scripts/train_scheduler.py add --models yolov11s yolov11m --epochs 300 --threads 4 --workers 4
+    python scripts/train_scheduler.py add --models yolov11s --kfold_dir yolo_dataset/splits/kfold5_s0
+    python scripts/train_scheduler.py add --models yolov11s --sweep lr0=0.01,0.001 batch=16,32
+    python scripts/train_scheduler.py add --models yolov11s --rerun     # 데이터가 바뀐 뒤 다시 학습
+    python scripts/train_scheduler.py run --devices 0 1 --jobs_per_device 2 --cpus 32
+    python scripts/train_scheduler.py status
+"""
+import os
+import sys
+import ast
+import csv
+import json
+import time
+import fcntl
+import signal
+import argparse
+import itertools
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+
+# ✅ 경로 설정
+SCRIPT_DIR = Path(__file__).resolve().parent          # yolov11/scripts
+BASE_DIR = SCRIPT_DIR.parent                          # yolov11/
+MODEL_DIR = BASE_DIR / "model"
+DATA_YAML = BASE_DIR / "yolo_dataset" / "data.yaml"
+RUNS_DIR = BASE_DIR / "runs"
+SCHEDULER_DIR = RUNS_DIR / "scheduler"
+
+# ✅ 모델 이름 → 가중치
+MODEL_PATHS = {
+    "yolov11s": MODEL_DIR / "yolo11s.pt",
+    "yolov11m": MODEL_DIR / "yolo11m.pt",
+    "yolov11l": MODEL_DIR / "yolo11l.pt",
+}
+
+# ✅ 기본 설정
+EPOCHS = 300
+PATIENCE = 5
+IMG_SIZE = 640
+MAX_ATTEMPTS = 3        # 실패(비정상 종료) 시 재시도 횟수
+POLL_INTERVAL = 10      # 초
+FINISHED = ("done", "failed", "stopped")
+
+
+# ---------- 작업 큐 (파일 잠금 + 임시 파일 rename 으로 저장) ----------
+class JobQueue:
+    def __init__(self, root=SCHEDULER_DIR):
+        self.root = Path(root)
+        self.path = self.root / "queue.json"
+        self.status_path = self.root / "status.json"
+        self.log_dir = self.root / "logs"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        # add / run / 작업 프로세스가 동시에 큐를 고쳐도 깨지지 않도록 읽기-수정-쓰기 구간을 잠금
+        with open(self.root / "queue.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            jobs = self._read()
+            yield jobs
+            self._write(jobs)
+
+    def _read(self):
+        if not self.path.exists():
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)["jobs"]
+
+    def _write(self, jobs):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"jobs": jobs}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def snapshot(self):
+        with self.locked() as jobs:
+            return json.loads(json.dumps(jobs))
+
+    def add(self, job, rerun=False):
+        """새 작업이면 추가. rerun=True 면 끝난(done/failed/stopped) 같은 id 작업도 새 작업으로 교체.
+
+        pending / running 작업(중단 후 resume 대기 포함)은 그대로 둔다.
+        """
+        with self.locked() as jobs:
+            existing = jobs.get(job["id"])
+            if existing is not None and not (rerun and existing["status"] in FINISHED):
+                return False
+            jobs[job["id"]] = job
+            return True
+
+    def update(self, job_id, **fields):
+        with self.locked() as jobs:
+            jobs[job_id].update(fields)
+
+
+def make_job(job_id, model, data=DATA_YAML, project=None, name="exp", train_args=None,
+             threads=4, workers=4, device="auto", priority=0):
+    """작업 정의. device: "auto" (스케줄러가 빈 device 배정), "cpu", 또는 GPU 번호 문자열."""
+    return {
+        "id": job_id,
+        "model": str(model),
+        "data": str(data),
+        "project": str(project or RUNS_DIR / job_id),
+        "name": name,
+        "train_args": dict(train_args or {}),
+        "threads": threads,
+        "workers": workers,
+        "device": str(device),
+        "priority": priority,
+        "status": "pending",       # pending / running / done / failed / stopped
+        "attempts": 0,
+        "pid": None,
+        "assigned_device": None,
+        "started": None,
+        "finished": None,
+        "returncode": None,
+        "fresh": True,             # 첫 실행: 이전 결과에서 resume 하지 않고 처음부터 학습
+    }
+
+
+def run_dir(job):
+    return Path(job["project"]) / job["name"]
+
+
+# ✅ results.csv 마지막 행 (ultralytics 가 epoch 마다 추가)
+def read_results(save_dir):
+    csv_path = Path(save_dir) / "results.csv"
+    if not csv_path.exists():
+        return []
+    with open(csv_path, "r", newline="") as f:
+        rows = list(csv.DictReader(f))
+    return [{k.strip(): v.strip() for k, v in row.items() if k is not None} for row in rows]
+
+
+def progress(job):
+    rows = read_results(run_dir(job))
+    if not rows:
+        return {}
+    last = rows[-1]
+    maps = [float(r["metrics/mAP50-95(B)"]) for r in rows if r.get("metrics/mAP50-95(B)")]
+    return {"epoch": int(float(last.get("epoch", 0))), "mAP50-95": maps[-1] if maps else None,
+            "best_mAP50-95": max(maps) if maps else None}
+
+
+def pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def stop_job(queue, job_id):
+    """실행 중인 작업을 중단 (status=stopped, 다시 실행하지 않음). hparam_search.py 의 조기 종료에서 사용."""
+    with queue.locked() as jobs:
+        job = jobs[job_id]
+        pid = job["pid"]
+        job["status"] = "stopped"
+        if not pid_alive(pid):
+            job.update(pid=None, finished=time.time())
+    if pid_alive(pid):
+        os.kill(pid, signal.SIGTERM)
+
+
+# ✅ 새 작업의 첫 실행 전에 같은 run 폴더에 남아 있는 이전 결과를 옆으로 치움 (last.pt 로 resume 되지 않게)
+def archive_run_dir(job):
+    save_dir = run_dir(job)
+    if not save_dir.exists():
+        return None
+    archived = save_dir.with_name(f"{save_dir.name}_{time.strftime('%Y%m%d-%H%M%S')}")
+    save_dir.rename(archived)
+    print(f"📦 이전 결과 보관: {save_dir} → {archived}")
+    return archived
+
+
+# ---------- 작업 1개 실행 (스케줄러가 띄운 자식 프로세스) ----------
+def run_job(job, queue=None):
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(job["threads"])
+    if job.get("fresh"):
+        archive_run_dir(job)
+        if queue is not None:
+            queue.update(job["id"], fresh=False)  # 이후 재시도/재시작은 이번 학습의 last.pt 에서 resume
+    last_pt = run_dir(job) / "weights" / "last.pt"
+    # CUDA_VISIBLE_DEVICES 로 GPU 1개만 보이므로 자식 프로세스 안에서는 항상 0 번
+    device = "cpu" if job["assigned_device"] == "cpu" else 0
+
+    if last_pt.exists():
+        print(f"🔁 resume: {last_pt}")
+        try:
+            YOLO(str(last_pt)).train(resume=True, device=device, workers=job["workers"])
+        except AssertionError as e:
+            # 이미 끝까지 학습된 last.pt (완료 표시 전에 중단된 경우)
+            if "nothing to resume" not in str(e):
+                raise
+            print(f"✅ 이미 완료된 학습: {e}")
+        return
+
+    args = {"epochs": EPOCHS, "patience": PATIENCE, "imgsz": IMG_SIZE}
+    args.update(job["train_args"])
+    YOLO(job["model"]).train(data=job["data"], project=job["project"], name=job["name"], exist_ok=True,
+                             device=device, workers=job["workers"], save=True, **args)
+
+
+# ---------- 스케줄러 ----------
+class Scheduler:
+    """pending 작업을 device 슬롯과 CPU 예산(threads + workers)이 허락하는 만큼 동시에 실행."""
+
+    def __init__(self, queue, devices, jobs_per_device=1, cpus=None, max_jobs=None):
+        self.queue = queue
+        self.slots = {str(d): jobs_per_device for d in devices}
+        self.cpus = cpus or os.cpu_count()
+        self.max_jobs = max_jobs
+        self.procs = {}   # job id → Popen
+
+    def recover(self):
+        # running 으로 남았는데 프로세스가 없는 작업(이전 스케줄러가 중단됨 등) → pending (last.pt 에서 resume)
+        # 이전 스케줄러가 띄운 프로세스가 아직 살아 있으면 그대로 두고 자원만 차지한 것으로 계산
+        with self.queue.locked() as jobs:
+            for job in jobs.values():
+                if job["status"] == "running" and job["id"] not in self.procs and not pid_alive(job["pid"]):
+                    print(f"♻️ 중단된 작업 재개 예정: {job['id']}")
+                    job.update(status="pending", pid=None, assigned_device=None)
+
+    def _free_device(self, job, used):
+        wanted = [job["device"]] if job["device"] != "auto" else [d for d in self.slots if d != "cpu"] or list(self.slots)
+        for device in wanted:
+            if device == "cpu" and device not in self.slots:
+                return device  # cpu 작업은 CPU 예산만 확인
+            if used.get(device, 0) < self.slots.get(device, 0):
+                return device
+        return None
+
+    def _launch(self, job, device):
+        env = os.environ.copy()
+        threads = str(job["threads"])
+        env.update(OMP_NUM_THREADS=threads, MKL_NUM_THREADS=threads, OPENBLAS_NUM_THREADS=threads)
+        env["CUDA_VISIBLE_DEVICES"] = "" if device == "cpu" else device
+        self.queue.log_dir.mkdir(parents=True, exist_ok=True)
+        log = open(self.queue.log_dir / f"{job['id']}.log", "a")
+        proc = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--root", str(self.queue.root),
+                                 "_job", job["id"]],
+                                stdout=log, stderr=subprocess.STDOUT, env=env, cwd=str(BASE_DIR))
+        log.close()
+        self.procs[job["id"]] = proc
+        self.queue.update(job["id"], status="running", pid=proc.pid, assigned_device=device,
+                          attempts=job["attempts"] + 1, started=time.time(), finished=None, returncode=None)
+        print(f"🚀 시작: {job['id']} (device={device}, threads={job['threads']}, workers={job['workers']}, pid={proc.pid})")
+
+    def _reap(self):
+        for job_id, proc in list(self.procs.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            del self.procs[job_id]
+            with self.queue.locked() as jobs:
+                job = jobs[job_id]
+                if job["status"] == "stopped":       # 외부(예: ASHA)에서 중단시킨 작업
+                    status = "stopped"
+                elif code == 0:
+                    status = "done"
+                else:
+                    status = "failed" if job["attempts"] >= MAX_ATTEMPTS else "pending"
+                job.update(status=status, pid=None, finished=time.time(), returncode=code)
+            print(f"{'✅' if status == 'done' else '⚠️'} {job_id}: {status} (returncode={code})")
+
+    def _schedule(self):
+        jobs = self.queue.snapshot()
+        running = [j for j in jobs.values() if j["status"] == "running"]
+        used = {}
+        for j in running:
+            used[j["assigned_device"]] = used.get(j["assigned_device"], 0) + 1
+        cpu_used = sum(j["threads"] + j["workers"] for j in running)
+
+        pending = sorted((j for j in jobs.values() if j["status"] == "pending"), key=lambda j: (-j["priority"], j["id"]))
+        for job in pending:
+            if self.max_jobs is not None and len(running) >= self.max_jobs:
+                break
+            cost = job["threads"] + job["workers"]
+            if running and cpu_used + cost > self.cpus:
+                continue  # 실행 중인 작업이 없으면 예산을 넘어도 하나는 실행 (멈춤 방지)
+            device = self._free_device(job, used)
+            if device is None:
+                continue
+            self._launch(job, device)
+            running.append(job)
+            used[device] = used.get(device, 0) + 1
+            cpu_used += cost
+
+    def write_status(self):
+        jobs = self.queue.snapshot()
+        now = time.time()
+        status = {"updated": now, "counts": {}, "jobs": []}
+        for job in sorted(jobs.values(), key=lambda j: j["id"]):
+            status["counts"][job["status"]] = status["counts"].get(job["status"], 0) + 1
+            end = job["finished"] or now
+            status["jobs"].append({
+                "id": job["id"], "status": job["status"], "device": job["assigned_device"], "pid": job["pid"],
+                "attempts": job["attempts"], "elapsed_s": round(end - job["started"], 1) if job["started"] else None,
+                "run_dir": str(run_dir(job)), "log": str(self.queue.log_dir / f"{job['id']}.log"),
+                "epochs": job["train_args"].get("epochs", EPOCHS), **progress(job),
+            })
+        tmp_path = self.queue.status_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(status, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.queue.status_path)
+        return status
+
+    def step(self):
+        self._reap()
+        self.recover()
+        self._schedule()
+        return self.write_status()
+
+    def run(self, poll_interval=POLL_INTERVAL):
+        while True:
+            status = self.step()
+            if not status["counts"].get("running") and not status["counts"].get("pending"):
+                break
+            time.sleep(poll_interval)
+        print(f"🎉 모든 작업 종료: {status['counts']}")
+        return status
+
+
+def default_devices():
+    try:
+        import torch
+        count = torch.cuda.device_count()
+    except ImportError:
+        count = 0
+    return [str(i) for i in range(count)] or ["cpu"]
+
+
+def parse_sweep(items):
+    # ["lr0=0.01,0.001", "batch=16,32"] → [{"lr0": 0.01, "batch": 16}, ...] (cartesian product)
+    def parse_value(value):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+
+    keys, values = [], []
+    for item in items or []:
+        key, _, raw = item.partition("=")
+        keys.append(key)
+        values.append([parse_value(v) for v in raw.split(",")])
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def sweep_suffix(params):
+    return "-".join(f"{k}={v}" for k, v in params.items())
+
+
+def build_jobs(models, data=DATA_YAML, kfold_dir=None, sweep=None, train_args=None, **resources):
+    """모델 × (K-fold 의 fold{i}.yaml | data) × sweep 조합의 작업 목록."""
+    datasets = [(None, Path(data))]
+    if kfold_dir is not None:
+        kfold_dir = Path(kfold_dir)
+        datasets = [(p.stem, p) for p in sorted(kfold_dir.glob("fold*.yaml"), key=lambda p: int(p.stem[4:]))]
+        if not datasets:
+            raise FileNotFoundError(f"fold*.yaml 없음: {kfold_dir} (split_manifest.py --kfold 로 생성)")
+
+    jobs = []
+    for model in models:
+        weights = MODEL_PATHS.get(model, Path(model))
+        for fold, data_yaml in datasets:
+            for params in parse_sweep(sweep) or [{}]:
+                name = "-".join(s for s in (fold, sweep_suffix(params)) if s) or "exp"
+                project = RUNS_DIR / (kfold_dir.name if kfold_dir is not None else "") / model
+                args = dict(train_args or {})
+                args.update(params)
+                jobs.append(make_job(f"{model}-{name}" if name != "exp" else model, weights, data=data_yaml,
+                                     project=project, name=name, train_args=args, **resources))
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", default=str(SCHEDULER_DIR), help="큐 / 상태 / 로그 폴더")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="작업 추가 (이미 있는 id 는 건너뜀)")
+    add.add_argument("--models", nargs="+", default=list(MODEL_PATHS))
+    add.add_argument("--data", default=str(DATA_YAML))
+    add.add_argument("--kfold_dir", default=None, help="split_manifest.py --kfold 결과 폴더 (fold 마다 작업 1개)")
+    add.add_argument("--sweep", nargs="*", default=None, help="key=v1,v2 ... (조합마다 작업 1개)")
+    add.add_argument("--epochs", type=int, default=EPOCHS)
+    add.add_argument("--patience", type=int, default=PATIENCE)
+    add.add_argument("--imgsz", type=int, default=IMG_SIZE)
+    add.add_argument("--threads", type=int, default=4, help="작업당 CPU 스레드 (torch / OpenMP)")
+    add.add_argument("--workers", type=int, default=4, help="작업당 dataloader worker")
+    add.add_argument("--device", default="auto", help="auto / cpu / GPU 번호")
+    add.add_argument("--priority", type=int, default=0)
+    add.add_argument("--rerun", action="store_true", help="이미 끝난 같은 id 작업을 처음부터 다시 학습")
+
+    run = sub.add_parser("run", help="큐가 빌 때까지 실행")
+    run.add_argument("--devices", nargs="+", default=None, help="사용할 device (기본: 모든 GPU, 없으면 cpu)")
+    run.add_argument("--jobs_per_device", type=int, default=1)
+    run.add_argument("--cpus", type=int, default=os.cpu_count(), help="작업들의 threads + workers 합 상한")
+    run.add_argument("--max_jobs", type=int, default=None)
+    run.add_argument("--poll", type=float, default=POLL_INTERVAL)
+
+    sub.add_parser("status", help="상태 파일 갱신 후 출력")
+    sub.add_parser("retry", help="failed / stopped 작업을 pending 으로")
+
+    job_cmd = sub.add_parser("_job")  # 스케줄러가 띄우는 자식 프로세스용
+    job_cmd.add_argument("job_id")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.root)
+    if args.command == "add":
+        jobs = build_jobs(args.models, data=args.data, kfold_dir=args.kfold_dir, sweep=args.sweep,
+                          train_args={"epochs": args.epochs, "patience": args.patience, "imgsz": args.imgsz},
+                          threads=args.threads, workers=args.workers, device=args.device, priority=args.priority)
+        added = [job["id"] for job in jobs if queue.add(job, rerun=args.rerun)]
+        print(f"📥 작업 {len(added)}개 추가 (중복 {len(jobs) - len(added)}개 건너뜀): {', '.join(added)}")
+    elif args.command == "run":
+        Scheduler(queue, args.devices or default_devices(), args.jobs_per_device, args.cpus, args.max_jobs).run(args.poll)
+    elif args.command == "status":
+        status = Scheduler(queue, []).write_status()
+        for job in status["jobs"]:
+            print(f"{job['id']:<40} {job['status']:<8} epoch {job.get('epoch', '-')}/{job['epochs']} "
+                  f"mAP50-95 {job.get('mAP50-95')}")
+        print(f"📄 {queue.status_path}")
+    elif args.command == "retry":
+        with queue.locked() as jobs:
+            for job in jobs.values():
+                if job["status"] in ("failed", "stopped"):
+                    job.update(status="pending", attempts=0)
+    elif args.command == "_job":
+        run_job(queue.snapshot()[args.job_id], queue)